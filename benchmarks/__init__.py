@@ -0,0 +1,56 @@
+# benchmarks/__init__.py
+import os
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List
+
+ROOT_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'src'))
+sys.path.insert(0, ROOT_DIR)
+
+from packages.backtester import DATA_DIR, data_files
+
+# One representative order book file per round
+BOOK_FILES = {
+    1: data_files(1, -2)[0],
+    2: os.path.join(DATA_DIR, 'round-2-island-data-bottle', 'orderbook_round_2_day_1.csv'),
+    3: data_files(3, 0)[0],
+}
+
+# Maps round -> trader module, for the per-tick latency and end-to-end benchmarks
+ROUND_TRADERS = {1: 'round1_trader', 2: 'round2_trader', 3: 'round3_trader'}
+
+# Maps benchmark name -> function returning {metric: value}. Metric names decide the direction
+# of a regression: '*_per_sec' and 'saved_*' are better when higher, everything else when lower.
+BENCHMARKS: Dict[str, Callable[[], Dict[str, float]]] = {}
+
+
+def benchmark(name: str):
+    def decorator(fn: Callable[[], Dict[str, float]]):
+        BENCHMARKS[name] = fn
+        return fn
+    return decorator
+
+
+def measure(fn: Callable[[], object], repeat: int = 3) -> Dict[str, float]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return {'seconds': min(timings), 'median_seconds': statistics.median(timings)}
+
+
+def latency(samples: List[float]) -> Dict[str, float]:
+    """Summarises per-call wall times (in seconds) as microsecond percentiles."""
+    ordered = sorted(samples)
+    return {
+        'median_us': ordered[len(ordered) // 2] * 1e6,
+        'p99_us': ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1e6,
+        'max_us': ordered[-1] * 1e6,
+    }
+
+
+def higher_is_better(metric: str) -> bool:
+    return metric.endswith('_per_sec') or metric.startswith('saved_')
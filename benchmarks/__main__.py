@@ -0,0 +1,104 @@
+# python -m benchmarks run [filter ...] [-o results.json]
+# python -m benchmarks compare baseline.json results.json [--threshold 0.1]
+import argparse
+import datetime
+import importlib
+import json
+import os
+import platform
+import subprocess
+import sys
+from typing import Dict, List
+
+from . import BENCHMARKS, ROOT_DIR, higher_is_better
+
+RESULTS_DIR = os.path.join(ROOT_DIR, 'benchmarks', 'results')
+
+# Benchmark modules register themselves on import
+MODULES = ['bench_parsing', 'bench_trader', 'bench_dispatch', 'bench_books']
+
+
+def machine_info() -> Dict[str, str]:
+    import numpy as np
+    import pandas as pd
+
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT_DIR, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ''
+    return {
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'commit': commit,
+        'date': datetime.datetime.now().isoformat(timespec='seconds'),
+    }
+
+
+def run(filters: List[str], output: str) -> None:
+    for module in MODULES:
+        importlib.import_module(f'{__package__}.{module}')
+
+    results = {}
+    for name, fn in BENCHMARKS.items():
+        if filters and not any(f in name for f in filters):
+            continue
+        print(f"{name} ...", end=" ", flush=True, file=sys.stderr)
+        results[name] = fn()
+        print(", ".join(f"{metric}={value:.4g}" for metric, value in results[name].items()), file=sys.stderr)
+
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({'machine': machine_info(), 'results': results}, f, indent=2)
+    print(f"wrote {output}", file=sys.stderr)
+
+
+def compare(baseline_file: str, current_file: str, threshold: float) -> int:
+    """Prints every shared metric with its change; returns how many regressed beyond threshold."""
+    with open(baseline_file) as f:
+        baseline = json.load(f)['results']
+    with open(current_file) as f:
+        current = json.load(f)['results']
+
+    regressions = 0
+    for name in sorted(set(baseline) & set(current)):
+        for metric in sorted(set(baseline[name]) & set(current[name])):
+            before, after = baseline[name][metric], current[name][metric]
+            if not before:
+                continue
+            change = (after - before) / abs(before)
+            worse = -change if higher_is_better(metric) else change
+            flag = "REGRESSION" if worse > threshold else ""
+            regressions += bool(flag)
+            print(f"{name:45} {metric:16} {before:12.4g} -> {after:12.4g} {change:+8.1%} {flag}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run or compare the performance benchmarks")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help="run benchmarks and store the results as JSON")
+    run_parser.add_argument('filters', nargs='*', help="only run benchmarks whose name contains one of these")
+    default_output = os.path.join(RESULTS_DIR, datetime.datetime.now().strftime('%Y%m%d-%H%M%S') + '.json')
+    run_parser.add_argument('-o', '--output', default=default_output)
+
+    compare_parser = commands.add_parser('compare', help="flag regressions of current against baseline")
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=0.1, help="relative slowdown that counts as a regression")
+
+    args = parser.parse_args()
+    if args.command == 'run':
+        run(args.filters, args.output)
+    else:
+        regressions = compare(args.baseline, args.current, args.threshold)
+        print(f"{regressions} regression(s) beyond {args.threshold:.0%}")
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
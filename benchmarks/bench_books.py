@@ -0,0 +1,13 @@
+from packages.deltabook import compare
+from . import BOOK_FILES, benchmark
+
+
+def _register(round: int, book_file: str) -> None:
+    @benchmark(f'books/round{round}')
+    def books():
+        report = compare(book_file)
+        return {metric: value for metric, value in report.items() if metric.endswith(('_bytes', '_per_sec'))}
+
+
+for round, book_file in BOOK_FILES.items():
+    _register(round, book_file)
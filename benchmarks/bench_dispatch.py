@@ -0,0 +1,70 @@
+import contextlib
+import importlib
+import os
+import time
+
+from framework import logger
+from . import ROUND_TRADERS, benchmark, latency
+from .bench_trader import ONLINE_STRATEGIES, trading_states
+
+# Per-tick budget of the degradation benchmark, tight enough that the online rounds degrade
+BUDGET_US = 60
+
+
+def run_day(round: int, skip_unchanged: bool):
+    trader = importlib.import_module(ROUND_TRADERS[round]).Trader(seed=0)
+    trader.skip_unchanged = skip_unchanged
+    trader_data = ""
+    logger.enabled = False
+    try:
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            start = time.perf_counter()
+            for state in trading_states(round):
+                state.traderData = trader_data
+                _, _, trader_data = trader.run(state)
+            elapsed = time.perf_counter() - start
+    finally:
+        logger.enabled = True
+    return trader, elapsed
+
+
+def _register(round: int) -> None:
+    @benchmark(f'dispatch/round{round}')
+    def dispatch():
+        # Pure strategies are skipped while their books, trades and positions stay the same
+        ticks = len(trading_states(round))
+        trader, seconds = run_day(round, True)
+        _, seconds_no_skip = run_day(round, False)
+        return {
+            'seconds': seconds,
+            'seconds_no_skip': seconds_no_skip,
+            'evaluated_calls': sum(trader.calls.values()),
+            'saved_calls': sum(trader.skips.values()),
+            'saved_us_per_tick': (seconds_no_skip - seconds) / ticks * 1e6,
+        }
+
+
+    @benchmark(f'budget/round{round}')
+    def budget():
+        # The online refit and full logging, with and without a tight per-tick budget
+        states = trading_states(round)
+        params = {ONLINE_STRATEGIES[round]: {'online': True}}
+        result = {}
+        for name, time_budget in (('unbounded', float('inf')), ('budgeted', BUDGET_US * 1e-6)):
+            trader = importlib.import_module(ROUND_TRADERS[round]).Trader(seed=0, params=params)
+            trader.time_budget = time_budget
+            samples = []
+            trader_data = ""
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                for state in states:
+                    state.traderData = trader_data
+                    start = time.perf_counter()
+                    _, _, trader_data = trader.run(state)
+                    samples.append(time.perf_counter() - start)
+            result.update({f'{name}_{metric}': value for metric, value in latency(samples).items()})
+        result.update({f'{level}_ticks': count for level, count in trader.degradations.items()})
+        return result
+
+
+for round in ROUND_TRADERS:
+    _register(round)
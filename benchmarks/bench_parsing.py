@@ -0,0 +1,44 @@
+from packages.dataparser import DataParser, resident_memory
+from . import BOOK_FILES, benchmark, measure
+
+
+def parse(book_file: str) -> DataParser:
+    parser = DataParser()
+    parser.parse_csv(book_file)
+    return parser
+
+
+def _register(round: int, book_file: str) -> None:
+    @benchmark(f'parse_csv/round{round}')
+    def parse_csv():
+        return measure(lambda: parse(book_file))
+
+    @benchmark(f'extract_order_depths/round{round}')
+    def extract_order_depths():
+        return measure(lambda: parse(book_file).extract_order_depths(), repeat=1)
+
+    @benchmark(f'trading_states/round{round}')
+    def trading_states():
+        parser = parse(book_file)
+        states = {}
+        result = measure(lambda: states.update(parser.get_trading_states()), repeat=1)
+        result['states'] = len(states)
+        return result
+
+    @benchmark(f'memory/round{round}')
+    def memory():
+        before = resident_memory()
+        parser = parse(book_file)
+        parsed = resident_memory()
+        parser.get_trading_states()
+        usage = parser.memory_usage()
+        return {
+            'raw_data_bytes': usage['raw_data'],
+            'index_bytes': usage['index'],
+            'parse_resident_bytes': parsed - before,
+            'states_resident_bytes': usage['resident'] - parsed,
+        }
+
+
+for round, book_file in BOOK_FILES.items():
+    _register(round, book_file)
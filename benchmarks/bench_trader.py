@@ -0,0 +1,166 @@
+import contextlib
+import importlib
+import io
+import json
+import os
+import time
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from datamodel import ConversionObservation, Observation, TradingState
+from framework import logger
+from rls import RecursiveLeastSquares
+from packages.backtester import DATA_DIR, BackTester, data_files, run_lockstep
+from packages.dataparser import DataParser
+from . import BOOK_FILES, ROUND_TRADERS, benchmark, latency, measure
+
+# Maps round -> day replayed end to end by the backtest benchmark
+BACKTEST_DAYS = {1: -2, 3: 0}
+
+# Number of trader variants replayed together by the lockstep benchmark
+LOCKSTEP_VARIANTS = 20
+
+# Maps round -> the strategy whose fair-value model is refitted online in the online benchmark
+ONLINE_STRATEGIES = {1: 'STARFRUIT', 2: 'ORCHIDS', 3: 'GIFT_BASKET'}
+
+# Feature counts of the recursive least squares micro-benchmark
+RLS_FEATURES = (3, 5, 8)
+
+# Maps round -> trading states of its benchmark day, built once per process
+_states: Dict[int, List[TradingState]] = {}
+
+
+def _attach_orchid_observations(states: List[TradingState]) -> None:
+    # The round 2 prices file only has the ORCHIDS reference price, which stands in for both
+    # conversion quotes here
+    observations = pd.read_csv(os.path.join(DATA_DIR, 'round-2-island-data-bottle', 'prices_round_2_day_1.csv'), delimiter=';')
+    by_timestamp = {row.timestamp: row for row in observations.itertuples(index=False)}
+    for state in states:
+        row = by_timestamp.get(state.timestamp)
+        if row is not None:
+            state.observations = Observation({}, {'ORCHIDS': ConversionObservation(
+                row.ORCHIDS, row.ORCHIDS, row.TRANSPORT_FEES, row.EXPORT_TARIFF, row.IMPORT_TARIFF, row.SUNLIGHT, row.HUMIDITY)})
+
+
+def trading_states(round: int) -> List[TradingState]:
+    if round not in _states:
+        parser = DataParser()
+        parser.parse_csv(BOOK_FILES[round])
+        states = list(parser.get_trading_states().values())
+        if round == 2:
+            _attach_orchid_observations(states)
+        _states[round] = states
+    return _states[round]
+
+
+def run_ticks(trader_module: str, states: List[TradingState], params: Dict[str, Dict] = None) -> List[float]:
+    trader = importlib.import_module(trader_module).Trader(seed=0, params=params)
+    samples = []
+    trader_data = ""
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for state in states:
+            state.traderData = trader_data
+            start = time.perf_counter()
+            _, _, trader_data = trader.run(state)
+            samples.append(time.perf_counter() - start)
+    return samples
+
+
+def _register(round: int, trader_module: str) -> None:
+    for enabled in (True, False):
+        @benchmark(f'trader_run/round{round}/logger_{"on" if enabled else "off"}')
+        def trader_run(enabled=enabled):
+            states = trading_states(round)
+            logger.enabled = enabled
+            try:
+                return latency(run_ticks(trader_module, states))
+            finally:
+                logger.enabled = True
+
+    @benchmark(f'trader_run/round{round}/online')
+    def trader_run_online():
+        states = trading_states(round)
+        logger.enabled = False
+        try:
+            return latency(run_ticks(trader_module, states, {ONLINE_STRATEGIES[round]: {'online': True}}))
+        finally:
+            logger.enabled = True
+
+    @benchmark(f'logger_flush/round{round}')
+    def logger_flush():
+        states = trading_states(round)
+        trader = importlib.import_module(trader_module).Trader(seed=0)
+        payloads = []
+        samples = []
+        buffer = io.StringIO()
+        with contextlib.redirect_stdout(buffer):
+            for state in states:
+                orders, conversions, trader_data = trader.run(state)
+                logger.print("benchmark")
+                before = buffer.tell()
+                start = time.perf_counter()
+                logger.flush(state, orders, conversions, trader_data)
+                samples.append(time.perf_counter() - start)
+                payloads.append(buffer.tell() - before)
+        result = latency(samples)
+        result['mean_bytes'] = sum(payloads) / len(payloads)
+        result['max_bytes'] = max(payloads)
+        return result
+
+    # Round 2 has no day with both a book and a trades file, so it only gets the tick benchmarks
+    if round in BACKTEST_DAYS:
+        @benchmark(f'backtest/round{round}')
+        def backtest():
+            prices_file, trades_file = data_files(round, BACKTEST_DAYS[round])
+            results = []
+            logger.enabled = False
+            try:
+                result = measure(lambda: results.append(BackTester(trader_module, seed=0).run(prices_file, trades_file)), repeat=1)
+            finally:
+                logger.enabled = True
+            result['ticks_per_sec'] = len(results[-1].timestamps) / result['seconds']
+            return result
+
+        @benchmark(f'backtest/round{round}/lockstep{LOCKSTEP_VARIANTS}')
+        def backtest_lockstep():
+            prices_file, trades_file = data_files(round, BACKTEST_DAYS[round])
+            backtesters = [BackTester(trader_module, seed=seed) for seed in range(LOCKSTEP_VARIANTS)]
+            results = []
+            logger.enabled = False
+            try:
+                result = measure(lambda: results.append(run_lockstep(backtesters, prices_file, trades_file)), repeat=1)
+            finally:
+                logger.enabled = True
+            result['ticks_per_sec'] = LOCKSTEP_VARIANTS * len(results[-1][0].timestamps) / result['seconds']
+            return result
+
+
+for round, trader_module in ROUND_TRADERS.items():
+    _register(round, trader_module)
+
+
+def _register_rls(features: int) -> None:
+    @benchmark(f'rls_update/p{features}')
+    def rls_update():
+        # The update alone, then the traderData round trip the state makes every tick
+        model = RecursiveLeastSquares([0.0] * features)
+        xs = np.random.default_rng(0).normal(size=(10_000, features)).tolist()
+        samples = []
+        round_trips = []
+        for x in xs:
+            start = time.perf_counter()
+            model.update(x, sum(x))
+            samples.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            model.load(json.loads(json.dumps(model.save())))
+            round_trips.append(time.perf_counter() - start)
+        result = latency(samples)
+        result['round_trip_median_us'] = latency(round_trips)['median_us']
+        result['state_bytes'] = len(json.dumps(model.save(), separators=(",", ":")))
+        return result
+
+
+for features in RLS_FEATURES:
+    _register_rls(features)
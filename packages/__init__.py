@@ -1,13 +1,48 @@
 # packages/__init__.py
-from ..src.datamodel import Time, Symbol, Product, Position, UserId, ObservationValue
-from ..src.datamodel import TradingState, Trade, Listing, Order, OrderDepth, Observation, ConversionObservation
+from datamodel import Time, Symbol, Product, Position, UserId, ObservationValue
+from datamodel import TradingState, Trade, Listing, Order, OrderDepth, Observation, ConversionObservation
+from .analytics import Attribution, analyze, analyze_log
+from .backtester import BackTester, BacktestResult, ShardedResult, run_lockstep, run_sharded, spawn_seeds
+from .cache import ResultCache
+from .checkpoint import Checkpointer, JobJournal
 from .dataparser import DataParser
+from .dataset import Dataset
+from .deltabook import DeltaBook
+from .exchange import Exchange, ExchangeReport
+from .features import FeatureFrame, FeatureStore
+from .hindsight import HindsightResult, solve_day
 from .logger import Logger
+from .optimizer import Budget, SearchResult, successive_halving
+from .replay import ReplayReport, replay
 
 __all__ = [
+    'Attribution',
+    'analyze',
+    'analyze_log',
     'BackTester',
+    'BacktestResult',
+    'run_lockstep',
+    'ShardedResult',
+    'run_sharded',
+    'spawn_seeds',
     'DataParser',
+    'Dataset',
+    'DeltaBook',
+    'Exchange',
+    'ExchangeReport',
+    'FeatureStore',
+    'FeatureFrame',
+    'ResultCache',
+    'Checkpointer',
+    'JobJournal',
+    'HindsightResult',
+    'solve_day',
     'Logger',
+    'Budget',
+    'SearchResult',
+    'successive_halving',
+    'ReplayReport',
+    'replay',
     'Time', 
     'Symbol',
     'Product',
@@ -0,0 +1,163 @@
+import argparse
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from datamodel import Product, Trade
+from framework import StrategyTrader
+from .backtester import BacktestResult
+from .dataparser import DataParser
+
+# Ticks after a fill over which the mid move counts as adverse selection
+ADVERSE_HORIZON = 10
+
+
+class Attribution:
+    """Per-tick pnl of one product split into four sources that add up to its marked-to-mid pnl."""
+
+    def __init__(self, product: Product, timestamps: np.ndarray, mids: np.ndarray, position: np.ndarray,
+                 spread_capture: np.ndarray, adverse_selection: np.ndarray, inventory: np.ndarray,
+                 conversions: np.ndarray, traded: np.ndarray, notional: np.ndarray, limit: int = None) -> None:
+        self.product = product
+        self.timestamps = timestamps
+        self.mids = mids
+        self.position = position
+        # q * (mid - price) of every fill at its tick
+        self.spread_capture = spread_capture
+        # q * (mid[t + horizon] - mid[t]) of every fill, negative when the mid moves against us
+        self.adverse_selection = adverse_selection
+        # The rest of the mark-to-market of the position carried between ticks
+        self.inventory = inventory
+        # Conversions against the mid, fees and tariffs included in the price
+        self.conversions = conversions
+        # Units and seashells traded through the book every tick, conversions excluded
+        self.traded = traded
+        self.notional = notional
+        self.limit = limit
+
+    def pnl(self) -> np.ndarray:
+        """Cumulative pnl after every tick."""
+        return np.cumsum(self.spread_capture + self.adverse_selection + self.inventory + self.conversions)
+
+    def max_drawdown(self) -> float:
+        pnl = self.pnl()
+        return float(np.max(np.maximum.accumulate(pnl) - pnl)) if len(pnl) else 0.0
+
+    def time_at_limit(self) -> float:
+        """Fraction of ticks that ended with the position at the limit, either side."""
+        if self.limit is None or not len(self.position):
+            return float('nan')
+        return float(np.mean(np.abs(self.position) >= self.limit))
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            'pnl': float(self.pnl()[-1]) if len(self.timestamps) else 0.0,
+            'spread_capture': float(self.spread_capture.sum()),
+            'adverse_selection': float(self.adverse_selection.sum()),
+            'inventory': float(self.inventory.sum()),
+            'conversions': float(self.conversions.sum()),
+            'max_drawdown': self.max_drawdown(),
+            'time_at_limit': self.time_at_limit(),
+            'turnover': float(self.traded.sum()),
+            'notional': float(self.notional.sum()),
+        }
+
+
+def trade_arrays(trades: List[Trade], product: Product) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(timestamps, prices, signed quantities) of the trades in one product, bought quantities positive."""
+    rows = [(trade.timestamp, trade.price, trade.quantity if trade.buyer == 'SUBMISSION' else -trade.quantity)
+            for trade in trades if trade.symbol == product]
+    packed = np.array(rows, dtype=np.float64).reshape(-1, 3)
+    return packed[:, 0].astype(np.int64), packed[:, 1], packed[:, 2]
+
+
+def attribute(product: Product, timestamps: np.ndarray, mids: np.ndarray,
+              fills: Tuple[np.ndarray, np.ndarray, np.ndarray],
+              conversions: Tuple[np.ndarray, np.ndarray, np.ndarray] = None,
+              limit: int = None, horizon: int = ADVERSE_HORIZON) -> Attribution:
+    """Attribution of one product from its mids and its trade_arrays, all on tick timestamps."""
+    ticks = len(timestamps)
+    fill_timestamps, fill_prices, fill_quantities = fills
+    fill_ticks = np.searchsorted(timestamps, fill_timestamps)
+    fill_mids = mids[fill_ticks]
+
+    spread_capture = np.bincount(fill_ticks, fill_quantities * (fill_mids - fill_prices), minlength=ticks)
+    later_mids = mids[np.minimum(fill_ticks + horizon, ticks - 1)]
+    adverse_selection = np.bincount(fill_ticks, fill_quantities * (later_mids - fill_mids), minlength=ticks)
+    traded = np.bincount(fill_ticks, np.abs(fill_quantities), minlength=ticks)
+    notional = np.bincount(fill_ticks, np.abs(fill_quantities) * fill_prices, minlength=ticks)
+    position = np.bincount(fill_ticks, fill_quantities, minlength=ticks)
+
+    conversion_pnl = np.zeros(ticks)
+    if conversions is not None and len(conversions[0]):
+        conversion_timestamps, conversion_prices, conversion_quantities = conversions
+        conversion_ticks = np.searchsorted(timestamps, conversion_timestamps)
+        conversion_pnl = np.bincount(conversion_ticks, conversion_quantities * (mids[conversion_ticks] - conversion_prices), minlength=ticks)
+        position = position + np.bincount(conversion_ticks, conversion_quantities, minlength=ticks)
+
+    position = np.cumsum(position)
+    # Mark the position carried into each tick to that tick's mid move; the adverse selection
+    # part of it is already booked at the fill tick
+    carried = np.concatenate(([0.0], position[:-1]))
+    mark_to_market = carried * np.diff(mids, prepend=mids[:1])
+    inventory = mark_to_market - adverse_selection
+
+    return Attribution(product, timestamps, mids, position.astype(np.int64), spread_capture, adverse_selection,
+                       inventory, conversion_pnl, traded, notional, limit)
+
+
+def analyze(result: BacktestResult, limits: Dict[Product, int] = None,
+            horizon: int = ADVERSE_HORIZON) -> Dict[Product, Attribution]:
+    """Attributes the pnl of every product of a backtest."""
+    limits = limits or StrategyTrader.POSITION_LIMIT
+    timestamps = np.array(result.timestamps, dtype=np.int64)
+    return {
+        product: attribute(product, timestamps, np.array(result.mid[product], dtype=np.float64),
+                           trade_arrays(result.fills, product), trade_arrays(result.conversions, product),
+                           limits.get(product), horizon)
+        for product in result.products
+    }
+
+
+def analyze_log(log_file: str, limits: Dict[Product, int] = None,
+                horizon: int = ADVERSE_HORIZON) -> Dict[Product, Attribution]:
+    """Attributions of a single-day exchange log; conversions are not in the log and are left out."""
+    # The exchange's profit_and_loss marks to its fair value, not the mid, so only the last tick agrees
+    limits = limits or StrategyTrader.POSITION_LIMIT
+    parser = DataParser()
+    parser.parse_log(log_file)
+    # The trade history has timestamps but no day, so fills of different days cannot be told apart
+    days = parser.raw_data['day'].unique()
+    if len(days) > 1:
+        raise ValueError(f"{log_file} spans days {sorted(int(day) for day in days)}, analyze_log needs a single-day log")
+    own_trades = [trade for by_symbol in parser.own_trades.values() for trades in by_symbol.values() for trade in trades]
+
+    attributions = {}
+    for product, activities in parser.raw_data.groupby('product', observed=True):
+        activities = activities.sort_values('timestamp')
+        attributions[product] = attribute(product, activities['timestamp'].to_numpy(dtype=np.int64),
+                                          activities['mid_price'].to_numpy(dtype=np.float64),
+                                          trade_arrays(own_trades, product), None, limits.get(product), horizon)
+    return attributions
+
+
+def summary_frame(attributions: Dict[str, Dict[Product, Attribution]]) -> pd.DataFrame:
+    """One row per (run, product) of summary figures, e.g. over every result of a sweep."""
+    rows = [dict(run=run, product=product, **attribution.summary())
+            for run, by_product in attributions.items() for product, attribution in by_product.items()]
+    return pd.DataFrame(rows).set_index(['run', 'product'])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Pnl attribution and risk figures of exchange logs")
+    parser.add_argument('logs', nargs='+')
+    parser.add_argument('--horizon', type=int, default=ADVERSE_HORIZON, help="ticks after a fill counted as adverse selection")
+    args = parser.parse_args()
+
+    with pd.option_context('display.width', 200, 'display.max_columns', 20):
+        print(summary_frame({log_file: analyze_log(log_file, horizon=args.horizon) for log_file in args.logs}).round(3))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,449 @@
+import contextlib
+import importlib
+import io
+import itertools
+import os
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from datamodel import ConversionObservation, Listing, Observation, Order, OrderDepth, Product, Symbol, Trade, TradingState
+from fills import FillTable
+from .dataparser import DataParser
+from .logwriter import LogWriter
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data')
+
+
+def data_files(round: int, day: int) -> Tuple[str, str]:
+    """
+    Returns the (prices, trades) csv paths for one day of a round. The trades path is None
+    when the round did not ship a trades file for that day.
+    """
+    folder = os.path.join(DATA_DIR, f'round-{round}-island-data-bottle')
+    prices_file = os.path.join(folder, f'prices_round_{round}_day_{day}.csv')
+    trades_file = os.path.join(folder, f'trades_round_{round}_day_{day}_nn.csv')
+    return prices_file, trades_file if os.path.exists(trades_file) else None
+
+
+def available_days(round: int) -> List[int]:
+    """Returns the days of a round that have an order book prices file, in ascending order."""
+    folder = os.path.join(DATA_DIR, f'round-{round}-island-data-bottle')
+    prefix = f'prices_round_{round}_day_'
+    days = []
+    for name in os.listdir(folder) if os.path.isdir(folder) else []:
+        if name.startswith(prefix) and name.endswith('.csv'):
+            with open(os.path.join(folder, name)) as f:
+                # Round 2 ships ORCHIDS observation series under the same name
+                if 'product' not in f.readline().split(';'):
+                    continue
+            days.append(int(name[len(prefix):-len('.csv')]))
+    return sorted(days)
+
+
+def shard_seed(seed: int, round: int, day: int) -> int:
+    """The seed of one (round, day) shard, fixed by the run seed alone and not by scheduling."""
+    # Days can be negative, spawn keys cannot
+    child = np.random.SeedSequence(seed, spawn_key=(round, day + 2 ** 16))
+    return int(child.generate_state(1)[0])
+
+
+def spawn_seeds(seed: int, n: int) -> List[int]:
+    """
+    Derives n independent seeds from one run seed, e.g. one per worker of a sweep.
+    The same (seed, n) always yields the same seeds.
+    """
+    return [int(child.generate_state(1)[0]) for child in np.random.SeedSequence(seed).spawn(n)]
+
+
+class BacktestResult:
+
+    # Timestamps of every simulated tick, in order
+    timestamps: List[int]
+
+    # Maps product -> mark-to-market profit and loss after every tick
+    pnl: Dict[Product, List[float]]
+
+    # Maps product -> position after every tick
+    position: Dict[Product, List[int]]
+
+    # Maps product -> mid price every tick was marked at
+    mid: Dict[Product, List[float]]
+
+    # Every fill of the trader, in execution order
+    fills: List[Trade]
+
+    # Every executed conversion, priced including transport fees and tariffs
+    conversions: List[Trade]
+
+    def __init__(self, products: List[Product]) -> None:
+        self.products = products
+        self.timestamps = []
+        self.pnl = {product: [] for product in products}
+        self.position = {product: [] for product in products}
+        self.mid = {product: [] for product in products}
+        self.fills = []
+        self.conversions = []
+
+    def final_pnl(self) -> Dict[Product, float]:
+        return {product: (pnl[-1] if pnl else 0.0) for product, pnl in self.pnl.items()}
+
+    def total_pnl(self) -> float:
+        return sum(self.final_pnl().values())
+
+
+class _Account:
+    """
+    Everything one trader owns during a backtest: its positions, cash, traderData, the fills it
+    will see as own_trades next tick, and the result being recorded.
+    """
+
+    def __init__(self, backtester: 'BackTester', products: List[Product]) -> None:
+        self.backtester = backtester
+        self.trader = backtester.create_trader()
+        self.position = {product: 0 for product in products}
+        self.cash = {product: 0.0 for product in products}
+        self.own_trades: Dict[Symbol, List[Trade]] = {}
+        self.trader_data = ""
+        self.result = BacktestResult(products)
+        # Set when the backtester streams an exchange-style log
+        self.log: LogWriter = None
+
+    def view(self, market: TradingState) -> TradingState:
+        # Give the trader private copies of every container it could mutate, so nothing it
+        # does to its state can reach the shared market data or another trader
+        order_depths = {}
+        for symbol, market_depth in market.order_depths.items():
+            order_depth = OrderDepth()
+            order_depth.buy_orders = dict(market_depth.buy_orders)
+            order_depth.sell_orders = dict(market_depth.sell_orders)
+            order_depths[symbol] = order_depth
+
+        listings = {symbol: Listing(listing.symbol, listing.product, listing.denomination)
+                    for symbol, listing in market.listings.items()}
+        conversions = {product: ConversionObservation(
+            observation.bidPrice, observation.askPrice, observation.transportFees, observation.exportTariff,
+            observation.importTariff, observation.sunlight, observation.humidity)
+            for product, observation in market.observations.conversionObservations.items()}
+        observations = Observation(dict(market.observations.plainValueObservations), conversions)
+
+        return TradingState(
+            traderData=self.trader_data,
+            timestamp=market.timestamp,
+            listings=listings,
+            order_depths=order_depths,
+            own_trades=self.own_trades,
+            market_trades={symbol: list(trades) for symbol, trades in market.market_trades.items()},
+            position=dict(self.position),
+            observations=observations,
+        )
+
+    def step(self, market: TradingState, tick_trades: Dict[Symbol, List[Trade]]) -> None:
+        state = self.view(market)
+        if self.log is None:
+            orders, conversions, self.trader_data = self.trader.run(state)
+        else:
+            # What the trader prints is the lambdaLog of this tick
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                orders, conversions, self.trader_data = self.trader.run(state)
+            lambda_log = output.getvalue()
+            sandbox_log = ""
+
+        timestamp = market.timestamp
+        self.own_trades = {}
+        for symbol, symbol_orders in orders.items():
+            if symbol not in market.order_depths:
+                continue
+            limit = self.trader.POSITION_LIMIT.get(symbol)
+            if self.log is not None and self.backtester.exceeds_limit(symbol_orders, self.position[symbol], limit):
+                sandbox_log += f"\nOrders for product {symbol} exceeded limit of {limit} set"
+            # Match against the untouched market book, never the trader's copy
+            fills = self.backtester.match_orders(symbol, symbol_orders, market.order_depths[symbol],
+                                                 tick_trades.get(symbol, []), self.position[symbol], limit, timestamp)
+            for fill in fills:
+                signed_quantity = fill.quantity if fill.buyer == 'SUBMISSION' else -fill.quantity
+                self.position[symbol] += signed_quantity
+                self.cash[symbol] -= signed_quantity * fill.price
+            if fills:
+                self.own_trades[symbol] = fills
+                self.result.fills.extend(fills)
+
+        if conversions:
+            self.backtester.convert(market, conversions, self.position, self.cash, self.result, timestamp)
+
+        if self.log is not None:
+            trades = [trade for symbol_trades in tick_trades.values() for trade in symbol_trades]
+            trades += [fill for fills in self.own_trades.values() for fill in fills]
+            self.log.write_tick(timestamp, lambda_log[:-1] if lambda_log.endswith('\n') else lambda_log, sandbox_log, trades)
+
+    def record(self, tick: int, timestamp: int, mid_prices: Dict[Product, float]) -> None:
+        self.result.timestamps.append(timestamp)
+        for product in self.result.products:
+            mid_price = mid_prices.get(product, 0.0)
+            self.result.pnl[product].append(self.cash[product] + self.position[product] * mid_price)
+            self.result.position[product].append(self.position[product])
+            self.result.mid[product].append(mid_price)
+        if self.log is not None:
+            self.log.record(tick, {product: pnl[-1] for product, pnl in self.result.pnl.items()})
+
+
+def run_lockstep(backtesters: List['BackTester'], prices_file: str, trades_file: str = None,
+                 ticks: int = None, checkpointer=None, resume: bool = False, resume_at: int = None) -> List[BacktestResult]:
+    """Runs several traders over one day, building each tick's market once; equal to separate runs."""
+    parser = DataParser()
+    parser.parse_csv(prices_file)
+    if trades_file is not None:
+        parser.parse_trades_csv(trades_file)
+    trading_states = parser.get_trading_states()
+
+    products = sorted(parser.raw_data['product'].unique())
+    accounts = [_Account(backtester, products) for backtester in backtesters]
+    for account in accounts:
+        if account.backtester.log_file is not None:
+            account.log = LogWriter(account.backtester.log_file, parser.raw_data, parser.offsets)
+    mid_prices: Dict[Product, float] = {}
+
+    first = 0
+    key = None
+    if checkpointer is not None:
+        key = checkpointer.key(backtesters, prices_file, trades_file)
+        # Resume from the latest checkpoint, or the latest at or before tick resume_at
+        if resume or resume_at is not None:
+            if any(account.log is not None for account in accounts):
+                raise ValueError("a resumed run cannot stream a log, it would miss the ticks before the checkpoint")
+            checkpoint = checkpointer.latest(key, resume_at)
+            if checkpoint is not None:
+                first, mid_prices = checkpointer.restore(key, checkpoint, accounts)
+
+    # Traders flush their logs to stdout every tick, keep that out of the backtest output
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        states = itertools.islice(trading_states.items(), first, ticks)
+        for tick, (timestamp, market) in enumerate(states, first):
+            tick_trades = parser.market_trades.get(timestamp, {})
+            for account in accounts:
+                account.step(market, tick_trades)
+
+            for product, order_depth in market.order_depths.items():
+                if order_depth.buy_orders and order_depth.sell_orders:
+                    mid_prices[product] = (max(order_depth.buy_orders) + min(order_depth.sell_orders)) / 2
+            for account in accounts:
+                account.record(tick, timestamp, mid_prices)
+
+            if key is not None and (tick + 1) % checkpointer.every == 0:
+                checkpointer.save(key, tick + 1, mid_prices, accounts)
+
+    for account in accounts:
+        if account.log is not None:
+            account.log.close()
+    return [account.result for account in accounts]
+
+
+class BackTester:
+    """
+    Replays a day of order book snapshots through a round trader and matches its orders
+    against the book and the market trades of the same tick.
+    """
+
+    def __init__(self, trader_module: str, seed: int = 0, noise: bool = True, params: Dict[str, Any] = None,
+                 log_file: str = None, fill_tables: Dict[Symbol, FillTable] = None) -> None:
+        self.trader_module = trader_module
+        self.seed = seed
+        self.noise = noise
+        # Maps strategy name -> parameter overrides for this run, e.g. {'STARFRUIT': {'edge': 1.5}}
+        self.params = params or {}
+        # Where to stream an exchange-style log of the run, if anywhere
+        self.log_file = log_file
+        # Maps product -> passive fill table (see fills.load_fill_tables). Resting orders of
+        # those products fill from the table instead of the market trades of the tick, which
+        # the table fills leave untouched
+        self.fill_tables = fill_tables or {}
+        self.fill_rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(2 ** 16,)))
+
+    def create_trader(self):
+        module = importlib.import_module(self.trader_module)
+        return module.Trader(seed=self.seed, noise=self.noise, params=self.params)
+
+    def run(self, prices_file: str, trades_file: str = None, checkpointer=None, resume: bool = False,
+            resume_at: int = None) -> BacktestResult:
+        return run_lockstep([self], prices_file, trades_file, checkpointer=checkpointer, resume=resume,
+                            resume_at=resume_at)[0]
+
+    def exceeds_limit(self, orders: List[Order], position: int, limit: int) -> bool:
+        """Whether the orders of one product could jointly take the position beyond the limit."""
+        if limit is None:
+            return False
+        long_quantity = sum(order.quantity for order in orders if order.quantity > 0)
+        short_quantity = sum(-order.quantity for order in orders if order.quantity < 0)
+        return position + long_quantity > limit or position - short_quantity < -limit
+
+    def match_orders(self, symbol: Symbol, orders: List[Order], order_depth: OrderDepth, market_trades: List[Trade],
+                     position: int, limit: int, timestamp: int) -> List[Trade]:
+        """Fills one tick's orders of a product from the book, then from the market trades or fill table."""
+        # Like the exchange, reject every order of a product if they could jointly breach the limit
+        if self.exceeds_limit(orders, position, limit):
+            return []
+
+        buy_orders = dict(order_depth.buy_orders)
+        sell_orders = dict(order_depth.sell_orders)
+        trade_volumes = [trade.quantity for trade in market_trades]
+        # Maps (is buy, price) -> volume the fill table still has for orders resting there
+        table_volumes: Dict[Tuple[bool, int], int] = {}
+        fills: List[Trade] = []
+
+        for order in orders:
+            remaining = abs(order.quantity)
+            is_buy = order.quantity > 0
+
+            # Take liquidity from the book first, best price first
+            if is_buy:
+                for price in sorted(sell_orders):
+                    if price > order.price or remaining == 0:
+                        break
+                    if sell_orders[price] > 0:
+                        # A positive ask would silently never fill, the way a book parsed with
+                        # unsigned ask volumes used to
+                        raise ValueError(f"{symbol} ask at {price} has volume {sell_orders[price]}, "
+                                         f"sell volumes must be negative as in OrderDepth")
+                    volume = min(remaining, -sell_orders[price])
+                    if volume <= 0:
+                        continue
+                    fills.append(Trade(symbol, price, volume, 'SUBMISSION', '', timestamp))
+                    sell_orders[price] += volume
+                    remaining -= volume
+            else:
+                for price in sorted(buy_orders, reverse=True):
+                    if price < order.price or remaining == 0:
+                        break
+                    if buy_orders[price] < 0:
+                        raise ValueError(f"{symbol} bid at {price} has volume {buy_orders[price]}, "
+                                         f"buy volumes must be positive as in OrderDepth")
+                    volume = min(remaining, buy_orders[price])
+                    if volume <= 0:
+                        continue
+                    fills.append(Trade(symbol, price, volume, '', 'SUBMISSION', timestamp))
+                    buy_orders[price] -= volume
+                    remaining -= volume
+
+            fill_table = self.fill_tables.get(symbol)
+            if fill_table is not None:
+                # Whatever rests fills with the table's probability, by its expected size. One draw
+                # per (side, price) is shared by every order there, and market trades are not used up
+                if remaining:
+                    level = (is_buy, order.price)
+                    if level not in table_volumes:
+                        probability, size = fill_table.quote(order_depth, order.price, order.quantity)
+                        table_volumes[level] = max(1, round(size)) if self.fill_rng.random() < probability else 0
+                    volume = min(remaining, table_volumes[level])
+                    if volume:
+                        if is_buy:
+                            fills.append(Trade(symbol, order.price, volume, 'SUBMISSION', '', timestamp))
+                        else:
+                            fills.append(Trade(symbol, order.price, volume, '', 'SUBMISSION', timestamp))
+                        table_volumes[level] -= volume
+                        remaining -= volume
+                continue
+
+            # Whatever rests is filled by bots that printed through our price this tick
+            for i, trade in enumerate(market_trades):
+                if remaining == 0:
+                    break
+                if trade_volumes[i] == 0:
+                    continue
+                if (is_buy and trade.price <= order.price) or (not is_buy and trade.price >= order.price):
+                    volume = min(remaining, trade_volumes[i])
+                    if is_buy:
+                        fills.append(Trade(symbol, order.price, volume, 'SUBMISSION', trade.seller, timestamp))
+                    else:
+                        fills.append(Trade(symbol, order.price, volume, trade.buyer, 'SUBMISSION', timestamp))
+                    trade_volumes[i] -= volume
+                    remaining -= volume
+
+        return fills
+
+    def convert(self, state: TradingState, conversions: int, position: Dict[Product, int], cash: Dict[Product, float],
+                result: BacktestResult, timestamp: int) -> None:
+        # Conversions can only flatten an existing position, never flip or extend it
+        for product, observation in state.observations.conversionObservations.items():
+            current_position = position.get(product, 0)
+            if conversions > 0 and current_position < 0:
+                quantity = min(conversions, -current_position)
+                price = observation.askPrice + observation.transportFees + observation.importTariff
+                result.conversions.append(Trade(product, price, quantity, 'SUBMISSION', 'CONVERSION', timestamp))
+                position[product] += quantity
+                cash[product] -= quantity * price
+            elif conversions < 0 and current_position > 0:
+                quantity = min(-conversions, current_position)
+                price = observation.bidPrice - observation.transportFees - observation.exportTariff
+                result.conversions.append(Trade(product, price, quantity, 'CONVERSION', 'SUBMISSION', timestamp))
+                position[product] -= quantity
+                cash[product] += quantity * price
+
+
+class ShardedResult:
+    """
+    Merged per-day results of a sharded backtest. Everything is ordered by (round, day),
+    whatever order the workers finished in.
+    """
+
+    def __init__(self, results: Dict[Tuple[int, int], BacktestResult]) -> None:
+        self.results = {shard: results[shard] for shard in sorted(results)}
+
+    def shards(self) -> List[Tuple[int, int]]:
+        return list(self.results)
+
+    def daily_pnl(self) -> Dict[Tuple[int, int], Dict[Product, float]]:
+        return {shard: result.final_pnl() for shard, result in self.results.items()}
+
+    def total_pnl(self) -> float:
+        return sum(result.total_pnl() for result in self.results.values())
+
+    def fills(self) -> List[Tuple[int, int, Trade]]:
+        return [(round, day, fill) for (round, day), result in self.results.items() for fill in result.fills]
+
+    def positions(self) -> Dict[Tuple[int, int], Dict[Product, List[int]]]:
+        return {shard: result.position for shard, result in self.results.items()}
+
+
+def _run_shard(trader_module: str, seed: int, noise: bool, params: Dict[str, Any], round: int, day: int,
+               checkpoint_every: int = None) -> BacktestResult:
+    backtester = BackTester(trader_module, shard_seed(seed, round, day), noise, params)
+    checkpointer = None
+    if checkpoint_every:
+        from .checkpoint import Checkpointer
+        checkpointer = Checkpointer(every=checkpoint_every)
+    return backtester.run(*data_files(round, day), checkpointer=checkpointer, resume=checkpointer is not None)
+
+
+def run_sharded(trader_module: str, shards: List[Tuple[int, int]], seed: int = 0, noise: bool = True,
+                params: Dict[str, Any] = None, workers: int = None, cache=None,
+                checkpoint_every: int = None) -> ShardedResult:
+    """Backtests every (round, day) shard in its own worker process, seeded from (seed, round, day)."""
+    from concurrent.futures import ProcessPoolExecutor
+
+    results: Dict[Tuple[int, int], BacktestResult] = {}
+    pending: Dict[Tuple[int, int], str] = {}
+    for round, day in shards:
+        key = None
+        if cache is not None:
+            backtester = BackTester(trader_module, shard_seed(seed, round, day), noise, params)
+            key = cache.key(backtester, *data_files(round, day))
+            cached = cache.get(key)
+            if cached is not None:
+                cache.hits += 1
+                results[(round, day)] = cached
+                continue
+            cache.misses += 1
+        pending[(round, day)] = key
+
+    # With checkpoint_every, a shard interrupted halfway resumes from its last checkpoint
+    if pending:
+        with ProcessPoolExecutor(max_workers=workers or min(len(pending), os.cpu_count() or 1)) as pool:
+            futures = {shard: pool.submit(_run_shard, trader_module, seed, noise, params, *shard, checkpoint_every)
+                       for shard in pending}
+            for shard, future in futures.items():
+                results[shard] = future.result()
+                if cache is not None:
+                    cache.put(pending[shard], results[shard])
+
+    return ShardedResult(results)
@@ -0,0 +1,266 @@
+import argparse
+import ast
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Set
+
+SRC_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+BUILD_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'build'))
+
+# Provided by the exchange next to the submission, so it is imported rather than inlined
+EXCHANGE_MODULES = {'datamodel'}
+
+# Imported on first attribute access in the bundle instead of when the lambda starts
+HEAVY_MODULES = {'numpy', 'pandas', 'jsonpickle', 'json', 'collections', 'copy', 'random', 'statistics', 'scipy'}
+
+LAZY_PRELUDE = '''import importlib
+import sys
+
+
+class _LazyModule:
+    """Imports a module on first attribute access, then replaces itself in the bundle globals."""
+
+    def __init__(self, alias: str, name: str) -> None:
+        self._alias = alias
+        self._name = name
+
+    def __getattr__(self, attr: str):
+        # The import system probes dunders such as __spec__ on modules in sys.modules
+        if attr.startswith('__'):
+            raise AttributeError(attr)
+        if sys.modules.get(self._name) is self:
+            del sys.modules[self._name]
+        module = importlib.import_module(self._name)
+        globals()[self._alias] = module
+        return getattr(module, attr)
+'''
+
+# The exchange's datamodel imports jsonpickle at the top but only uses it in Observation.__str__,
+# so the bundle registers a lazy stand-in before importing datamodel
+EXCHANGE_PRELUDE = '''
+if 'jsonpickle' not in sys.modules:
+    sys.modules['jsonpickle'] = _LazyModule('jsonpickle', 'jsonpickle')
+'''
+
+
+class _Statement:
+
+    def __init__(self, module: str, node: ast.stmt, source: str) -> None:
+        self.module = module
+        self.node = node
+        self.source = source
+        self.defines: Set[str] = set()
+        self.uses: Set[str] = set()
+        # Statements without names of their own (e.g. bare calls) are always kept
+        self.always = False
+
+
+class BundleReport:
+
+    def __init__(self, output: str, modules: List[str], kept: int, dropped: int, size: int,
+                 source_size: int, import_time: float, source_import_time: float) -> None:
+        self.output = output
+        self.modules = modules
+        self.kept = kept
+        self.dropped = dropped
+        self.size = size
+        self.source_size = source_size
+        self.import_time = import_time
+        self.source_import_time = source_import_time
+
+    def __str__(self) -> str:
+        return "\n".join([
+            f"bundle:        {self.output}",
+            f"modules:       {', '.join(self.modules)}",
+            f"statements:    {self.kept} kept, {self.dropped} unreachable",
+            f"size:          {self.size} bytes (sources: {self.source_size} bytes)",
+            f"cold start:    {self.import_time * 1000:.1f} ms (sources: {self.source_import_time * 1000:.1f} ms)",
+        ])
+
+
+def _local_module(name: str) -> str:
+    path = os.path.join(SRC_DIR, name + '.py')
+    return path if name not in EXCHANGE_MODULES and os.path.exists(path) else None
+
+
+def _collect_modules(entry: str) -> List[str]:
+    """Returns the local modules reachable from entry, dependencies first."""
+    ordered: List[str] = []
+    visiting: Set[str] = set()
+
+    def visit(name: str) -> None:
+        if name in ordered:
+            return
+        if name in visiting:
+            raise ValueError(f"Circular import involving {name}")
+        visiting.add(name)
+        with open(_local_module(name)) as f:
+            tree = ast.parse(f.read())
+        for node in tree.body:
+            if isinstance(node, ast.ImportFrom) and node.level == 0 and _local_module(node.module):
+                visit(node.module)
+            elif isinstance(node, ast.Import):
+                for alias in node.names:
+                    if _local_module(alias.name):
+                        raise ValueError(f"{name} uses 'import {alias.name}'; bundled modules must use 'from {alias.name} import ...'")
+        visiting.discard(name)
+        ordered.append(name)
+
+    visit(entry)
+    return ordered
+
+
+def _statement_source(lines: List[str], node: ast.stmt) -> str:
+    start = min([node.lineno] + [decorator.lineno for decorator in getattr(node, 'decorator_list', [])])
+    return "".join(lines[start - 1:node.end_lineno])
+
+
+def _names_used(node: ast.AST) -> Set[str]:
+    return {child.id for child in ast.walk(node) if isinstance(child, ast.Name) and isinstance(child.ctx, ast.Load)}
+
+
+def bundle(entry: str, output: str = None, entry_name: str = 'Trader') -> BundleReport:
+    """Inlines a trader and its local imports into one file, keeping only what the entry class reaches."""
+    output = output or os.path.join(BUILD_DIR, f'{entry}_submission.py')
+    modules = _collect_modules(entry)
+
+    statements: List[_Statement] = []
+    exchange_imports: Dict[str, Set[str]] = {}
+    for module in modules:
+        with open(_local_module(module)) as f:
+            source = f.read()
+        lines = source.splitlines(keepends=True)
+        for node in ast.parse(source).body:
+            if isinstance(node, ast.ImportFrom) and node.level == 0 and node.module in EXCHANGE_MODULES:
+                for alias in node.names:
+                    exchange_imports.setdefault(node.module, set()).add(alias.name)
+                continue
+            if isinstance(node, ast.ImportFrom) and node.level == 0 and _local_module(node.module):
+                continue
+
+            statement = _Statement(module, node, _statement_source(lines, node))
+            if isinstance(node, (ast.Import, ast.ImportFrom)):
+                statement.defines = {(alias.asname or alias.name).split('.')[0] for alias in node.names}
+            elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                statement.defines = {node.name}
+            elif isinstance(node, (ast.Assign, ast.AnnAssign)):
+                targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+                statement.defines = {child.id for target in targets for child in ast.walk(target) if isinstance(child, ast.Name)}
+            elif isinstance(node, ast.Expr) and isinstance(node.value, ast.Constant):
+                # Module docstrings do not survive inlining
+                continue
+            else:
+                statement.always = True
+            statement.uses = _names_used(node)
+            statements.append(statement)
+
+    # Every module shares one namespace in the bundle, so a name may only be defined once
+    definitions: Dict[str, _Statement] = {}
+    for statement in statements:
+        if isinstance(statement.node, (ast.Import, ast.ImportFrom)):
+            continue
+        for name in statement.defines:
+            other = definitions.get(name)
+            if other is not None and other.module != statement.module:
+                raise ValueError(f"'{name}' is defined in both {other.module} and {statement.module}")
+            definitions[name] = statement
+
+    by_name: Dict[str, List[_Statement]] = {}
+    for statement in statements:
+        for name in statement.defines:
+            by_name.setdefault(name, []).append(statement)
+
+    reachable: Set[int] = set()
+    pending = [statement for statement in statements if statement.always]
+    pending += [statement for statement in statements if entry_name in statement.defines and statement.module == entry]
+    if not any(entry_name in statement.defines for statement in pending):
+        raise ValueError(f"{entry} does not define {entry_name}")
+    while pending:
+        statement = pending.pop()
+        if id(statement) in reachable:
+            continue
+        reachable.add(id(statement))
+        for name in statement.uses:
+            pending.extend(by_name.get(name, []))
+
+    kept = [statement for statement in statements if id(statement) in reachable]
+    used_names: Set[str] = set().union(*(statement.uses for statement in kept)) if kept else set()
+
+    header: List[str] = ["from __future__ import annotations\n"]
+    imports: List[str] = []
+    body: List[str] = []
+    seen_imports: Set[str] = set()
+    lazy = exchange = False
+    for statement in kept:
+        node = statement.node
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                bound = alias.asname or alias.name
+                if alias.name.split('.')[0] in HEAVY_MODULES and '.' not in alias.name:
+                    line = f"{bound} = _LazyModule({bound!r}, {alias.name!r})\n"
+                    lazy = True
+                else:
+                    line = f"import {alias.name}" + (f" as {alias.asname}" if alias.asname else "") + "\n"
+                if line not in seen_imports:
+                    seen_imports.add(line)
+                    imports.append(line)
+        elif isinstance(node, ast.ImportFrom):
+            if statement.source not in seen_imports:
+                seen_imports.add(statement.source)
+                imports.append(statement.source)
+        else:
+            body.append(statement.source)
+
+    for module, names in exchange_imports.items():
+        needed = sorted(name for name in names if name in used_names)
+        if needed:
+            imports.insert(0, f"from {module} import {', '.join(needed)}\n")
+            lazy = exchange = True
+    if lazy:
+        header.append(LAZY_PRELUDE)
+    if exchange:
+        header.append(EXCHANGE_PRELUDE)
+
+    code = "".join(header) + "\n" + "".join(imports) + "\n\n" + "\n\n".join(body)
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        f.write(code)
+
+    source_size = sum(os.path.getsize(_local_module(module)) for module in modules)
+    bundle_dir, bundle_file = os.path.split(os.path.abspath(output))
+    import_time = measure_cold_start(os.path.splitext(bundle_file)[0], [bundle_dir, SRC_DIR])
+    source_import_time = measure_cold_start(entry, [SRC_DIR])
+    return BundleReport(output, modules, len(kept), len(statements) - len(kept), os.path.getsize(output),
+                        source_size, import_time, source_import_time)
+
+
+def measure_cold_start(module: str, path: List[str], repeat: int = 5) -> float:
+    """
+    Median seconds a fresh interpreter needs to import a trader module and construct its Trader,
+    which is what the exchange lambda pays before the first call to run.
+    """
+    script = ("import time\n"
+              "start = time.perf_counter()\n"
+              f"import {module}\n"
+              f"{module}.Trader()\n"
+              "print(time.perf_counter() - start)\n")
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(os.path.abspath(p) for p in path), PYTHONDONTWRITEBYTECODE='1')
+    timings = []
+    for _ in range(repeat):
+        completed = subprocess.run([sys.executable, '-c', script], env=env, capture_output=True, text=True, check=True)
+        timings.append(float(completed.stdout.strip().splitlines()[-1]))
+    return statistics.median(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Bundle a round trader into a single submission file")
+    parser.add_argument('trader', help="trader module in src/, e.g. round3_trader")
+    parser.add_argument('-o', '--output', help="output path (default: build/<trader>_submission.py)")
+    args = parser.parse_args()
+    print(bundle(args.trader, args.output))
+
+
+if __name__ == '__main__':
+    main()
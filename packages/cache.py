@@ -0,0 +1,203 @@
+import ast
+import hashlib
+import importlib.util
+import json
+import os
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from datamodel import Trade
+from .backtester import BackTester, BacktestResult
+
+# Root of the repository; only modules below it are hashed into cache keys
+REPO_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '.cache', 'backtests')
+
+# Maps path -> ((size, mtime), sha256), so data files are only hashed once per process
+_file_hashes: Dict[str, Tuple[Tuple[int, int], str]] = {}
+
+
+def file_hash(path: str) -> str:
+    stat = os.stat(path)
+    signature = (stat.st_size, stat.st_mtime_ns)
+    cached = _file_hashes.get(path)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    _file_hashes[path] = (signature, digest.hexdigest())
+    return digest.hexdigest()
+
+
+def source_hash(module_name: str) -> str:
+    """Hash of a module's source and of every repository module it imports, directly or not."""
+    digest = hashlib.sha256()
+    seen = set()
+    pending = [module_name]
+    while pending:
+        name = pending.pop()
+        if name in seen:
+            continue
+        seen.add(name)
+        try:
+            spec = importlib.util.find_spec(name)
+        except (ImportError, ValueError):
+            continue
+        if spec is None or spec.origin is None or not spec.origin.endswith('.py'):
+            continue
+        if not os.path.abspath(spec.origin).startswith(REPO_DIR + os.sep):
+            continue
+        with open(spec.origin, 'rb') as f:
+            source = f.read()
+        digest.update(name.encode() + b'\0' + source)
+
+        package = name if spec.submodule_search_locations else spec.parent
+        for node in ast.walk(ast.parse(source)):
+            if isinstance(node, ast.Import):
+                pending.extend(alias.name for alias in node.names)
+            elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+                pending.append(node.module)
+            elif isinstance(node, ast.ImportFrom) and node.level == 1 and package:
+                if node.module:
+                    pending.append(package + '.' + node.module)
+                else:
+                    # from . import x, where x may be a submodule
+                    pending.extend(package + '.' + alias.name for alias in node.names)
+    return digest.hexdigest()
+
+
+def backtest_key(backtester: BackTester, prices_file: str, trades_file: str = None) -> str:
+    """Hashes everything a backtest result depends on: the trader and engine source, parameters, seed and data."""
+    payload = {
+        'trader': source_hash(backtester.trader_module),
+        'engine': source_hash('packages.backtester'),
+        'params': backtester.params,
+        'seed': backtester.seed,
+        'noise': backtester.noise,
+        'fill_tables': {product: table.data for product, table in sorted(backtester.fill_tables.items())},
+        'prices': file_hash(prices_file),
+        'trades': file_hash(trades_file) if trades_file is not None else None,
+    }
+    encoded = json.dumps(payload, sort_keys=True, default=repr).encode()
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class ResultCache:
+    """Disk-backed store of backtest results by backtest_key, evicting least recently used past max_bytes."""
+
+    def __init__(self, directory: str = CACHE_DIR, max_bytes: int = 512 * 1024 * 1024) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, backtester: BackTester, prices_file: str, trades_file: str = None) -> str:
+        return backtest_key(backtester, prices_file, trades_file)
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key + '.npz')
+
+    def get(self, key: str) -> BacktestResult:
+        path = self.path(key)
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as arrays:
+            result = unpack_result(arrays)
+        # The modification time doubles as the last-used time for eviction
+        os.utime(path)
+        return result
+
+    def put(self, key: str, result: BacktestResult) -> None:
+        path = self.path(key)
+        temporary = path + '.tmp.npz'
+        np.savez_compressed(temporary, **pack_result(result))
+        os.replace(temporary, path)
+        self.evict()
+
+    def run(self, backtester: BackTester, prices_file: str, trades_file: str = None) -> BacktestResult:
+        key = self.key(backtester, prices_file, trades_file)
+        # A run that streams a log has to actually run to write it
+        result = self.get(key) if backtester.log_file is None else None
+        if result is not None:
+            self.hits += 1
+            return result
+
+        self.misses += 1
+        result = backtester.run(prices_file, trades_file)
+        self.put(key, result)
+        return result
+
+    def evict(self) -> None:
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.npz') and '.tmp' not in name:
+                stat = os.stat(os.path.join(self.directory, name))
+                entries.append((stat.st_mtime_ns, stat.st_size, name))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(os.path.join(self.directory, name))
+            total -= size
+
+    def clear(self) -> None:
+        for name in os.listdir(self.directory):
+            if name.endswith('.npz'):
+                os.remove(os.path.join(self.directory, name))
+
+
+def _pack_trades(trades: List[Trade], products: List[str]) -> np.ndarray:
+    codes = {product: i for i, product in enumerate(products)}
+    packed = np.zeros((len(trades), 4), dtype=np.float64)
+    for i, trade in enumerate(trades):
+        signed_quantity = trade.quantity if trade.buyer == 'SUBMISSION' else -trade.quantity
+        packed[i] = (trade.timestamp, codes[trade.symbol], trade.price, signed_quantity)
+    return packed
+
+
+def _unpack_trades(packed: np.ndarray, products: List[str], counterparty: str) -> List[Trade]:
+    trades = []
+    for timestamp, code, price, signed_quantity in packed.tolist():
+        price = int(price) if price.is_integer() else price
+        if signed_quantity > 0:
+            trades.append(Trade(products[int(code)], price, int(signed_quantity), 'SUBMISSION', counterparty, int(timestamp)))
+        else:
+            trades.append(Trade(products[int(code)], price, int(-signed_quantity), counterparty, 'SUBMISSION', int(timestamp)))
+    return trades
+
+
+def pack_result(result: BacktestResult) -> Dict[str, np.ndarray]:
+    """
+    Flattens a result into a few dense arrays: one row per product for pnl, positions and mids,
+    and (timestamp, product code, price, signed quantity) rows for fills and conversions.
+    """
+    products = list(result.products)
+    return {
+        'products': np.array(products, dtype=str),
+        'timestamps': np.array(result.timestamps, dtype=np.int64),
+        'pnl': np.array([result.pnl[product] for product in products], dtype=np.float64).reshape(len(products), -1),
+        'position': np.array([result.position[product] for product in products], dtype=np.int32).reshape(len(products), -1),
+        'mid': np.array([result.mid[product] for product in products], dtype=np.float64).reshape(len(products), -1),
+        'fills': _pack_trades(result.fills, products),
+        'conversions': _pack_trades(result.conversions, products),
+    }
+
+
+def unpack_result(arrays) -> BacktestResult:
+    products = [str(product) for product in arrays['products']]
+    result = BacktestResult(products)
+    result.timestamps = arrays['timestamps'].tolist()
+    for i, product in enumerate(products):
+        result.pnl[product] = arrays['pnl'][i].tolist()
+        result.position[product] = arrays['position'][i].tolist()
+        result.mid[product] = arrays['mid'][i].tolist()
+    result.fills = _unpack_trades(arrays['fills'], products, '')
+    result.conversions = _unpack_trades(arrays['conversions'], products, 'CONVERSION')
+    return result
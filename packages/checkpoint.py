@@ -0,0 +1,187 @@
+import hashlib
+import json
+import os
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from datamodel import Product, Trade
+from .backtester import BackTester, BacktestResult, _Account
+from .cache import backtest_key
+
+CHECKPOINT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '.cache', 'checkpoints')
+
+# Bump whenever the layout changes, so stale checkpoints are ignored
+CHECKPOINT_VERSION = 1
+
+# Ticks between checkpoints
+CHECKPOINT_INTERVAL = 1000
+
+# Every attribute of an _Account that a checkpoint saves or rebuilds. Orders do not rest between
+# ticks, so there is no book of ours among them; save refuses an account holding anything else
+ACCOUNT_STATE = {'backtester', 'trader', 'position', 'cash', 'own_trades', 'trader_data', 'result', 'log'}
+
+
+def _trades(trades: List[Trade]) -> List[list]:
+    return [[trade.symbol, trade.price, trade.quantity, trade.buyer, trade.seller, trade.timestamp] for trade in trades]
+
+
+def _rng_states(trader) -> List[Any]:
+    """The bit generator state of every strategy stream of a trader, None for streams never drawn from."""
+    return [strategy._rng.bit_generator.state if strategy._rng is not None else None
+            for strategy in getattr(trader, 'strategies', [])]
+
+
+def _restore_rng_states(trader, states: List[Any]) -> None:
+    for strategy, state in zip(getattr(trader, 'strategies', []), states):
+        if state is not None:
+            strategy.rng.bit_generator.state = state
+
+
+class Checkpointer:
+    """Writes the complete state of a lockstep run every `every` ticks, so it can restart from any of them."""
+
+    def __init__(self, directory: str = CHECKPOINT_DIR, every: int = CHECKPOINT_INTERVAL) -> None:
+        self.directory = directory
+        self.every = every
+        self.written = 0
+        os.makedirs(directory, exist_ok=True)
+
+    # Derived from the ResultCache keys, so editing the trader, its parameters, the seed or the
+    # data starts a new run instead of resuming a stale one
+    def key(self, backtesters: List[BackTester], prices_file: str, trades_file: str = None) -> str:
+        keys = [backtest_key(backtester, prices_file, trades_file) for backtester in backtesters]
+        return hashlib.sha256(json.dumps([CHECKPOINT_VERSION] + keys).encode()).hexdigest()[:24]
+
+    def path(self, key: str, tick: int) -> str:
+        return os.path.join(self.directory, f'{key}.tick{tick:06d}.npz')
+
+    def ticks(self, key: str) -> List[int]:
+        """Ticks the run has checkpoints after, ascending."""
+        prefix = key + '.tick'
+        return sorted(int(name[len(prefix):-len('.npz')]) for name in os.listdir(self.directory)
+                      if name.startswith(prefix) and name.endswith('.npz') and '.tmp' not in name)
+
+    def latest(self, key: str, at: int = None) -> int:
+        """The last checkpointed tick, or the last at or before tick `at`; None when there is none."""
+        ticks = [tick for tick in self.ticks(key) if at is None or tick <= at]
+        return ticks[-1] if ticks else None
+
+    def save(self, key: str, tick: int, mid_prices: Dict[Product, float], accounts: List[_Account]) -> None:
+        """Checkpoints the state after `tick` ticks have been simulated."""
+        # Strategies keep their state in traderData and the random streams are saved, so a
+        # fresh trader picks up where the old one stopped
+        for account in accounts:
+            unsaved = set(vars(account)) - ACCOUNT_STATE
+            if unsaved:
+                raise ValueError(f"cannot checkpoint account state {sorted(unsaved)}")
+        products = list(accounts[0].result.products)
+        header = {
+            'version': CHECKPOINT_VERSION,
+            'tick': tick,
+            'products': products,
+            'mid_prices': mid_prices,
+            'accounts': [{
+                'position': account.position,
+                'cash': account.cash,
+                'trader_data': account.trader_data,
+                'own_trades': {symbol: _trades(trades) for symbol, trades in account.own_trades.items()},
+                'fills': _trades(account.result.fills),
+                'conversions': _trades(account.result.conversions),
+                'fill_rng': account.backtester.fill_rng.bit_generator.state,
+                'rngs': _rng_states(account.trader),
+            } for account in accounts],
+        }
+        # The per-tick series go in as dense arrays, the rest as a small JSON header
+        series = {
+            name: np.array([[getattr(account.result, name)[product] for product in products] for account in accounts],
+                           dtype=dtype).reshape(len(accounts), len(products), -1)
+            for name, dtype in (('pnl', np.float64), ('position', np.int32), ('mid', np.float64))
+        }
+        path = self.path(key, tick)
+        temporary = path + '.tmp.npz'
+        np.savez_compressed(temporary, header=np.frombuffer(json.dumps(header).encode(), dtype=np.uint8),
+                            timestamps=np.array(accounts[0].result.timestamps, dtype=np.int64), **series)
+        os.replace(temporary, path)
+        self.written += 1
+
+    def restore(self, key: str, tick: int, accounts: List[_Account]) -> Tuple[int, Dict[Product, float]]:
+        """
+        Puts fresh accounts back into their state after `tick` ticks, and returns that tick
+        count with the last mids, to carry on from.
+        """
+        with np.load(self.path(key, tick)) as arrays:
+            header = json.loads(arrays['header'].tobytes().decode())
+            timestamps = arrays['timestamps'].tolist()
+            series = {name: arrays[name] for name in ('pnl', 'position', 'mid')}
+        if header['version'] != CHECKPOINT_VERSION:
+            raise ValueError(f"checkpoint version {header['version']}, expected {CHECKPOINT_VERSION}")
+        if len(header['accounts']) != len(accounts):
+            raise ValueError(f"checkpoint holds {len(header['accounts'])} traders, the run has {len(accounts)}")
+
+        products = header['products']
+        for index, (account, saved) in enumerate(zip(accounts, header['accounts'])):
+            account.position = saved['position']
+            account.cash = saved['cash']
+            account.trader_data = saved['trader_data']
+            account.own_trades = {symbol: [Trade(*trade) for trade in trades] for symbol, trades in saved['own_trades'].items()}
+            result = BacktestResult(products)
+            result.timestamps = list(timestamps)
+            for i, product in enumerate(products):
+                result.pnl[product] = series['pnl'][index, i].tolist()
+                result.position[product] = series['position'][index, i].tolist()
+                result.mid[product] = series['mid'][index, i].tolist()
+            result.fills = [Trade(*trade) for trade in saved['fills']]
+            result.conversions = [Trade(*trade) for trade in saved['conversions']]
+            account.result = result
+            account.backtester.fill_rng.bit_generator.state = saved['fill_rng']
+            _restore_rng_states(account.trader, saved['rngs'])
+        return header['tick'], header['mid_prices']
+
+    def clear(self, key: str = None) -> None:
+        """Removes the checkpoints of one run, or of every run."""
+        for name in os.listdir(self.directory):
+            if name.endswith('.npz') and (key is None or name.startswith(key + '.')):
+                os.remove(os.path.join(self.directory, name))
+
+
+class JobJournal:
+    """Append-only JSON lines of a sweep's finished jobs, so a restarted sweep only runs what is missing."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.results: Dict[str, Any] = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                content = f.read()
+            if not content.endswith("\n"):
+                # Drop a torn last line, so the next job starts a line of its own
+                content = content[:content.rfind("\n") + 1]
+                with open(path, 'w') as f:
+                    f.write(content)
+            for line in content.splitlines():
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                self.results[entry['key']] = entry['result']
+        self.reused = 0
+
+    @staticmethod
+    def key(*parts: Any) -> str:
+        return hashlib.sha256(json.dumps(parts, sort_keys=True, default=repr).encode()).hexdigest()
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.results
+
+    def get(self, key: str) -> Any:
+        self.reused += 1
+        return self.results[key]
+
+    def put(self, key: str, result: Any) -> None:
+        self.results[key] = result
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(self.path, 'a') as f:
+            f.write(json.dumps({'key': key, 'result': result}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
@@ -1,8 +1,39 @@
 from datamodel import OrderDepth, Observation, Symbol, Listing, Trade, Product, Position, TradingState, Order
-from typing import Dict, List
+from typing import Any, Dict, List
+import io
+import json
+import os
 import pandas as pd
 import numpy as np
 
+from .validation import QualityReport, check_file
+
+LEVELS = 3
+PRICE_COLUMNS = [f'{side}_price_{i}' for side in ('bid', 'ask') for i in range(1, LEVELS + 1)]
+VOLUME_COLUMNS = [f'{side}_volume_{i}' for side in ('bid', 'ask') for i in range(1, LEVELS + 1)]
+
+# Prices fit in int32 and volumes in int16; the nullable types keep a mask for empty levels
+# instead of falling back to float64 NaNs
+BOOK_DTYPES = {
+    'day': 'int8',
+    'timestamp': 'int32',
+    'product': 'category',
+    **{column: 'Int32' for column in PRICE_COLUMNS},
+    **{column: 'Int16' for column in VOLUME_COLUMNS},
+    'mid_price': 'float64',
+    'profit_and_loss': 'float64',
+}
+
+
+def resident_memory() -> int:
+    """Resident set size of this process in bytes, or 0 where /proc is not available."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return 0
+
+
 # This class reads in data from a csv file and stores a list of TradingState objects that can be used for testing
 ##########################################
 # Trading State Information
@@ -18,10 +49,15 @@ import numpy as np
 
 class DataParser:
 
+    # Book snapshots sorted by timestamp, so every timestamp is one contiguous block of rows
     raw_data: pd.DataFrame
 
-    # Each key in the map is a unique timestamp, representing various TradingState objects
-    trading_data: Dict[int, pd.DataFrame]
+    # Unique timestamps in order, and the first row of each in raw_data plus a final end offset
+    timestamps: np.ndarray
+    offsets: np.ndarray
+
+    # What the validator found in, and repaired about, the last parsed csv
+    quality: QualityReport
 
     # Maps time_stamp -> [product_name -> OrderDepth]
     order_depths: Dict[int, Dict[str, OrderDepth]]
@@ -29,56 +65,113 @@ class DataParser:
     # Maps time_stamp -> TradingState
     trading_states: Dict[int, TradingState]
 
+    # Maps time_stamp -> [product_name -> market trades printed at that timestamp]
+    market_trades: Dict[int, Dict[str, List[Trade]]]
+
+    # Maps time_stamp -> [product_name -> our own fills at that timestamp], only filled from exchange logs
+    own_trades: Dict[int, Dict[str, List[Trade]]]
+
+    # The {sandboxLog, lambdaLog, timestamp} entries of an exchange log, in order
+    sandbox_logs: List[Dict[str, Any]]
+
     def __init__(self) -> None:
-        self.raw_data = {}
-        self.trading_data = {}
+        self.raw_data = pd.DataFrame()
+        self.timestamps = np.empty(0, dtype=np.int32)
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.quality = None
         self.order_depths = {}
         self.trading_states = {}
-
-    def parse_csv(self, input_file: str):
-        self.raw_data = pd.read_csv(input_file, delimiter=';')
-        self.raw_data.replace('', np.nan)
-        self.trading_data = {time: group for time, group in self.raw_data.groupby('timestamp')}
+        self.market_trades = {}
+        self.own_trades = {}
+        self.sandbox_logs = []
+
+    def parse_csv(self, input_file: str, validate: bool = True):
+        raw_data = pd.read_csv(input_file, delimiter=';', dtype=BOOK_DTYPES)
+        if validate:
+            # Crossed, zero-mid and missing snapshots are replaced before they can reach a trader
+            raw_data, self.quality = check_file(input_file, raw_data)
+        self.set_raw_data(raw_data)
+
+    def set_raw_data(self, raw_data: pd.DataFrame):
+        self.raw_data = raw_data.sort_values('timestamp', kind='stable').reset_index(drop=True)
+        self.timestamps, starts = np.unique(self.raw_data['timestamp'].to_numpy(), return_index=True)
+        self.offsets = np.append(starts, len(self.raw_data))
+
+    def rows(self, timestamp: int) -> pd.DataFrame:
+        """The snapshots of every product at one timestamp, as a view of raw_data."""
+        i = int(np.searchsorted(self.timestamps, timestamp))
+        if i == len(self.timestamps) or self.timestamps[i] != timestamp:
+            return self.raw_data.iloc[0:0]
+        return self.raw_data.iloc[self.offsets[i]:self.offsets[i + 1]]
+
+    def memory_usage(self) -> Dict[str, int]:
+        """Bytes held by the parsed book, its timestamp index, and the whole process."""
+        return {
+            'raw_data': int(self.raw_data.memory_usage(deep=True).sum()),
+            'index': int(self.timestamps.nbytes + self.offsets.nbytes),
+            'resident': resident_memory(),
+        }
+
+    def parse_trades_csv(self, input_file: str):
+        trades = pd.read_csv(input_file, delimiter=';', keep_default_na=False)
+        self.market_trades = {time: self.extract_market_trades(group) for time, group in trades.groupby('timestamp')}
+
+    def parse_log(self, input_file: str):
+        """
+        Reads an exchange log: the sandbox entries, the activities log as raw_data (same columns
+        as a prices file) and the trade history, split into our own fills and market trades.
+        """
+        with open(input_file) as f:
+            content = f.read()
+        sandbox, rest = content.split('Activities log:', 1)
+        activities, history = rest.split('Trade History:', 1)
+
+        decoder = json.JSONDecoder()
+        sandbox = sandbox.replace('Sandbox logs:', '', 1).strip()
+        position = 0
+        while position < len(sandbox):
+            entry, position = decoder.raw_decode(sandbox, position)
+            self.sandbox_logs.append(entry)
+            while position < len(sandbox) and sandbox[position].isspace():
+                position += 1
+
+        self.set_raw_data(pd.read_csv(io.StringIO(activities.strip()), delimiter=';', dtype=BOOK_DTYPES))
+
+        trades = pd.DataFrame(json.loads(history), columns=['timestamp', 'buyer', 'seller', 'symbol', 'currency', 'price', 'quantity'])
+        own = (trades['buyer'] == 'SUBMISSION') | (trades['seller'] == 'SUBMISSION')
+        self.own_trades = {time: self.extract_market_trades(group) for time, group in trades[own].groupby('timestamp')}
+        self.market_trades = {time: self.extract_market_trades(group) for time, group in trades[~own].groupby('timestamp')}
 
     def write_csv(self, output_file: str):
         self.raw_data.to_csv(output_file, sep=";", index=False)
 
     def extract_order_depths(self):
-    # Assuming self.order_depths is correctly initialized as an empty dict before this method is called
-    
-        for timestamp, df in self.trading_data.items():
-            if timestamp not in self.order_depths:
-                self.order_depths[timestamp] = {}
-
-            for product in df['product'].unique():
-                if product not in self.order_depths[timestamp]:
-                    self.order_depths[timestamp][product] = OrderDepth()
-
-            for _, row in df.iterrows():
-                product = row['product']
-                order_depth = self.order_depths[timestamp][product]
-                
-                # Process buy orders
-                for i in range(1, 4):
-                    bid_price_key = f'bid_price_{i}'
-                    bid_volume_key = f'bid_volume_{i}'
-                    if pd.notnull(row[bid_price_key]) and pd.notnull(row[bid_volume_key]):
-                        bid_price = int(row[bid_price_key])
-                        bid_volume = int(row[bid_volume_key])
-                        order_depth.buy_orders[bid_price] = order_depth.buy_orders.get(bid_price, 0) + bid_volume
-                
-                # Process sell orders
-                for i in range(1, 4):
-                    ask_price_key = f'ask_price_{i}'
-                    ask_volume_key = f'ask_volume_{i}'
-                    if pd.notnull(row[ask_price_key]) and pd.notnull(row[ask_volume_key]):
-                        ask_price = int(row[ask_price_key])
-                        ask_volume = int(row[ask_volume_key])
-                        order_depth.sell_orders[ask_price] = order_depth.sell_orders.get(ask_price, 0) + ask_volume
-        
-        # No need for the incorrect self.order_depths[product] = order_depth line
-
-        # If you need to return self.order_depths, uncomment the next line:
+        products = self.raw_data['product'].astype(str).tolist()
+        levels = {}
+        for column in PRICE_COLUMNS + VOLUME_COLUMNS:
+            values = self.raw_data[column]
+            levels[column] = (values.to_numpy(dtype=np.int64, na_value=0).tolist(), values.notna().to_numpy().tolist())
+
+        for i, timestamp in enumerate(self.timestamps.tolist()):
+            depths = self.order_depths.setdefault(timestamp, {})
+            for row in range(self.offsets[i], self.offsets[i + 1]):
+                order_depth = depths.get(products[row])
+                if order_depth is None:
+                    order_depth = depths[products[row]] = OrderDepth()
+
+                for level in range(1, LEVELS + 1):
+                    prices, price_present = levels[f'bid_price_{level}']
+                    volumes, volume_present = levels[f'bid_volume_{level}']
+                    if price_present[row] and volume_present[row]:
+                        order_depth.buy_orders[prices[row]] = order_depth.buy_orders.get(prices[row], 0) + volumes[row]
+
+                # Sell volumes are negative in an OrderDepth, as the exchange sends them
+                for level in range(1, LEVELS + 1):
+                    prices, price_present = levels[f'ask_price_{level}']
+                    volumes, volume_present = levels[f'ask_volume_{level}']
+                    if price_present[row] and volume_present[row]:
+                        order_depth.sell_orders[prices[row]] = order_depth.sell_orders.get(prices[row], 0) - abs(volumes[row])
+
         return self.order_depths
 
     
@@ -89,7 +182,11 @@ class DataParser:
         pass
 
     def extract_market_trades(self, df) -> Dict[Symbol, List[Trade]]:
-        pass
+        market_trades: Dict[Symbol, List[Trade]] = {}
+        for row in df.itertuples(index=False):
+            trade = Trade(row.symbol, int(float(row.price)), int(row.quantity), str(row.buyer), str(row.seller), int(row.timestamp))
+            market_trades.setdefault(row.symbol, []).append(trade)
+        return market_trades
 
     def extract_positions(self, df) -> Dict[Product, Position]:
         pass
@@ -98,27 +195,27 @@ class DataParser:
         pass
 
     def get_trading_states(self) -> Dict[int, TradingState]:
-        for timestamp, df in self.trading_data.items():
+        order_depths = self.extract_order_depths()
+        previous_timestamp = None
+        for timestamp in self.timestamps.tolist():
             trader_data = ""
             # listings = self.extract_listings(df)
-            order_depths = self.extract_order_depths()
             # own_trades = self.extract_own_trades(df)
-            # market_trades = self.extract_market_trades(df)
             # position = self.extract_positions(df)
-            # observations = self.extract_observations(df)
 
             listings = {}
             own_trades = {}
-            market_trades = {}
+            # The exchange hands over the trades that printed since the previous state
+            market_trades = self.market_trades.get(previous_timestamp, {})
             position = {}
-            observation = None
+            observation = Observation({}, {})
             
             # Create a new TradingState object
             trading_state = TradingState(
                 traderData=trader_data,
                 timestamp=timestamp,
                 listings=listings,
-                order_depths=order_depths,
+                order_depths=order_depths[timestamp],
                 own_trades=own_trades,
                 market_trades=market_trades,
                 position=position,
@@ -127,5 +224,6 @@ class DataParser:
 
             # Add the new TradingState to the dictionary
             self.trading_states[timestamp] = trading_state
+            previous_timestamp = timestamp
 
-            return self.trading_states
\ No newline at end of file
+        return self.trading_states
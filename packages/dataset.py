@@ -0,0 +1,153 @@
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .backtester import DATA_DIR
+
+# Timestamps of a day stay below this, so day * DAY_LENGTH + timestamp orders ticks across days
+DAY_LENGTH = 10_000_000
+
+# Maps file kind -> columns that identify it
+SCHEMAS = {
+    'book': {'day', 'timestamp', 'product', 'bid_price_1', 'ask_price_1', 'mid_price'},
+    'trades': {'timestamp', 'buyer', 'seller', 'symbol', 'price', 'quantity'},
+    'observations': {'timestamp', 'ORCHIDS', 'TRANSPORT_FEES', 'EXPORT_TARIFF', 'IMPORT_TARIFF', 'DAY'},
+}
+
+# Maps file kind -> the column that holds the product, if it has one
+PRODUCT_COLUMNS = {'book': 'product', 'trades': 'symbol', 'observations': None}
+
+
+def sniff(path: str) -> str:
+    """Classifies a data file by its header as one of SCHEMAS, or None when nothing matches."""
+    with open(path) as f:
+        header = set(f.readline().strip().split(';'))
+    for kind, columns in SCHEMAS.items():
+        if columns <= header:
+            return kind
+    return None
+
+
+class DataFile:
+
+    def __init__(self, path: str, kind: str, round: int, day: int = None) -> None:
+        self.path = path
+        self.kind = kind
+        # Round 0 is the tutorial
+        self.round = round
+        # None when the day is only known from the file's own day column
+        self.day = day
+
+    def __repr__(self) -> str:
+        return f'DataFile({self.kind}, round={self.round}, day={self.day}, {os.path.basename(self.path)})'
+
+    def read(self) -> pd.DataFrame:
+        frame = pd.read_csv(self.path, delimiter=';', keep_default_na=self.kind != 'trades')
+        if self.kind == 'observations':
+            frame = frame.rename(columns={'DAY': 'day'})
+        elif 'day' not in frame:
+            frame.insert(0, 'day', self.day)
+        return frame
+
+
+def scan(directory: str = DATA_DIR) -> List[DataFile]:
+    """Finds and classifies every csv under directory, whatever it is named."""
+    files = []
+    for folder, _, names in os.walk(directory):
+        for name in sorted(names):
+            if not name.endswith('.csv'):
+                continue
+            path = os.path.join(folder, name)
+            kind = sniff(path)
+            if kind is None:
+                continue
+            round_match = re.search(r'round[-_](\d+)', path)
+            day_match = re.search(r'day_(-?\d+)', name)
+            files.append(DataFile(path, kind, int(round_match.group(1)) if round_match else 0,
+                                  int(day_match.group(1)) if day_match else None))
+    return files
+
+
+class _Table:
+    """All rows of one kind and round, sorted by (day, timestamp) with the sort keys kept aside."""
+
+    def __init__(self, frame: pd.DataFrame) -> None:
+        frame = frame.sort_values(['day', 'timestamp'], kind='stable').reset_index(drop=True)
+        self.frame = frame
+        self.keys = frame['day'].to_numpy(dtype=np.int64) * DAY_LENGTH + frame['timestamp'].to_numpy(dtype=np.int64)
+        self.days = sorted(int(day) for day in frame['day'].unique())
+
+    def rows(self, day: int, time_range: Tuple[int, int] = None) -> slice:
+        start, end = time_range if time_range is not None else (0, DAY_LENGTH - 1)
+        return slice(int(np.searchsorted(self.keys, day * DAY_LENGTH + start, side='left')),
+                     int(np.searchsorted(self.keys, day * DAY_LENGTH + end, side='right')))
+
+
+class Dataset:
+    """Every round's books, trades and observations behind one query API, e.g. Dataset().load(3, days=[0])."""
+    # Files are classified by header, read in parallel on first use and kept sorted by (day,
+    # timestamp), so a time range is a slice rather than a scan
+
+    def __init__(self, directory: str = DATA_DIR, workers: int = None) -> None:
+        self.directory = directory
+        self.workers = workers
+        self.files = scan(directory)
+        # Maps (kind, round) -> its rows
+        self._tables: Dict[Tuple[str, int], _Table] = {}
+
+    def rounds(self, kind: str = 'book') -> List[int]:
+        return sorted({file.round for file in self.files if file.kind == kind})
+
+    def days(self, round: int, kind: str = 'book') -> List[int]:
+        return self._table(kind, round).days
+
+    def ingest(self, rounds: Iterable[int] = None) -> None:
+        """Reads every file of the given rounds (all by default) that is not loaded yet, in parallel."""
+        wanted = [file for file in self.files
+                  if (rounds is None or file.round in rounds) and (file.kind, file.round) not in self._tables]
+        if not wanted:
+            return
+
+        # pandas parses csv without holding the GIL, so threads are enough
+        with ThreadPoolExecutor(max_workers=self.workers or min(len(wanted), os.cpu_count() or 1)) as pool:
+            frames = list(pool.map(DataFile.read, wanted))
+
+        groups: Dict[Tuple[str, int], List[pd.DataFrame]] = {}
+        for file, frame in zip(wanted, frames):
+            groups.setdefault((file.kind, file.round), []).append(frame)
+        for (kind, round), group in groups.items():
+            frame = pd.concat(group, ignore_index=True)
+            product_column = PRODUCT_COLUMNS[kind]
+            if product_column is not None:
+                frame[product_column] = frame[product_column].astype('category')
+            self._tables[(kind, round)] = _Table(frame)
+
+    def _table(self, kind: str, round: int) -> _Table:
+        if kind not in SCHEMAS:
+            raise ValueError(f"unknown kind {kind!r}, expected one of {sorted(SCHEMAS)}")
+        if (kind, round) not in self._tables:
+            self.ingest([round])
+        if (kind, round) not in self._tables:
+            raise KeyError(f"round {round} has no {kind} data")
+        return self._tables[(kind, round)]
+
+    def load(self, round: int, days: Iterable[int] = None, products: Iterable[str] = None, columns: Iterable[str] = None,
+             time_range: Tuple[int, int] = None, kind: str = 'book') -> pd.DataFrame:
+        """Rows of one round indexed by (day, timestamp); time_range is inclusive and applies within each day."""
+        # products is ignored for observations, which only cover ORCHIDS
+        table = self._table(kind, round)
+        days = table.days if days is None else list(days)
+        frame = pd.concat([table.frame.iloc[table.rows(day, time_range)] for day in days] or [table.frame.iloc[:0]])
+
+        product_column = PRODUCT_COLUMNS[kind]
+        if products is not None and product_column is not None:
+            frame = frame[frame[product_column].isin(list(products))]
+
+        frame = frame.set_index(['day', 'timestamp'])
+        if columns is not None:
+            frame = frame[[column for column in columns if column not in ('day', 'timestamp')]]
+        return frame
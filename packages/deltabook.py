@@ -0,0 +1,241 @@
+import argparse
+import os
+import time
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+
+from datamodel import OrderDepth, Symbol
+from .backtester import available_days, data_files
+from .cache import file_hash
+from .dataparser import LEVELS, PRICE_COLUMNS, VOLUME_COLUMNS, DataParser
+
+BOOK_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '.cache', 'books')
+
+# Bump whenever the encoding changes, so stale files are rebuilt
+BOOK_VERSION = 1
+
+# Ticks between full snapshots, which bound how far seek() has to replay
+KEYFRAME_INTERVAL = 1000
+
+BID, ASK = 0, 1
+
+# Volume of a level that disappeared; the books do contain levels with volume 0
+REMOVED = np.iinfo(np.int16).min
+
+
+def _levels(parser: DataParser) -> List[Tuple[Dict[int, int], Dict[int, int]]]:
+    """The (buy_orders, sell_orders) of every raw_data row, built like DataParser.extract_order_depths."""
+    columns = {}
+    for column in PRICE_COLUMNS + VOLUME_COLUMNS:
+        values = parser.raw_data[column]
+        columns[column] = (values.to_numpy(dtype=np.int64, na_value=0).tolist(), values.notna().to_numpy().tolist())
+
+    books = []
+    for row in range(len(parser.raw_data)):
+        buy_orders: Dict[int, int] = {}
+        sell_orders: Dict[int, int] = {}
+        for level in range(1, LEVELS + 1):
+            prices, price_present = columns[f'bid_price_{level}']
+            volumes, volume_present = columns[f'bid_volume_{level}']
+            if price_present[row] and volume_present[row]:
+                buy_orders[prices[row]] = buy_orders.get(prices[row], 0) + volumes[row]
+            prices, price_present = columns[f'ask_price_{level}']
+            volumes, volume_present = columns[f'ask_volume_{level}']
+            if price_present[row] and volume_present[row]:
+                sell_orders[prices[row]] = sell_orders.get(prices[row], 0) - abs(volumes[row])
+        books.append((buy_orders, sell_orders))
+    return books
+
+
+class DeltaBook:
+    """A day of order books stored as per-tick level changes, with a full keyframe every KEYFRAME_INTERVAL ticks."""
+
+    ARRAYS = ('timestamps', 'offsets', 'keyframes', 'base', 'book', 'price', 'volume')
+
+    def __init__(self, products: List[Symbol], arrays: Dict[str, np.ndarray]) -> None:
+        self.products = products
+        self.timestamps: np.ndarray = arrays['timestamps']
+        # First event of every tick, plus a final end offset
+        self.offsets: np.ndarray = arrays['offsets']
+        # Whether a tick starts from empty books
+        self.keyframes: np.ndarray = arrays['keyframes']
+        # Lowest price of every product, which event prices are offsets from
+        self.base: np.ndarray = arrays['base']
+        # One 5-byte entry per level change: product code * 2 + side, price - base, and the
+        # volume, signed as in OrderDepth
+        self.book: np.ndarray = arrays['book']
+        self.price: np.ndarray = arrays['price']
+        self.volume: np.ndarray = arrays['volume']
+
+    @classmethod
+    def encode(cls, parser: DataParser, keyframe_interval: int = KEYFRAME_INTERVAL) -> 'DeltaBook':
+        products = sorted(str(product) for product in parser.raw_data['product'].unique())
+        codes = {product: code for code, product in enumerate(products)}
+        row_products = parser.raw_data['product'].astype(str).tolist()
+        books = _levels(parser)
+
+        events: List[Tuple[int, int, int, int]] = []
+        offsets = [0]
+        keyframes = []
+        previous = [({}, {}) for _ in products]
+        for tick in range(len(parser.timestamps)):
+            keyframe = tick % keyframe_interval == 0
+            keyframes.append(keyframe)
+            if keyframe:
+                previous = [({}, {}) for _ in products]
+            for row in range(parser.offsets[tick], parser.offsets[tick + 1]):
+                code = codes[row_products[row]]
+                for side, before, after in ((BID, previous[code][0], books[row][0]), (ASK, previous[code][1], books[row][1])):
+                    for price, volume in after.items():
+                        if before.get(price) != volume:
+                            events.append((code, side, price, volume))
+                    for price in before:
+                        if price not in after:
+                            events.append((code, side, price, REMOVED))
+                previous[code] = books[row]
+            offsets.append(len(events))
+
+        columns = np.array(events, dtype=np.int64).reshape(-1, 4)
+        base = np.zeros(len(products), dtype=np.int64)
+        for code in range(len(products)):
+            prices = columns[columns[:, 0] == code, 2]
+            base[code] = prices.min() if len(prices) else 0
+        price = columns[:, 2] - base[columns[:, 0]]
+        if len(price) and price.max() > np.iinfo(np.int16).max:
+            raise ValueError("a product's prices span more than an int16 offset can hold")
+        return cls(products, {
+            'timestamps': parser.timestamps.astype(np.int32),
+            'offsets': np.array(offsets, dtype=np.int32),
+            'keyframes': np.array(keyframes, dtype=bool),
+            'base': base.astype(np.int32),
+            'book': (columns[:, 0] * 2 + columns[:, 1]).astype(np.int8),
+            'price': price.astype(np.int16),
+            'volume': columns[:, 3].astype(np.int16),
+        })
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # np.savez appends .npz to names without it, so write to a name that already has it
+        temporary = path + '.tmp.npz'
+        np.savez(temporary, products=np.array(self.products), **{name: getattr(self, name) for name in self.ARRAYS})
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'DeltaBook':
+        with np.load(path) as arrays:
+            return cls([str(product) for product in arrays['products']], {name: arrays[name] for name in cls.ARRAYS})
+
+    @classmethod
+    def open(cls, prices_file: str, directory: str = BOOK_DIR) -> 'DeltaBook':
+        """Loads the encoded book of a prices file, encoding it first when the file changed."""
+        name = os.path.splitext(os.path.basename(prices_file))[0]
+        path = os.path.join(directory, f'{name}.v{BOOK_VERSION}.{file_hash(prices_file)[:16]}.npz')
+        if os.path.exists(path):
+            return cls.load(path)
+        parser = DataParser()
+        parser.parse_csv(prices_file)
+        book = cls.encode(parser)
+        book.save(path)
+        return book
+
+    def events(self) -> int:
+        return len(self.price)
+
+    def nbytes(self) -> int:
+        return sum(getattr(self, name).nbytes for name in self.ARRAYS)
+
+    def replay(self, start: int = 0) -> Iterator[Tuple[int, Dict[Symbol, OrderDepth]]]:
+        """Yields (timestamp, order depths) from tick `start` on; the depths are reused, copy them to keep them."""
+        depths = {product: OrderDepth() for product in self.products}
+        # Indexed by book code, i.e. product code * 2 + side
+        books = [levels for product in self.products for levels in (depths[product].buy_orders, depths[product].sell_orders)]
+        book = self.book.tolist()
+        price = (self.price.astype(np.int64) + self.base.astype(np.int64)[self.book // 2]).tolist()
+        volume = self.volume.tolist()
+        offsets = self.offsets.tolist()
+        keyframes = self.keyframes.tolist()
+
+        first = start
+        while not keyframes[first]:
+            first -= 1
+        for tick, timestamp in enumerate(self.timestamps.tolist()[first:], first):
+            if keyframes[tick]:
+                for levels in books:
+                    levels.clear()
+            for event in range(offsets[tick], offsets[tick + 1]):
+                levels = books[book[event]]
+                if volume[event] == REMOVED:
+                    del levels[price[event]]
+                else:
+                    levels[price[event]] = volume[event]
+            if tick >= start:
+                yield timestamp, depths
+
+    def seek(self, tick: int) -> Dict[Symbol, OrderDepth]:
+        """Fresh order depths as of tick number `tick`, replayed from the keyframe before it."""
+        _, depths = next(self.replay(tick))
+        return depths
+
+
+def snapshot_arrays(parser: DataParser) -> Dict[str, np.ndarray]:
+    """The same books stored as full snapshots, one row of every level per product and tick."""
+    arrays = {
+        'timestamps': parser.raw_data['timestamp'].to_numpy(dtype=np.int32),
+        'product': parser.raw_data['product'].cat.codes.to_numpy().astype(np.int8),
+    }
+    for column in PRICE_COLUMNS:
+        arrays[column] = parser.raw_data[column].to_numpy(dtype=np.int32, na_value=0)
+    for column in VOLUME_COLUMNS:
+        arrays[column] = parser.raw_data[column].to_numpy(dtype=np.int16, na_value=0)
+    return arrays
+
+
+def compare(prices_file: str) -> Dict[str, float]:
+    """On-disk size and replay throughput of full snapshots against the delta encoding."""
+    parser = DataParser()
+    parser.parse_csv(prices_file)
+    book = DeltaBook.encode(parser)
+    ticks = len(parser.timestamps)
+
+    snapshots = snapshot_arrays(parser)
+    start = time.perf_counter()
+    parser.extract_order_depths()
+    snapshot_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in book.replay():
+        pass
+    delta_seconds = time.perf_counter() - start
+
+    return {
+        'ticks': ticks,
+        'events': book.events(),
+        'csv_bytes': os.path.getsize(prices_file),
+        'snapshot_bytes': sum(array.nbytes for array in snapshots.values()),
+        'delta_bytes': book.nbytes(),
+        'snapshot_ticks_per_sec': ticks / snapshot_seconds,
+        'delta_ticks_per_sec': ticks / delta_seconds,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare delta-encoded order books with full snapshots")
+    parser.add_argument('rounds', nargs='*', type=int, default=[1, 2, 3])
+    args = parser.parse_args()
+
+    for round in args.rounds:
+        # Round 2's book is not named like the others
+        files = [data_files(round, day)[0] for day in available_days(round)] or [
+            os.path.join(os.path.dirname(data_files(round, 0)[0]), f'orderbook_round_{round}_day_1.csv')]
+        for prices_file in files:
+            report = compare(prices_file)
+            print(f"{os.path.basename(prices_file)}: {report['ticks']} ticks, {report['events']} level changes; "
+                  f"csv {report['csv_bytes'] / 1e6:.2f}MB, snapshots {report['snapshot_bytes'] / 1e6:.2f}MB, "
+                  f"deltas {report['delta_bytes'] / 1e6:.2f}MB ({report['delta_bytes'] / report['snapshot_bytes']:.0%}); "
+                  f"replay {report['snapshot_ticks_per_sec']:,.0f} ticks/s rebuilt, "
+                  f"{report['delta_ticks_per_sec']:,.0f} ticks/s in place")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,219 @@
+import argparse
+import asyncio
+import contextlib
+import importlib
+import io
+import json
+import os
+import sys
+import time
+import traceback
+from typing import Dict, List
+
+from datamodel import Order, ProsperityEncoder, Symbol, TradingState
+from framework import Logger, StrategyTrader
+from .backtester import BackTester, data_files
+from .dataparser import DataParser
+from .replay import decode_state
+
+ROOT_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+# The lambda's limits: wall time of one Trader.run call and characters of log kept per call
+DEADLINE = 0.9
+MAX_LOG_LENGTH = 3750
+
+_compressor = Logger()
+
+
+def serve(trader_module: str) -> None:
+    """The worker side: one compressed state per stdin line in, one JSON response with the trader's log out."""
+    protocol = sys.stdout
+    trader = importlib.import_module(trader_module).Trader()
+    protocol.write(json.dumps({'ready': True}) + '\n')
+    protocol.flush()
+    for line in sys.stdin:
+        request = json.loads(line)
+        output = io.StringIO()
+        try:
+            with contextlib.redirect_stdout(output):
+                orders, conversions, trader_data = trader.run(decode_state(request['state']))
+            response = {
+                'id': request['id'],
+                'orders': [[order.symbol, order.price, order.quantity] for symbol_orders in orders.values() for order in symbol_orders],
+                'conversions': conversions,
+                'traderData': trader_data,
+                'log': output.getvalue(),
+            }
+        except Exception:
+            response = {'id': request['id'], 'error': traceback.format_exc(), 'log': output.getvalue()}
+        protocol.write(json.dumps(response, cls=ProsperityEncoder, separators=(",", ":")) + '\n')
+        protocol.flush()
+
+
+class ExchangeReport:
+
+    def __init__(self) -> None:
+        self.ticks = 0
+        # Ticks whose response missed the deadline, and how long those responses took when they came
+        self.timeouts = 0
+        self.late_latencies: List[float] = []
+        # Ticks whose log was longer than the cap and got cut
+        self.truncated = 0
+        self.errors: List[str] = []
+        self.latencies: List[float] = []
+
+    def percentile(self, q: float) -> float:
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q))] if ordered else float('nan')
+
+    def __str__(self) -> str:
+        lines = [
+            f"{self.ticks} ticks, {self.timeouts} timeouts ({len(self.late_latencies)} answered late), "
+            f"{self.truncated} truncated logs, {len(self.errors)} errors",
+            f"latency median {self.percentile(0.5) * 1e3:.2f}ms, p99 {self.percentile(0.99) * 1e3:.2f}ms, "
+            f"max {max(self.latencies, default=float('nan')) * 1e3:.2f}ms",
+        ]
+        if self.late_latencies:
+            lines.append(f"late responses took up to {max(self.late_latencies) * 1e3:.1f}ms")
+        if self.errors:
+            lines.append("first error:\n" + self.errors[0])
+        return "\n".join(lines)
+
+
+class Exchange:
+    """Drives a trader in its own process through a day, one state every `interval` seconds, like the exchange."""
+
+    def __init__(self, trader_module: str, deadline: float = DEADLINE, interval: float = 0.0,
+                 max_log_length: int = MAX_LOG_LENGTH) -> None:
+        self.trader_module = trader_module
+        self.deadline = deadline
+        self.interval = interval
+        self.max_log_length = max_log_length
+        self.backtester = BackTester(trader_module)
+        self.report = ExchangeReport()
+        # Maps request id -> (send time, future of the response)
+        self._pending: Dict[int, tuple] = {}
+
+    async def _read_responses(self, process) -> None:
+        while True:
+            line = await process.stdout.readline()
+            if not line:
+                break
+            response = json.loads(line)
+            sent, future = self._pending.pop(response['id'])
+            future.set_result((response, time.perf_counter() - sent))
+        for _, future in self._pending.values():
+            if not future.done():
+                future.set_exception(EOFError("trader process exited"))
+
+    async def run(self, prices_file: str, trades_file: str = None, ticks: int = None) -> ExchangeReport:
+        parser = DataParser()
+        parser.parse_csv(prices_file)
+        if trades_file is not None:
+            parser.parse_trades_csv(trades_file)
+        states = list(parser.get_trading_states().values())[:ticks]
+
+        paths = [os.path.join(ROOT_DIR, 'src'), ROOT_DIR] + [path for path in os.environ.get('PYTHONPATH', '').split(os.pathsep) if path]
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(paths))
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, '-m', 'packages.exchange', '--serve', self.trader_module,
+            stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE, env=env, cwd=ROOT_DIR, limit=1 << 24)
+        # Start-up is not part of any tick, so the first deadline only starts once the trader is built
+        if not await process.stdout.readline():
+            self.report.errors.append(f"trader process exited with code {await process.wait()} before the first tick")
+            return self.report
+        reader = asyncio.ensure_future(self._read_responses(process))
+
+        limits = StrategyTrader.POSITION_LIMIT
+        position = {product: 0 for product in parser.raw_data['product'].unique()}
+        own_trades = {}
+        trader_data = ""
+        loop = asyncio.get_running_loop()
+        # Response of the last tick that timed out; the next state waits for it, so the worker
+        # is idle whenever a deadline starts and one slow tick cannot push later ones over
+        late = None
+        try:
+            for i, market in enumerate(states):
+                tick_start = loop.time()
+                if late is not None:
+                    try:
+                        self.report.late_latencies.append((await late)[1])
+                    except EOFError:
+                        self.report.errors.append(f"trader process exited with code {await process.wait()} at timestamp {market.timestamp}")
+                        break
+                    late = None
+                state = TradingState(trader_data, market.timestamp, market.listings, market.order_depths,
+                                     own_trades, market.market_trades, dict(position), market.observations)
+                future = loop.create_future()
+                self._pending[i] = (time.perf_counter(), future)
+                request = json.dumps({'id': i, 'state': _compressor.compress_state(state)}, cls=ProsperityEncoder)
+                process.stdin.write(request.encode() + b'\n')
+                await process.stdin.drain()
+
+                self.report.ticks += 1
+                orders: Dict[Symbol, List[Order]] = {}
+                try:
+                    response, latency = await asyncio.wait_for(asyncio.shield(future), self.deadline)
+                    self.report.latencies.append(latency)
+                    if len(response['log']) > self.max_log_length:
+                        self.report.truncated += 1
+                    if 'error' in response:
+                        self.report.errors.append(response['error'])
+                    else:
+                        trader_data = response['traderData']
+                        for symbol, price, quantity in response['orders']:
+                            orders.setdefault(symbol, []).append(Order(symbol, price, quantity))
+                except asyncio.TimeoutError:
+                    self.report.timeouts += 1
+                    late = future
+                except EOFError:
+                    self.report.errors.append(f"trader process exited with code {await process.wait()} at timestamp {market.timestamp}")
+                    break
+
+                own_trades = {}
+                for symbol, symbol_orders in orders.items():
+                    if symbol not in market.order_depths:
+                        continue
+                    fills = self.backtester.match_orders(symbol, symbol_orders, market.order_depths[symbol],
+                                                         parser.market_trades.get(market.timestamp, {}).get(symbol, []),
+                                                         position[symbol], limits.get(symbol), market.timestamp)
+                    for fill in fills:
+                        position[symbol] += fill.quantity if fill.buyer == 'SUBMISSION' else -fill.quantity
+                    if fills:
+                        own_trades[symbol] = fills
+
+                await asyncio.sleep(max(0.0, self.interval - (loop.time() - tick_start)))
+        finally:
+            process.stdin.close()
+            await process.wait()
+            await reader
+        if late is not None and late.exception() is None:
+            self.report.late_latencies.append(late.result()[1])
+        return self.report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run a trader against a local stand-in of the exchange lambda")
+    parser.add_argument('trader', help="trader module, e.g. round1_trader")
+    parser.add_argument('--round', type=int, default=1)
+    parser.add_argument('--day', type=int, default=0)
+    parser.add_argument('--ticks', type=int, help="only the first N ticks of the day")
+    parser.add_argument('--deadline', type=float, default=DEADLINE, help="seconds one Trader.run may take")
+    parser.add_argument('--interval', type=float, default=0.0, help="seconds between ticks, 0 for back to back")
+    parser.add_argument('--max-log-length', type=int, default=MAX_LOG_LENGTH)
+    parser.add_argument('--serve', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.trader)
+        return
+
+    exchange = Exchange(args.trader, args.deadline, args.interval, args.max_log_length)
+    start = time.perf_counter()
+    report = asyncio.run(exchange.run(*data_files(args.round, args.day), ticks=args.ticks))
+    print(report)
+    print(f"ran in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,207 @@
+import argparse
+import json
+import os
+import time
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .backtester import available_days, data_files
+from .cache import file_hash
+from .tape import classify, signals
+
+FEATURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '.cache', 'features')
+
+# Bump whenever a feature definition changes, so stale columns are rebuilt
+FEATURES_VERSION = 2
+
+LEVELS = 3
+
+# Ticks over which returns and trade flow are measured
+RETURN_WINDOWS = (1, 10, 100)
+FLOW_WINDOWS = (10, 100)
+
+
+def _rolling_sum(values: np.ndarray, window: int, starts: np.ndarray) -> np.ndarray:
+    """Sum of the last window values at every row, never reaching back past the row's group start."""
+    cumulative = np.concatenate(([0.0], np.cumsum(values)))
+    rows = np.arange(len(values))
+    return cumulative[rows + 1] - cumulative[np.maximum(rows + 1 - window, starts)]
+
+
+def compute_features(prices: pd.DataFrame, trades: pd.DataFrame = None) -> Tuple[Dict[str, np.ndarray], List[str]]:
+    """Every feature column of one prices file, and the product names its 'product' codes index."""
+    # Each product becomes one contiguous block of rows
+    prices = prices.sort_values(['product', 'day', 'timestamp'], kind='stable')
+    products = sorted(prices['product'].unique())
+    codes = pd.Categorical(prices['product'], categories=products).codes.astype(np.int8)
+
+    level = lambda side, kind: prices[[f'{side}_{kind}_{i}' for i in range(1, LEVELS + 1)]].to_numpy(dtype=np.float64)
+    bid_prices, ask_prices = level('bid', 'price'), level('ask', 'price')
+    bid_volumes = np.nan_to_num(level('bid', 'volume'))
+    ask_volumes = np.abs(np.nan_to_num(level('ask', 'volume')))
+
+    best_bid, best_ask = bid_prices[:, 0], ask_prices[:, 0]
+    bid_volume, ask_volume = bid_volumes[:, 0], ask_volumes[:, 0]
+    bid_depth, ask_depth = bid_volumes.sum(axis=1), ask_volumes.sum(axis=1)
+    mid = (best_bid + best_ask) / 2
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        columns = {
+            'day': prices['day'].to_numpy(dtype=np.int16),
+            'timestamp': prices['timestamp'].to_numpy(dtype=np.int32),
+            'product': codes,
+            'mid': mid,
+            'microprice': (best_bid * ask_volume + best_ask * bid_volume) / (bid_volume + ask_volume),
+            'spread': best_ask - best_bid,
+            'imbalance_1': (bid_volume - ask_volume) / (bid_volume + ask_volume),
+            'imbalance_3': (bid_depth - ask_depth) / (bid_depth + ask_depth),
+            'bid_depth': bid_depth.astype(np.int32),
+            'ask_depth': ask_depth.astype(np.int32),
+        }
+
+        # First row of every product block, and for every row the first row of its block
+        rows = np.arange(len(codes))
+        block_starts = np.flatnonzero(np.diff(codes, prepend=-1))
+        starts = block_starts[np.searchsorted(block_starts, rows, side='right') - 1]
+
+        for window in RETURN_WINDOWS:
+            previous = rows - window
+            valid = previous >= starts
+            returns = np.full(len(rows), np.nan)
+            returns[valid] = mid[valid] / mid[previous[valid]] - 1
+            columns[f'return_{window}'] = returns
+
+        # Trades are signed by which side of the mid they printed on and only count from the
+        # tick after they printed, which is when a trader gets to see them (see tape.classify)
+        prints = classify(prices, trades) if trades is not None and len(trades) else None
+        signed_volume = np.zeros(len(rows))
+        total_volume = np.zeros(len(rows))
+        if prints is not None:
+            visible = prints[prints['seen'] >= 0]
+            seen = visible['seen'].to_numpy(dtype=np.int64)
+            quantities = visible['quantity'].to_numpy(dtype=np.float64)
+            sides = np.nan_to_num(np.sign(visible['offset'].to_numpy()))
+            signed_volume = np.bincount(seen, sides * quantities, minlength=len(rows))
+            total_volume = np.bincount(seen, quantities, minlength=len(rows))
+
+        for window in FLOW_WINDOWS:
+            signed = _rolling_sum(signed_volume, window, starts)
+            total = _rolling_sum(total_volume, window, starts)
+            columns[f'trade_flow_{window}'] = np.where(total > 0, signed / np.where(total > 0, total, 1), 0.0)
+
+        # The prints a trader sees this tick, split by aggressor
+        columns.update(signals(prints, len(rows)))
+
+    return columns, products
+
+
+class FeatureFrame:
+    """The features of one day; each column is memory-mapped from its .npy file on first read."""
+
+    def __init__(self, directory: str, meta: dict) -> None:
+        self.directory = directory
+        self.products: List[str] = meta['products']
+        self.column_names: List[str] = meta['columns']
+        # Maps product -> (first row, last row + 1) of its contiguous block
+        self.blocks: Dict[str, Tuple[int, int]] = {product: tuple(block) for product, block in meta['blocks'].items()}
+        self._columns: Dict[str, np.ndarray] = {}
+
+    def __getitem__(self, column: str) -> np.ndarray:
+        if column not in self._columns:
+            if column not in self.column_names:
+                raise KeyError(column)
+            self._columns[column] = np.load(os.path.join(self.directory, column + '.npy'), mmap_mode='r')
+        return self._columns[column]
+
+    def __len__(self) -> int:
+        return len(self['timestamp'])
+
+    def product(self, product: str, columns: List[str] = None) -> Dict[str, np.ndarray]:
+        """The requested columns (all of them by default) of one product, as views of its block."""
+        start, end = self.blocks[product]
+        return {column: self[column][start:end] for column in columns or self.column_names}
+
+    def to_pandas(self, columns: List[str] = None, product: str = None) -> pd.DataFrame:
+        start, end = self.blocks[product] if product is not None else (0, len(self))
+        frame = pd.DataFrame({column: np.asarray(self[column][start:end]) for column in columns or self.column_names})
+        if 'product' in frame:
+            frame['product'] = pd.Categorical.from_codes(frame['product'], categories=self.products)
+        return frame
+
+
+class FeatureStore:
+    """One .npy file per feature column of a day, rebuilt when its files or the feature definitions change."""
+
+    def __init__(self, directory: str = FEATURE_DIR) -> None:
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _meta(self, prices_file: str, trades_file: str = None) -> dict:
+        return {
+            'version': FEATURES_VERSION,
+            'prices': file_hash(prices_file),
+            'trades': file_hash(trades_file) if trades_file is not None else None,
+        }
+
+    def path(self, prices_file: str) -> str:
+        return os.path.join(self.directory, os.path.splitext(os.path.basename(prices_file))[0])
+
+    def open(self, prices_file: str, trades_file: str = None) -> FeatureFrame:
+        directory = self.path(prices_file)
+        source = self._meta(prices_file, trades_file)
+        meta_file = os.path.join(directory, 'meta.json')
+        if os.path.exists(meta_file):
+            with open(meta_file) as f:
+                meta = json.load(f)
+            if meta['source'] == source:
+                return FeatureFrame(directory, meta)
+        return self.build(prices_file, trades_file)
+
+    def day(self, round: int, day: int) -> FeatureFrame:
+        return self.open(*data_files(round, day))
+
+    def build(self, prices_file: str, trades_file: str = None) -> FeatureFrame:
+        prices = pd.read_csv(prices_file, delimiter=';')
+        trades = pd.read_csv(trades_file, delimiter=';') if trades_file is not None else None
+        columns, products = compute_features(prices, trades)
+
+        directory = self.path(prices_file)
+        os.makedirs(directory, exist_ok=True)
+        for column, values in columns.items():
+            np.save(os.path.join(directory, column + '.npy'), values)
+
+        codes = columns['product']
+        block_starts = np.searchsorted(codes, np.arange(len(products)), side='left')
+        block_ends = np.searchsorted(codes, np.arange(len(products)), side='right')
+        meta = {
+            'source': self._meta(prices_file, trades_file),
+            'products': products,
+            'columns': list(columns),
+            'blocks': {product: [int(start), int(end)] for product, start, end in zip(products, block_starts, block_ends)},
+        }
+        # meta.json is written last, so an interrupted build is never mistaken for a complete one
+        temporary = os.path.join(directory, 'meta.json.tmp')
+        with open(temporary, 'w') as f:
+            json.dump(meta, f)
+        os.replace(temporary, os.path.join(directory, 'meta.json'))
+        return FeatureFrame(directory, meta)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build the order book feature store")
+    parser.add_argument('rounds', nargs='*', type=int, default=[1, 3])
+    args = parser.parse_args()
+
+    store = FeatureStore()
+    for round in args.rounds:
+        for day in available_days(round):
+            start = time.perf_counter()
+            frame = store.day(round, day)
+            print(f"round {round} day {day:>2}: {len(frame)} rows, {len(frame.column_names)} columns "
+                  f"in {time.perf_counter() - start:.2f}s -> {os.path.normpath(frame.directory)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,174 @@
+import argparse
+import json
+import os
+import time
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from fills import FILL_TABLE_FILE, FillTable, load_fill_tables
+from .backtester import available_days, data_files
+from .dataparser import DataParser
+
+# Quotes are tabulated from half a tick up to this far from the mid, in half-tick buckets
+MAX_DISTANCE = 8.0
+
+# Equal-width bins of level-1 imbalance over [-1, 1]
+IMBALANCE_BINS = 5
+
+# Spread bucket edges are these quantiles of each product's spread
+SPREAD_QUANTILES = (0.25, 0.5, 0.75)
+
+# Pseudo-observations that pull a sparse cell towards its (side, distance) average
+PRIOR = 20
+
+# Decimals kept in the compiled tables
+DECIMALS = 4
+
+
+class Observations:
+    """Per tick of one product and day: spread, level-1 imbalance and the volume through each distance."""
+
+    def __init__(self, spread: np.ndarray, imbalance: np.ndarray, volume: np.ndarray) -> None:
+        self.spread = spread
+        self.imbalance = imbalance
+        # (ticks, side, distance bucket) volume; side 0 is a bid, 1 an ask
+        self.volume = volume
+
+
+def _reach(rows: np.ndarray, depth: np.ndarray, quantity: np.ndarray, ticks: int) -> np.ndarray:
+    """Volume per (tick, distance bucket) of prints `depth` half ticks through the mid."""
+    buckets = int(MAX_DISTANCE * 2)
+    volume = np.zeros((ticks, buckets))
+    reached = depth >= 1
+    np.add.at(volume, (rows[reached], np.minimum(depth[reached], buckets) - 1), quantity[reached])
+    # A print that reaches bucket b also fills every closer quote
+    return np.cumsum(volume[:, ::-1], axis=1)[:, ::-1]
+
+
+def observe(prices_file: str, trades_file: str) -> Dict[str, Observations]:
+    """Matches every print with the book of its timestamp, the way BackTester.match_orders fills resting orders."""
+    parser = DataParser()
+    parser.parse_csv(prices_file)
+    trades = pd.read_csv(trades_file, delimiter=';', keep_default_na=False)
+    book = parser.raw_data.dropna(subset=['bid_price_1', 'ask_price_1'])
+
+    observations = {}
+    for product, rows in book.groupby('product', observed=True):
+        timestamps = rows['timestamp'].to_numpy(dtype=np.int64)
+        best_bid = rows['bid_price_1'].to_numpy(dtype=np.float64)
+        best_ask = rows['ask_price_1'].to_numpy(dtype=np.float64)
+        bid_volume = rows['bid_volume_1'].to_numpy(dtype=np.float64, na_value=0)
+        ask_volume = np.abs(rows['ask_volume_1'].to_numpy(dtype=np.float64, na_value=0))
+        mid = (best_bid + best_ask) / 2
+        with np.errstate(divide='ignore', invalid='ignore'):
+            imbalance = np.nan_to_num((bid_volume - ask_volume) / (bid_volume + ask_volume))
+
+        tape = trades[trades['symbol'] == product]
+        trade_timestamps = tape['timestamp'].to_numpy(dtype=np.int64)
+        positions = np.minimum(np.searchsorted(timestamps, trade_timestamps), len(timestamps) - 1)
+        matched = timestamps[positions] == trade_timestamps
+        positions = positions[matched]
+        price = tape['price'].to_numpy(dtype=np.float64)[matched]
+        quantity = tape['quantity'].to_numpy(dtype=np.float64)[matched]
+
+        # Mids are whole or half ticks, so twice the distance is a whole number
+        bid_depth = np.floor(2 * (mid[positions] - price) + 1e-9).astype(np.int64)
+        ask_depth = np.floor(2 * (price - mid[positions]) + 1e-9).astype(np.int64)
+        volume = np.stack([_reach(positions, bid_depth, quantity, len(timestamps)),
+                           _reach(positions, ask_depth, quantity, len(timestamps))], axis=1)
+        observations[str(product)] = Observations(best_ask - best_bid, imbalance, volume)
+    return observations
+
+
+def compile_table(days: List[Observations]) -> dict:
+    """Pools the days of one product into a FillTable's data."""
+    spread = np.concatenate([day.spread for day in days])
+    imbalance = np.concatenate([day.imbalance for day in days])
+    volume = np.concatenate([day.volume for day in days])
+    spread_edges = sorted({int(edge) for edge in np.quantile(spread, SPREAD_QUANTILES)})
+
+    # Same bucketing as FillTable.cell
+    spread_bucket = np.searchsorted(spread_edges, spread, side='left')
+    imbalance_bucket = np.minimum(((imbalance + 1) / 2 * IMBALANCE_BINS).astype(np.int64), IMBALANCE_BINS - 1)
+    condition = spread_bucket * IMBALANCE_BINS + imbalance_bucket
+    conditions = (len(spread_edges) + 1) * IMBALANCE_BINS
+
+    sides, distances = volume.shape[1:]
+    counts = np.bincount(condition, minlength=conditions).astype(np.float64)
+    fills = np.zeros((sides, distances, conditions))
+    volumes = np.zeros((sides, distances, conditions))
+    for side in range(sides):
+        for distance in range(distances):
+            filled = volume[:, side, distance]
+            fills[side, distance] = np.bincount(condition, weights=filled > 0, minlength=conditions)
+            volumes[side, distance] = np.bincount(condition, weights=filled, minlength=conditions)
+
+    # Shrink every cell towards its (side, distance) average, so thin cells stay sensible
+    average_probability = fills.sum(axis=2, keepdims=True) / len(spread)
+    total_fills = fills.sum(axis=2, keepdims=True)
+    average_size = np.divide(volumes.sum(axis=2, keepdims=True), total_fills,
+                             out=np.zeros_like(total_fills), where=total_fills > 0)
+    probability = (fills + PRIOR * average_probability) / (counts + PRIOR)
+    size = (volumes + PRIOR * average_size) / (fills + PRIOR)
+
+    return {
+        'max_distance': MAX_DISTANCE,
+        'spread_edges': spread_edges,
+        'imbalance_bins': IMBALANCE_BINS,
+        'probability': [round(float(value), DECIMALS) for value in probability.ravel()],
+        'size': [round(float(value), DECIMALS) for value in size.ravel()],
+    }
+
+
+def estimate(rounds: List[int] = (1, 3)) -> Dict[str, dict]:
+    """Fill tables of every product traded in the given rounds, from every day with a tape."""
+    by_product: Dict[str, List[Observations]] = {}
+    for round in rounds:
+        for day in available_days(round):
+            prices_file, trades_file = data_files(round, day)
+            if trades_file is None:
+                continue
+            for product, observations in observe(prices_file, trades_file).items():
+                by_product.setdefault(product, []).append(observations)
+    return {product: compile_table(days) for product, days in sorted(by_product.items())}
+
+
+def write_tables(tables: Dict[str, dict], output: str = FILL_TABLE_FILE) -> None:
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    temporary = f"{output}.{os.getpid()}.tmp"
+    with open(temporary, 'w') as f:
+        json.dump(tables, f)
+    os.replace(temporary, output)
+
+
+def fill_tables(path: str = FILL_TABLE_FILE) -> Dict[str, FillTable]:
+    """The compiled tables, estimated from every round's tape first if they have not been yet."""
+    if not os.path.exists(path):
+        write_tables(estimate(), path)
+    return load_fill_tables(path)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Estimate passive fill probabilities from the trade tapes")
+    parser.add_argument('rounds', nargs='*', type=int, default=[1, 3])
+    parser.add_argument('-o', '--output', default=FILL_TABLE_FILE, help="json file the tables are compiled to")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    tables = estimate(args.rounds)
+    write_tables(tables, args.output)
+    print(f"wrote {len(tables)} tables to {os.path.normpath(args.output)} in {time.perf_counter() - start:.1f}s")
+
+    # Average fill probability of a bid by distance from the mid, over all spreads and imbalances
+    distances = [0.5, 1.0, 1.5, 2.0, 3.0, 4.0, 5.0]
+    print(f"{'bid fill probability':22}" + "".join(f"{distance:>8}" for distance in distances))
+    for product, data in tables.items():
+        cells = len(data['probability']) // 2
+        per_distance = np.array(data['probability'][:cells]).reshape(int(MAX_DISTANCE * 2), -1).mean(axis=1)
+        print(f"{product:22}" + "".join(f"{per_distance[int(distance * 2) - 1]:8.3f}" for distance in distances))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+import argparse
+import time
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from framework import StrategyTrader
+from .backtester import BacktestResult, available_days, data_files
+
+LEVELS = 3
+
+
+class HindsightResult:
+
+    def __init__(self, product: str, limit: int, timestamps: np.ndarray, positions: np.ndarray,
+                 trades: np.ndarray, optimal_pnl: float) -> None:
+        self.product = product
+        self.limit = limit
+        self.timestamps = timestamps
+        # Position held after every tick on the optimal path
+        self.positions = positions
+        # Signed quantity taken from the book at every tick on the optimal path
+        self.trades = trades
+        self.optimal_pnl = optimal_pnl
+
+    def capture_ratio(self, pnl: float) -> float:
+        return pnl / self.optimal_pnl if self.optimal_pnl else float('nan')
+
+
+def book_levels(prices: pd.DataFrame, product: str):
+    """
+    Returns (timestamps, bid prices, bid volumes, ask prices, ask volumes, mids) of one product,
+    with levels as (ticks, 3) arrays and zero volume where a level is empty.
+    """
+    book = prices[prices['product'] == product].sort_values('timestamp')
+    columns = lambda side, kind: [f'{side}_{kind}_{i}' for i in range(1, LEVELS + 1)]
+    bid_prices = book[columns('bid', 'price')].to_numpy(dtype=np.float64)
+    bid_volumes = np.nan_to_num(book[columns('bid', 'volume')].to_numpy(dtype=np.float64)).astype(np.int64)
+    ask_prices = book[columns('ask', 'price')].to_numpy(dtype=np.float64)
+    ask_volumes = np.nan_to_num(book[columns('ask', 'volume')].to_numpy(dtype=np.float64)).astype(np.int64)
+    bid_volumes[np.isnan(bid_prices)] = 0
+    ask_volumes[np.isnan(ask_prices)] = 0
+    return (book['timestamp'].to_numpy(), np.nan_to_num(bid_prices), bid_volumes,
+            np.nan_to_num(ask_prices), np.abs(ask_volumes), book['mid_price'].to_numpy(dtype=np.float64))
+
+
+def _trade_cash(bids: List[tuple], asks: List[tuple]):
+    """Breakpoints and cash of the piecewise linear cash of trading k units at one tick, best levels first."""
+    sizes, cash = [0], [0.0]
+    for price, volume in sorted(bids, reverse=True):
+        sizes.insert(0, sizes[0] - volume)
+        cash.insert(0, cash[0] + price * volume)
+    for price, volume in sorted(asks):
+        sizes.append(sizes[-1] + volume)
+        cash.append(cash[-1] - price * volume)
+    return sizes, cash
+
+
+def solve(product: str, limit: int, timestamps: np.ndarray, bid_prices: np.ndarray, bid_volumes: np.ndarray,
+          ask_prices: np.ndarray, ask_volumes: np.ndarray, mids: np.ndarray) -> HindsightResult:
+    """Maximum pnl of taking the visible book within +-limit, marked to the last mid."""
+    # A DP over ticks x positions. The value of a position is concave, so the best position to
+    # trade a level from is the argmax of one array, clipped to the level's volume
+    ticks = len(timestamps)
+    # values[t, i] is the best cash after t ticks holding position i - limit, -inf if unreachable
+    positions = np.arange(-limit, limit + 1)
+    index = np.arange(len(positions))
+    values = np.full((ticks + 1, len(positions)), -np.inf)
+    values[0, limit] = 0.0
+    lo = hi = limit
+
+    # Non-empty levels of every tick, as (price, volume) lists
+    levels = lambda prices, volumes: [[(price, volume) for price, volume in zip(tick_prices, tick_volumes) if volume > 0]
+                                      for tick_prices, tick_volumes in zip(prices.tolist(), volumes.tolist())]
+    bids, asks = levels(bid_prices, bid_volumes), levels(ask_prices, ask_volumes)
+
+    for t in range(ticks):
+        value = values[t].copy()
+        for price, volume in asks[t]:
+            # Buying up to `volume` at `price`: reach i from the best y in [i - volume, i]
+            shifted = value[lo:hi + 1] + price * positions[lo:hi + 1]
+            best = lo + int(shifted.argmax())
+            new_hi = min(len(positions) - 1, hi + volume)
+            reach = index[lo:new_hi + 1]
+            source = np.minimum(np.maximum(best, reach - volume), np.minimum(reach, hi))
+            value[lo:new_hi + 1] = shifted[source - lo] - price * positions[lo:new_hi + 1]
+            hi = new_hi
+        for price, volume in bids[t]:
+            # Selling up to `volume` at `price`: reach i from the best y in [i, i + volume]
+            shifted = value[lo:hi + 1] + price * positions[lo:hi + 1]
+            best = lo + int(shifted.argmax())
+            new_lo = max(0, lo - volume)
+            reach = index[new_lo:hi + 1]
+            source = np.maximum(np.minimum(best, reach + volume), np.maximum(reach, lo))
+            value[new_lo:hi + 1] = shifted[source - lo] - price * positions[new_lo:hi + 1]
+            lo = new_lo
+        values[t + 1] = value
+
+    final = values[ticks] + positions * mids[-1]
+    path = np.zeros(ticks + 1, dtype=np.int64)
+    path[ticks] = int(np.argmax(final))
+    optimal_pnl = float(np.max(final))
+
+    # Walk back: the previous position is the one that reaches the current one best
+    for t in range(ticks, 0, -1):
+        sizes, cash = _trade_cash(bids[t - 1], asks[t - 1])
+        traded = path[t] - index
+        feasible = (traded >= sizes[0]) & (traded <= sizes[-1])
+        candidates = np.where(feasible, values[t - 1] + np.interp(traded, sizes, cash), -np.inf)
+        path[t - 1] = int(candidates.argmax())
+
+    path = positions[path]
+    return HindsightResult(product, limit, timestamps, path[1:], np.diff(path), optimal_pnl)
+
+
+def solve_day(prices_file: str, limits: Dict[str, int] = None) -> Dict[str, HindsightResult]:
+    """Solves every product of one day's prices file that has a position limit."""
+    limits = limits or StrategyTrader.POSITION_LIMIT
+    prices = pd.read_csv(prices_file, delimiter=';')
+    results = {}
+    for product in sorted(prices['product'].unique()):
+        if product in limits:
+            results[product] = solve(product, limits[product], *book_levels(prices, product))
+    return results
+
+
+def capture_ratios(hindsight: Dict[str, HindsightResult], result: BacktestResult) -> Dict[str, float]:
+    final_pnl = result.final_pnl()
+    return {product: solution.capture_ratio(final_pnl.get(product, 0.0)) for product, solution in hindsight.items()}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Hindsight-optimal pnl per product and day")
+    parser.add_argument('rounds', nargs='*', type=int, default=[1, 3])
+    parser.add_argument('--trader', help="also report the capture ratio of this trader module, e.g. round1_trader")
+    args = parser.parse_args()
+
+    if args.trader:
+        from .backtester import BackTester
+        from .cache import ResultCache
+        cache = ResultCache()
+
+    for round in args.rounds:
+        for day in available_days(round):
+            prices_file, trades_file = data_files(round, day)
+            start = time.perf_counter()
+            solutions = solve_day(prices_file)
+            elapsed = time.perf_counter() - start
+            ratios = capture_ratios(solutions, cache.run(BackTester(args.trader), prices_file, trades_file)) if args.trader else {}
+            for product, solution in solutions.items():
+                line = f"round {round} day {day:>2} {product:13} limit {solution.limit:4} optimal {solution.optimal_pnl:12.1f}"
+                if product in ratios:
+                    line += f"  capture {ratios[product]:7.2%}"
+                print(line)
+            print(f"round {round} day {day:>2} solved in {elapsed:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+import json
+import os
+import shutil
+from typing import Dict, List
+
+import numpy as np
+
+from datamodel import Product, Trade
+
+# Ticks buffered in memory before they are appended to the section files
+CHUNK_TICKS = 1000
+
+
+class LogWriter:
+    """Streams a backtest to disk in the exchange's submission log layout, readable by DataParser.parse_log."""
+
+    def __init__(self, path: str, raw_data, offsets: np.ndarray, chunk_ticks: int = CHUNK_TICKS) -> None:
+        self.path = path
+        self.chunk_ticks = chunk_ticks
+        # The book rows behind the activities log, sorted by timestamp with one offset per timestamp
+        self.raw_data = raw_data
+        self.offsets = offsets
+        self.products: List[Product] = raw_data['product'].astype(str).tolist()
+
+        # Sections go to separate part files every chunk_ticks ticks and close() joins them, so
+        # memory stays bounded however many ticks are written
+        self.parts = {section: f'{path}.{section}.part' for section in ('sandbox', 'activities', 'trades')}
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(self.parts['activities'], 'w') as f:
+            f.write(';'.join(raw_data.columns) + '\n')
+        for section in ('sandbox', 'trades'):
+            open(self.parts[section], 'w').close()
+
+        self.ticks = 0
+        self.trades_written = 0
+        self.sandbox: List[str] = []
+        self.trades: List[str] = []
+        self.pnl: List[float] = []
+        # First raw_data row that is not written to the activities part yet
+        self.activities_row = 0
+
+    def write_tick(self, timestamp: int, lambda_log: str, sandbox_log: str, trades: List[Trade]) -> None:
+        self.sandbox.append(json.dumps({'sandboxLog': sandbox_log, 'lambdaLog': lambda_log, 'timestamp': timestamp}, indent=2))
+        for trade in trades:
+            entry = json.dumps({
+                'timestamp': trade.timestamp,
+                'buyer': trade.buyer,
+                'seller': trade.seller,
+                'symbol': trade.symbol,
+                'currency': 'SEASHELLS',
+                'price': trade.price,
+                'quantity': trade.quantity,
+            }, indent=2)
+            self.trades.append('  ' + entry.replace('\n', '\n  '))
+
+    def record(self, tick: int, pnl: Dict[Product, float]) -> None:
+        """Closes tick number `tick` of raw_data with the pnl of every product after it."""
+        for row in range(self.offsets[tick], self.offsets[tick + 1]):
+            self.pnl.append(pnl.get(self.products[row], 0.0))
+        self.ticks += 1
+        if self.ticks % self.chunk_ticks == 0:
+            self.flush()
+
+    def flush(self) -> None:
+        if self.sandbox:
+            with open(self.parts['sandbox'], 'a') as f:
+                f.write('\n'.join(self.sandbox) + '\n')
+            self.sandbox = []
+
+        if self.trades:
+            with open(self.parts['trades'], 'a') as f:
+                f.write((',\n' if self.trades_written else '') + ',\n'.join(self.trades))
+            self.trades_written += len(self.trades)
+            self.trades = []
+
+        if self.pnl:
+            end = self.activities_row + len(self.pnl)
+            chunk = self.raw_data.iloc[self.activities_row:end].copy()
+            chunk['profit_and_loss'] = np.array(self.pnl, dtype=np.float64)
+            chunk.to_csv(self.parts['activities'], sep=';', header=False, index=False, mode='a')
+            self.activities_row = end
+            self.pnl = []
+
+    def close(self) -> None:
+        self.flush()
+        temporary = self.path + '.tmp'
+        with open(temporary, 'w') as out:
+            out.write('Sandbox logs:\n')
+            with open(self.parts['sandbox']) as f:
+                shutil.copyfileobj(f, out)
+            out.write('\n\n\nActivities log:\n')
+            with open(self.parts['activities']) as f:
+                shutil.copyfileobj(f, out)
+            out.write('\n\n\n\nTrade History:\n[\n')
+            with open(self.parts['trades']) as f:
+                shutil.copyfileobj(f, out)
+            out.write('\n]')
+        os.replace(temporary, self.path)
+        for part in self.parts.values():
+            os.remove(part)
@@ -0,0 +1,288 @@
+import argparse
+import itertools
+import json
+import math
+import os
+import time
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .backtester import BackTester, available_days, data_files, run_lockstep, shard_seed, spawn_seeds
+from .cache import source_hash
+from .checkpoint import JobJournal
+
+# Ticks in a full day of the round 1-3 books
+TICKS_PER_DAY = 10_000
+
+# Normal quantile of the two-sided 95% intervals on the leaderboard
+CONFIDENCE_Z = 1.96
+
+# Maps (round, day) -> the products of its book, read once per process
+_shard_products: Dict[Tuple[int, int], List[str]] = {}
+
+
+def shard_products(round: int, day: int) -> List[str]:
+    if (round, day) not in _shard_products:
+        prices = pd.read_csv(data_files(round, day)[0], delimiter=';', usecols=['product'])
+        _shard_products[(round, day)] = sorted(prices['product'].unique())
+    return _shard_products[(round, day)]
+
+# Parameter grids worth searching, as {strategy name: {parameter: values}}
+SPACES: Dict[str, Dict[str, Dict[str, List[Any]]]] = {
+    'starfruit': {'STARFRUIT': {
+        'edge': [0.5, 0.75, 1.0, 1.15, 1.5, 2.0],
+        'quote_offset': [1, 2, 3],
+    }},
+    'amethysts': {'AMETHYSTS': {
+        'spread': [0, 1, 2],
+        'open_spread': [1, 2, 3, 4],
+        'position_spread': [5, 10, 15, 20],
+    }},
+}
+
+
+def grid(space: Dict[str, Dict[str, List[Any]]]) -> List[Dict[str, Dict[str, Any]]]:
+    """Every combination of a space, as BackTester params, e.g. [{'STARFRUIT': {'edge': 0.5}}, ...]."""
+    axes = [(name, param, values) for name, params in space.items() for param, values in params.items()]
+    configs = []
+    for combination in itertools.product(*(values for _, _, values in axes)):
+        config: Dict[str, Dict[str, Any]] = {}
+        for (name, param, _), value in zip(axes, combination):
+            config.setdefault(name, {})[param] = value
+        configs.append(config)
+    return configs
+
+
+def label(config: Dict[str, Dict[str, Any]]) -> str:
+    return " ".join(f"{name}.{param}={value}" for name, params in config.items() for param, value in params.items())
+
+
+class Budget:
+    """What one rung spends per configuration: the first `ticks` ticks of each shard on `paths` seeded paths."""
+
+    def __init__(self, shards: List[Tuple[int, int]], ticks: int = None, paths: int = 1, sampled: bool = False) -> None:
+        self.shards = shards
+        self.ticks = ticks
+        self.paths = paths
+        # Resting orders fill from the fill tables, a draw per path, instead of from the tape
+        self.sampled = sampled
+
+    def shard_paths(self, round: int, day: int) -> int:
+        from .fillmodel import fill_tables
+
+        # A shard that replays the same tape on every path gets a single path
+        if not self.sampled or not set(shard_products(round, day)) & set(fill_tables()):
+            return 1
+        return self.paths
+
+    def cost(self) -> int:
+        """Simulated ticks per configuration."""
+        return sum(self.shard_paths(round, day) for round, day in self.shards) * (self.ticks or TICKS_PER_DAY)
+
+    def __str__(self) -> str:
+        days = ",".join(f"{round}/{day}" for round, day in self.shards)
+        return f"days {days}, {self.ticks or 'all'} ticks, {self.paths} path(s), {'table' if self.sampled else 'tape'} fills"
+
+
+def default_rungs(round: int, ticks: int = 1000, paths: int = 3) -> List[Budget]:
+    """The first N ticks of one day, that whole day, every day, and every day on several paths."""
+    shards = [(round, day) for day in available_days(round)]
+    # All rungs share one fill model, or they would rank configurations differently
+    sampled = paths > 1
+    return [
+        Budget(shards[:1], ticks, sampled=sampled),
+        Budget(shards[:1], sampled=sampled),
+        Budget(shards, sampled=sampled),
+        Budget(shards, paths=paths, sampled=sampled),
+    ]
+
+
+class Candidate:
+
+    def __init__(self, config: Dict[str, Dict[str, Any]]) -> None:
+        self.config = config
+        # Index of the last rung this configuration was evaluated on
+        self.rung = -1
+        # Total pnl of every shard of that rung, averaged over its paths. Paths of one shard
+        # replay the same book, so only shards count as independent samples
+        self.samples: List[float] = []
+
+    def mean(self) -> float:
+        return float(np.mean(self.samples)) if self.samples else float('nan')
+
+    def interval(self) -> Tuple[float, float]:
+        """Normal-approximation confidence interval of the mean pnl per shard."""
+        if len(self.samples) < 2:
+            return float('nan'), float('nan')
+        half_width = CONFIDENCE_Z * np.std(self.samples, ddof=1) / math.sqrt(len(self.samples))
+        return self.mean() - half_width, self.mean() + half_width
+
+
+class SearchResult:
+
+    def __init__(self, candidates: List[Candidate], rungs: List[Budget], cost: int, seconds: float) -> None:
+        self.candidates = candidates
+        self.rungs = rungs
+        # Ticks simulated over all configurations and rungs
+        self.cost = cost
+        self.seconds = seconds
+
+    def grid_cost(self) -> int:
+        """Ticks a full grid would simulate on the last rung's budget."""
+        return len(self.candidates) * self.rungs[-1].cost()
+
+    def ranked(self) -> List[Candidate]:
+        # Further rungs first; within a rung, by mean pnl
+        return sorted(self.candidates, key=lambda candidate: (-candidate.rung, -candidate.mean()))
+
+    def best(self) -> Candidate:
+        return self.ranked()[0]
+
+    def leaderboard(self) -> pd.DataFrame:
+        rows = []
+        for candidate in self.ranked():
+            low, high = candidate.interval()
+            row = {'rung': candidate.rung, 'mean_pnl': candidate.mean(), 'ci_low': low, 'ci_high': high,
+                   'samples': len(candidate.samples)}
+            for name, params in candidate.config.items():
+                for param, value in params.items():
+                    row[f'{name}.{param}'] = value if np.isscalar(value) else json.dumps(value)
+            rows.append(row)
+        return pd.DataFrame(rows)
+
+
+def _evaluate(trader_module: str, configs: List[Dict[str, Dict[str, Any]]], round: int, day: int, ticks: int,
+              seed: int, noise: bool, sampled: bool = False) -> List[float]:
+    from framework import logger
+    from .fillmodel import fill_tables
+
+    # Nobody reads the per-tick payload of a sweep
+    logger.enabled = False
+    tables = fill_tables() if sampled else None
+    backtesters = [BackTester(trader_module, seed, noise, config, fill_tables=tables) for config in configs]
+    return [result.total_pnl() for result in run_lockstep(backtesters, *data_files(round, day), ticks=ticks)]
+
+
+def successive_halving(trader_module: str, configs: List[Dict[str, Dict[str, Any]]], rungs: List[Budget],
+                       eta: int = 3, seed: int = 0, noise: bool = True, workers: int = None,
+                       journal: JobJournal = None) -> SearchResult:
+    """Evaluates the configurations rung by rung, keeping the best 1/eta by mean pnl for the next one."""
+    from concurrent.futures import ProcessPoolExecutor
+
+    if len({budget.sampled for budget in rungs}) > 1:
+        raise ValueError("every rung has to use the same fill model, or rungs would rank configurations differently")
+    workers = workers or os.cpu_count() or 1
+    path_seeds = spawn_seeds(seed, max(budget.paths for budget in rungs))
+    candidates = [Candidate(config) for config in configs]
+    survivors = list(candidates)
+    cost = 0
+    start = time.perf_counter()
+
+    sources = (source_hash(trader_module), source_hash('packages.backtester')) if journal is not None else None
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for index, budget in enumerate(rungs):
+            # Maps (candidate, round, day, path) -> its pnl, or the job key it is journaled under
+            samples: Dict[Tuple[int, int, int, int], Any] = {}
+            futures = []
+            for round, day in budget.shards:
+                # Every configuration sees the same noise and fill draws on path p of a shard
+                for path in range(budget.shard_paths(round, day)):
+                    path_seed = shard_seed(path_seeds[path], round, day)
+                    pending = []
+                    # A journaled pnl is reused, so a restarted search ends the same way
+                    for i, candidate in enumerate(survivors):
+                        if journal is None:
+                            pending.append(i)
+                            continue
+                        key = journal.key(sources, candidate.config, round, day, budget.ticks, path_seed, noise,
+                                          budget.sampled)
+                        if key in journal:
+                            samples[(i, round, day, path)] = journal.get(key)
+                        else:
+                            samples[(i, round, day, path)] = key
+                            pending.append(i)
+                    if not pending:
+                        continue
+                    # One chunk per worker, each replaying the day once in lockstep
+                    chunk_size = math.ceil(len(pending) / workers)
+                    for start_index in range(0, len(pending), chunk_size):
+                        chunk = pending[start_index:start_index + chunk_size]
+                        futures.append(([(i, round, day, path) for i in chunk], pool.submit(
+                            _evaluate, trader_module, [survivors[i].config for i in chunk], round, day,
+                            budget.ticks, path_seed, noise, budget.sampled)))
+
+            for jobs, future in futures:
+                for job, pnl in zip(jobs, future.result()):
+                    if journal is not None:
+                        journal.put(samples[job], pnl)
+                    samples[job] = pnl
+            for i, candidate in enumerate(survivors):
+                candidate.rung = index
+                candidate.samples = [float(np.mean([samples[(i, round, day, path)]
+                                                    for path in range(budget.shard_paths(round, day))]))
+                                     for round, day in budget.shards]
+            cost += len(survivors) * budget.cost()
+
+            if index < len(rungs) - 1:
+                survivors.sort(key=lambda candidate: -candidate.mean())
+                survivors = survivors[:max(1, math.ceil(len(survivors) / eta))]
+
+    return SearchResult(candidates, rungs, cost, time.perf_counter() - start)
+
+
+def parse_space(specs: List[str]) -> Dict[str, Dict[str, List[Any]]]:
+    """Parses 'STRATEGY.param=v1,v2,...' specs; values are read as JSON, e.g. 1.5 or [1, 2]."""
+    space: Dict[str, Dict[str, List[Any]]] = {}
+    for spec in specs:
+        key, values = spec.split('=', 1)
+        name, param = key.split('.', 1)
+        space.setdefault(name, {})[param] = json.loads(f'[{values}]')
+    return space
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Search strategy parameters by successive halving")
+    parser.add_argument('trader', help="trader module, e.g. round1_trader")
+    parser.add_argument('--round', type=int, default=1)
+    parser.add_argument('--space', choices=sorted(SPACES), help="a predefined parameter grid")
+    parser.add_argument('--param', action='append', default=[],
+                        help="STRATEGY.param=v1,v2,... with JSON values, repeatable")
+    parser.add_argument('--eta', type=int, default=3, help="keep the best 1/eta of every rung")
+    parser.add_argument('--ticks', type=int, default=1000, help="ticks of the first rung")
+    parser.add_argument('--paths', type=int, default=3, help="seeded paths per day on the last rung")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-noise', action='store_true')
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--top', type=int, default=10, help="leaderboard rows to print")
+    parser.add_argument('--grid', action='store_true', help="also run the full grid on the last rung, to compare")
+    parser.add_argument('--journal', help="file recording finished jobs; rerunning with it skips them")
+    args = parser.parse_args()
+
+    space = {**SPACES.get(args.space, {}), **parse_space(args.param)}
+    if not space:
+        parser.error("give a --space or at least one --param")
+    configs = grid(space)
+    rungs = default_rungs(args.round, args.ticks, args.paths)
+
+    journal = JobJournal(args.journal) if args.journal else None
+    result = successive_halving(args.trader, configs, rungs, args.eta, args.seed, not args.no_noise, args.workers, journal)
+    with pd.option_context('display.width', 200, 'display.max_columns', None):
+        print(result.leaderboard().head(args.top).to_string(index=False))
+    print(f"{len(configs)} configurations, {len(rungs)} rungs: {result.cost:,} ticks "
+          f"({result.cost / result.grid_cost():.1%} of a full grid) in {result.seconds:.1f}s")
+    print(f"best: {label(result.best().config)}")
+    if journal is not None and journal.reused:
+        print(f"{journal.reused:,} of the jobs were already in {args.journal}")
+
+    if args.grid:
+        full = successive_halving(args.trader, configs, rungs[-1:], args.eta, args.seed, not args.no_noise, args.workers)
+        print(f"full grid: {full.cost:,} ticks in {full.seconds:.1f}s, best: {label(full.best().config)}")
+        rank = [candidate.config for candidate in full.ranked()].index(result.best().config)
+        print(f"successive halving's pick ranks #{rank + 1} of {len(configs)} on the full grid")
+
+
+if __name__ == '__main__':
+    main()
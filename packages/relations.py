@@ -0,0 +1,222 @@
+import argparse
+import itertools
+import math
+import os
+import time
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .dataset import Dataset
+
+# Rolling window lengths, in ticks; None fits each day as a whole
+WINDOWS = (100, 500, 2000, None)
+
+# Largest product set scanned: a dependent product and up to MAX_SET_SIZE - 1 regressors
+MAX_SET_SIZE = 4
+
+# 5% critical values of the Engle-Granger test with a constant (MacKinnon 2010, asymptotic),
+# by number of series in the relation; one series is the plain Dickey-Fuller test
+ENGLE_GRANGER_5 = {1: -2.86, 2: -3.34, 3: -3.74, 4: -4.10, 5: -4.41}
+
+# Ridge added to the normal equations relative to their trace, so flat windows stay solvable
+RIDGE = 1e-10
+
+
+def mid_prices(dataset: Dataset, round: int) -> Tuple[List[str], Dict[int, np.ndarray]]:
+    """Every product of a round and, for every day, its (ticks x products) matrix of mid prices."""
+    book = dataset.load(round, columns=['product', 'mid_price']).reset_index()
+    products = sorted(str(product) for product in book['product'].unique())
+    wide = book.pivot_table(index=['day', 'timestamp'], columns='product', values='mid_price', observed=True)
+    wide = wide[products].ffill().bfill()
+    return products, {int(day): frame.to_numpy(dtype=np.float64) for day, frame in wide.groupby(level='day')}
+
+
+def relation_sets(products: List[str], max_size: int = MAX_SET_SIZE) -> List[Tuple[str, Tuple[str, ...]]]:
+    """Every (dependent, regressors) split of every product subset of 2 to max_size products."""
+    relations = []
+    for size in range(2, min(max_size, len(products)) + 1):
+        for subset in itertools.combinations(products, size):
+            for dependent in subset:
+                relations.append((dependent, tuple(product for product in subset if product != dependent)))
+    return relations
+
+
+def rolling_fit(y: np.ndarray, x: np.ndarray, windows: List[int]) -> Dict[str, np.ndarray]:
+    """Fits y = alpha + x @ beta and an ADF test of its residual over every trailing window, NaN until a window fits."""
+    # Every window sum is a difference of two rows of one cumulative sum of z z', z = (1, y, x)
+    ticks, k = x.shape
+    # Centre the series so the cumulative sums stay small and differences stay exact; alpha
+    # is moved back to price space at the end
+    y_mean, x_mean = y.mean(), x.mean(axis=0)
+    y = y - y_mean
+    x = x - x_mean
+    z = np.column_stack([np.ones(ticks), y, x])
+    dz = np.diff(z, axis=0)
+
+    def cumulative(left: np.ndarray, right: np.ndarray) -> np.ndarray:
+        return np.concatenate([np.zeros((1, z.shape[1], z.shape[1])), np.cumsum(left[:, :, None] * right[:, None, :], axis=0)])
+
+    levels = cumulative(z, z)
+    # Row s of these pairs tick s with tick s + 1
+    lagged = cumulative(z[:-1], dz)
+    changes = cumulative(dz, dz)
+
+    regressors = [0] + list(range(2, k + 2))
+    fits = {name: np.full((len(windows), ticks), np.nan) for name in ('alpha', 'adf_t', 'half_life', 'spread', 'spread_std')}
+    fits['beta'] = np.full((len(windows), ticks, k), np.nan)
+    for index, window in enumerate(windows):
+        if window > ticks or window < k + 4:
+            continue
+        first = window - 1
+        # Window sums for every tick t from first on, as differences of cumulative rows
+        sums = levels[first + 1:] - levels[:ticks - first]
+        normal = sums[:, regressors][:, :, regressors]
+        normal += RIDGE * np.trace(normal, axis1=1, axis2=2)[:, None, None] * np.eye(k + 1)
+        theta = np.linalg.solve(normal, sums[:, regressors, 1][:, :, None])[:, :, 0]
+        # e = c @ z with c = (-a, 1, -beta)
+        c = np.column_stack([-theta[:, 0], np.ones(len(theta)), -theta[:, 1:]])
+
+        # The window's residual pairs (e[s - 1], e[s]) for s in (t - window + 1, t]
+        previous = levels[first:-1] - levels[:ticks - first]
+        cross = lagged[first:] - lagged[:ticks - first]
+        squared = changes[first:] - changes[:ticks - first]
+
+        n = window - 1
+        sum_e = np.einsum('ti,ti->t', c, previous[:, :, 0])
+        sum_de = np.einsum('ti,ti->t', c, cross[:, 0, :])
+        see = np.einsum('ti,tij,tj->t', c, previous, c) - sum_e ** 2 / n
+        sed = np.einsum('ti,tij,tj->t', c, cross, c) - sum_e * sum_de / n
+        sdd = np.einsum('ti,tij,tj->t', c, squared, c) - sum_de ** 2 / n
+        with np.errstate(divide='ignore', invalid='ignore'):
+            slope = sed / see
+            residual = np.maximum(sdd - slope * sed, 0.0)
+            adf_t = slope / np.sqrt(residual / (n - 2) / see)
+            # Residuals shrink by |1 + lambda| a tick, overshooting the mean when lambda < -1
+            half_life = np.where(np.abs(1 + slope) < 1, -math.log(2) / np.log(np.abs(1 + slope)), np.inf)
+
+        fits['alpha'][index, first:] = y_mean + theta[:, 0] - theta[:, 1:] @ x_mean
+        fits['beta'][index, first:] = theta[:, 1:]
+        fits['adf_t'][index, first:] = adf_t
+        fits['half_life'][index, first:] = half_life
+        fits['spread'][index, first:] = np.einsum('ti,ti->t', c, z[first:])
+        fits['spread_std'][index, first:] = np.sqrt(np.maximum(np.einsum('ti,tij,tj->t', c, sums, c), 0.0) / window)
+    return fits
+
+
+def rolling_correlation(a: np.ndarray, b: np.ndarray, windows: List[int]) -> np.ndarray:
+    """Correlation of the tick-to-tick changes of two series over every trailing window."""
+    da, db = np.diff(a), np.diff(b)
+    columns = np.column_stack([np.ones(len(da)), da, db, da * da, db * db, da * db])
+    cumulative = np.concatenate([np.zeros((1, 6)), np.cumsum(columns, axis=0)])
+    correlations = np.full((len(windows), len(a)), np.nan)
+    for index, window in enumerate(windows):
+        # A whole-day window has one change less than it has ticks
+        window = min(window, len(da))
+        if window < 3:
+            continue
+        n, sa, sb, saa, sbb, sab = (cumulative[window:] - cumulative[:-window]).T
+        with np.errstate(divide='ignore', invalid='ignore'):
+            correlations[index, window:] = (sab - sa * sb / n) / np.sqrt((saa - sa ** 2 / n) * (sbb - sb ** 2 / n))
+    return correlations
+
+
+def scan_relation(round: int, dependent: str, regressors: Tuple[str, ...], products: List[str],
+                  days: Dict[int, np.ndarray], windows: Tuple[int, ...]) -> List[dict]:
+    """Summary rows of one relation, one per window, pooled over the round's days."""
+    y_column = products.index(dependent)
+    x_columns = [products.index(product) for product in regressors]
+
+    pooled: Dict[int, Dict[str, List[np.ndarray]]] = {index: {} for index in range(len(windows))}
+    for mids in days.values():
+        day_windows = [window or len(mids) for window in windows]
+        fits = rolling_fit(mids[:, y_column], mids[:, x_columns], day_windows)
+        # The dependent product on its own: a relation only adds something where it is not stationary already
+        alone = rolling_fit(mids[:, y_column], mids[:, []], day_windows)
+        correlations = rolling_correlation(mids[:, y_column], mids[:, x_columns[0]], day_windows) if len(regressors) == 1 else None
+        for index in range(len(windows)):
+            valid = ~np.isnan(fits['adf_t'][index])
+            stats = pooled[index]
+            for name in ('beta', 'adf_t', 'half_life', 'spread_std'):
+                stats.setdefault(name, []).append(fits[name][index][valid])
+            stats.setdefault('alone_adf_t', []).append(alone['adf_t'][index][valid])
+            if correlations is not None:
+                stats.setdefault('correlation', []).append(correlations[index][~np.isnan(correlations[index])])
+
+    rows = []
+    for index, window in enumerate(windows):
+        stats = {name: np.concatenate(values) for name, values in pooled[index].items()}
+        if not len(stats['adf_t']):
+            continue
+        cointegrated = stats['adf_t'] < ENGLE_GRANGER_5[len(regressors) + 1]
+        stationary = stats['alone_adf_t'] < ENGLE_GRANGER_5[1]
+        row = {
+            'round': round,
+            'dependent': dependent,
+            'regressors': "+".join(regressors),
+            'window': window or 'day',
+            'fits': len(stats['adf_t']),
+            'cointegrated': float(np.mean(cointegrated)),
+            'lift': float(np.mean(cointegrated & ~stationary)),
+            'median_adf_t': float(np.median(stats['adf_t'])),
+            'median_half_life': float(np.median(stats['half_life'])),
+            'spread_std': float(np.median(stats['spread_std'])),
+            'correlation': float(np.median(stats['correlation'])) if 'correlation' in stats else np.nan,
+        }
+        for product, betas in zip(regressors, stats['beta'].T):
+            row[f'beta_{product}'] = float(np.median(betas))
+            row[f'beta_{product}_iqr'] = float(np.subtract(*np.percentile(betas, [75, 25])))
+        rows.append(row)
+    return rows
+
+
+def scan(rounds: List[int] = (1, 2, 3), windows: Tuple[int, ...] = WINDOWS, max_size: int = MAX_SET_SIZE,
+         workers: int = None, dataset: Dataset = None) -> pd.DataFrame:
+    """One row per (relation, window) of every round, one worker process per product set."""
+    from concurrent.futures import ProcessPoolExecutor
+
+    dataset = dataset or Dataset()
+    tasks = []
+    for round in rounds:
+        products, days = mid_prices(dataset, round)
+        for dependent, regressors in relation_sets(products, max_size):
+            tasks.append((round, dependent, regressors, products, days, windows))
+
+    with ProcessPoolExecutor(max_workers=workers or min(len(tasks), os.cpu_count() or 1)) as pool:
+        futures = [pool.submit(scan_relation, *task) for task in tasks]
+        rows = [row for future in futures for row in future.result()]
+    return pd.DataFrame(rows)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Scan every product pair and basket for cointegration")
+    parser.add_argument('rounds', nargs='*', type=int, default=[1, 2, 3])
+    parser.add_argument('--windows', type=int, nargs='+', help="rolling windows in ticks; the whole day is always added")
+    parser.add_argument('--max-size', type=int, default=MAX_SET_SIZE, help="most products in one relation")
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--top', type=int, default=20)
+    parser.add_argument('-o', '--output', help="write every row to this csv")
+    args = parser.parse_args()
+
+    windows = tuple(args.windows) + (None,) if args.windows else WINDOWS
+    start = time.perf_counter()
+    frame = scan(args.rounds, windows, args.max_size, args.workers)
+    elapsed = time.perf_counter() - start
+
+    if args.output:
+        frame.to_csv(args.output, index=False)
+    relations = frame.groupby(['round', 'dependent', 'regressors']).size()
+    ranked = frame.sort_values(['lift', 'median_adf_t'], ascending=[False, True]).head(args.top)
+    # One readable column of median hedge ratios instead of two per product
+    ranked['hedge_ratios'] = [
+        " ".join(f"{product}={row[f'beta_{product}']:.3g}" for product in row['regressors'].split('+'))
+        for _, row in ranked.iterrows()]
+    ranked = ranked[[column for column in ranked.columns if not column.startswith('beta_')]]
+    with pd.option_context('display.width', 250, 'display.max_columns', None, 'display.float_format', '{:.4g}'.format):
+        print(ranked.to_string(index=False))
+    print(f"{len(relations)} relations x {len(windows)} windows scanned in {elapsed:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
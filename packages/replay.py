@@ -0,0 +1,194 @@
+import argparse
+import contextlib
+import importlib
+import json
+import os
+import time
+from typing import Any, Dict, Iterator, List, Tuple
+
+from datamodel import ConversionObservation, Observation, Order, OrderDepth, Symbol, Trade, TradingState
+
+# Ticks of context printed around the first difference
+CONTEXT_TICKS = 3
+
+
+class LoggedTick:
+    """One lambdaLog entry: the state the exchange sent and what the submission returned."""
+
+    def __init__(self, state: TradingState, orders: List[Order], conversions: int, trader_data: str,
+                 sandbox_log: str) -> None:
+        self.state = state
+        self.orders = orders
+        self.conversions = conversions
+        self.trader_data = trader_data
+        self.sandbox_log = sandbox_log
+
+
+class TickDiff:
+
+    def __init__(self, timestamp: int, missing: List[Tuple], extra: List[Tuple], logged_conversions: int,
+                 conversions: int, sandbox_log: str) -> None:
+        self.timestamp = timestamp
+        # (symbol, price, quantity) orders only the live submission sent, and only the local trader sent
+        self.missing = missing
+        self.extra = extra
+        self.logged_conversions = logged_conversions
+        self.conversions = conversions
+        self.sandbox_log = sandbox_log
+
+    def __str__(self) -> str:
+        lines = [f"timestamp {self.timestamp}:"]
+        lines += [f"  - {symbol} {quantity:+d} @ {price}  (live only)" for symbol, price, quantity in self.missing]
+        lines += [f"  + {symbol} {quantity:+d} @ {price}  (local only)" for symbol, price, quantity in self.extra]
+        if self.logged_conversions != self.conversions:
+            lines.append(f"  conversions {self.logged_conversions} live, {self.conversions} local")
+        if self.sandbox_log.strip():
+            lines.append(f"  sandbox: {self.sandbox_log.strip()}")
+        return "\n".join(lines)
+
+
+class ReplayReport:
+
+    def __init__(self) -> None:
+        self.ticks = 0
+        self.undecodable = 0
+        # Every tick whose orders or conversions differ, in order
+        self.diffs: List[TickDiff] = []
+        # Timestamps where the exchange rejected orders for breaching a limit
+        self.breaches: List[int] = []
+
+    def first_diff(self) -> TickDiff:
+        return self.diffs[0] if self.diffs else None
+
+    def __str__(self) -> str:
+        lines = [f"{self.ticks} ticks replayed, {len(self.diffs)} differ, {len(self.breaches)} live limit breaches"]
+        if self.undecodable:
+            lines.append(f"{self.undecodable} lambdaLog entries could not be decoded and were skipped")
+        if self.diffs:
+            lines.append(f"first difference at timestamp {self.diffs[0].timestamp}")
+        return "\n".join(lines)
+
+
+def decode_state(compressed: List[Any]) -> TradingState:
+    """Inverts Logger.compress_state."""
+    timestamp, trader_data, listings, order_depths, own_trades, market_trades, position, observations = compressed
+
+    depths = {}
+    for symbol, (buy_orders, sell_orders) in order_depths.items():
+        order_depth = OrderDepth()
+        order_depth.buy_orders = {int(price): volume for price, volume in buy_orders.items()}
+        order_depth.sell_orders = {int(price): volume for price, volume in sell_orders.items()}
+        depths[symbol] = order_depth
+
+    def trades(compressed_trades: List[List[Any]]) -> Dict[Symbol, List[Trade]]:
+        by_symbol: Dict[Symbol, List[Trade]] = {}
+        for symbol, price, quantity, buyer, seller, trade_timestamp in compressed_trades:
+            by_symbol.setdefault(symbol, []).append(Trade(symbol, price, quantity, buyer, seller, trade_timestamp))
+        return by_symbol
+
+    plain_observations, conversion_observations = observations
+    return TradingState(
+        traderData=trader_data,
+        timestamp=timestamp,
+        # The exchange hands listings over as plain dicts, which is what Logger.compress_listings reads
+        listings={symbol: {'symbol': symbol, 'product': product, 'denomination': denomination}
+                  for symbol, product, denomination in listings},
+        order_depths=depths,
+        own_trades=trades(own_trades),
+        market_trades=trades(market_trades),
+        position=position,
+        observations=Observation(plain_observations, {product: ConversionObservation(*values)
+                                                      for product, values in conversion_observations.items()}),
+    )
+
+
+def _sandbox_entries(log_file: str) -> Iterator[Dict[str, Any]]:
+    # Entries are pretty-printed objects that start and end on a line of their own, so the
+    # section can be streamed one entry at a time instead of loaded whole
+    with open(log_file) as f:
+        if f.readline().strip() != 'Sandbox logs:':
+            raise ValueError(f"{log_file} does not start with a Sandbox logs section")
+        lines: List[str] = []
+        for line in f:
+            if line.startswith('Activities log:'):
+                return
+            if not lines and not line.strip():
+                continue
+            lines.append(line)
+            if line.rstrip('\n') == '}':
+                yield json.loads(''.join(lines))
+                lines = []
+
+
+def read_ticks(log_file: str) -> Iterator[LoggedTick]:
+    """Yields every decodable lambdaLog of an exchange log, in order; None for the others."""
+    for entry in _sandbox_entries(log_file):
+        try:
+            state, orders, conversions, trader_data, _ = json.loads(entry['lambdaLog'])
+        except (json.JSONDecodeError, TypeError, ValueError):
+            yield None
+            continue
+        yield LoggedTick(decode_state(state), [Order(*order) for order in orders], conversions, trader_data,
+                         entry['sandboxLog'])
+
+
+def _order_keys(orders) -> List[Tuple]:
+    return sorted((order.symbol, order.price, order.quantity) for order in orders)
+
+
+def _difference(left: List[Tuple], right: List[Tuple]) -> List[Tuple]:
+    remaining = list(right)
+    different = []
+    for key in left:
+        if key in remaining:
+            remaining.remove(key)
+        else:
+            different.append(key)
+    return different
+
+
+def replay(log_file: str, trader, stop_at_first: bool = False) -> ReplayReport:
+    """Compares trader.run on every logged state with what the live submission returned on that tick."""
+    # Each tick starts from its own logged state, so one difference never cascades
+    report = ReplayReport()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for tick in read_ticks(log_file):
+            if tick is None:
+                report.undecodable += 1
+                continue
+            report.ticks += 1
+            if 'exceeded limit' in tick.sandbox_log:
+                report.breaches.append(tick.state.timestamp)
+
+            orders, conversions, _ = trader.run(tick.state)
+            logged = _order_keys(tick.orders)
+            local = _order_keys(order for symbol_orders in orders.values() for order in symbol_orders)
+            if logged != local or (tick.conversions or 0) != (conversions or 0):
+                report.diffs.append(TickDiff(tick.state.timestamp, _difference(logged, local), _difference(local, logged),
+                                             tick.conversions, conversions, tick.sandbox_log))
+                if stop_at_first:
+                    break
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Replay a submission log through a local trader")
+    parser.add_argument('log')
+    parser.add_argument('trader', help="trader module, e.g. round1_trader")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--all', action='store_true', help="print every differing tick, not just the first few")
+    args = parser.parse_args()
+
+    trader = importlib.import_module(args.trader).Trader(seed=args.seed)
+    start = time.perf_counter()
+    report = replay(args.log, trader)
+    elapsed = time.perf_counter() - start
+
+    print(report)
+    for diff in report.diffs if args.all else report.diffs[:CONTEXT_TICKS]:
+        print(diff)
+    print(f"replayed in {elapsed:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,184 @@
+import argparse
+import time
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from .backtester import available_days, data_files
+
+# Size buckets start at these quantities: 1, 2-3, 4-7, 8-15 and 16 or more
+SIZE_EDGES = (2, 4, 8, 16)
+
+# Distances from the mid are counted in half ticks up to this far, further prints share the last bucket
+MAX_DISTANCE = 8.0
+
+# Prints at most this far from the mid, and strictly inside the spread, count as clustered
+# around it; with a one tick spread the touch itself is half a tick away, so it never does
+NEAR_MID = 0.5
+
+# Ticks after a print over which the mid move is measured
+HORIZON = 10
+
+# Prints a (product, aggressor, size) combination needs before it is reported as a pattern
+MIN_COUNT = 20
+
+BUY, SELL, INSIDE = 1, -1, 0
+AGGRESSORS = {BUY: 'buy', SELL: 'sell', INSIDE: 'inside'}
+
+
+def classify(prices: pd.DataFrame, trades: pd.DataFrame) -> pd.DataFrame:
+    """One row per print of a day's tape that has a book, joined to that book and classified."""
+    # Sorted like compute_features, so 'row' indexes its columns too
+    prices = prices.sort_values(['product', 'day', 'timestamp'], kind='stable')
+    products = sorted(prices['product'].unique())
+    codes = pd.Categorical(prices['product'], categories=products).codes.astype(np.int64)
+    best_bid = prices['bid_price_1'].to_numpy(dtype=np.float64)
+    best_ask = prices['ask_price_1'].to_numpy(dtype=np.float64)
+    mid = (best_bid + best_ask) / 2
+
+    # A prices file holds a single day, so (product, timestamp) identifies a row
+    keys = codes << 32 | prices['timestamp'].to_numpy(dtype=np.int64)
+    trades = trades[trades['symbol'].isin(products)]
+    trade_keys = (pd.Categorical(trades['symbol'], categories=products).codes.astype(np.int64) << 32
+                  | trades['timestamp'].to_numpy(dtype=np.int64))
+    rows = np.searchsorted(keys, trade_keys)
+    on_tick = (rows < len(keys)) & (keys[np.minimum(rows, len(keys) - 1)] == trade_keys)
+    rows = rows[on_tick]
+    price = trades['price'].to_numpy(dtype=np.float64)[on_tick]
+    quantity = trades['quantity'].to_numpy(dtype=np.int64)[on_tick]
+
+    aggressor = np.full(len(rows), INSIDE, dtype=np.int8)
+    aggressor[price >= best_ask[rows]] = BUY
+    aggressor[price <= best_bid[rows]] = SELL
+    offset = price - mid[rows]
+    with np.errstate(invalid='ignore'):
+        distance = np.where(np.isnan(offset), -1, np.minimum(np.floor(np.abs(offset) * 2 + 1e-9), MAX_DISTANCE * 2))
+
+    # The row a trader sees the print on in market_trades, -1 on the last tick of the day
+    seen = rows + 1
+    seen[(seen >= len(codes)) | (codes[np.minimum(seen, len(codes) - 1)] != codes[rows])] = -1
+    later = np.minimum(rows + HORIZON, len(codes) - 1)
+    same_product = codes[later] == codes[rows]
+    # Mid move over HORIZON ticks in the direction the print leaned (its aggressor side, or its
+    # side of the mid); positive when whoever initiated it traded ahead of the move
+    lean = np.where(aggressor != INSIDE, aggressor, np.sign(np.nan_to_num(offset)))
+    edge = np.where(same_product & (later - rows == HORIZON), (mid[later] - mid[rows]) * lean, np.nan)
+
+    return pd.DataFrame({
+        'symbol': pd.Categorical.from_codes(codes[rows], categories=products),
+        'timestamp': trades['timestamp'].to_numpy(dtype=np.int64)[on_tick],
+        'row': rows,
+        'seen': seen,
+        'price': price,
+        'quantity': quantity,
+        'mid': mid[rows],
+        'spread': (best_ask - best_bid)[rows],
+        'aggressor': aggressor,
+        'offset': offset,
+        'distance': distance.astype(np.int16),
+        'size_bucket': np.searchsorted(SIZE_EDGES, quantity, side='right').astype(np.int8),
+        'edge': edge,
+    })
+
+
+def signals(prints: pd.DataFrame, rows: int) -> Dict[str, np.ndarray]:
+    """Per-tick aggressive and inside volume and mean print offset, on the tick a trader sees the prints."""
+    if prints is None:
+        prints = pd.DataFrame({'seen': [], 'quantity': [], 'aggressor': [], 'offset': []})
+    prints = prints[prints['seen'] >= 0]
+    seen = prints['seen'].to_numpy(dtype=np.int64)
+    quantity = prints['quantity'].to_numpy(dtype=np.float64)
+    aggressor = prints['aggressor'].to_numpy()
+    offset = np.nan_to_num(prints['offset'].to_numpy())
+
+    volume = lambda side: np.bincount(seen, quantity * (aggressor == side), minlength=rows)
+    total = np.bincount(seen, quantity, minlength=rows)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_offset = np.bincount(seen, quantity * offset, minlength=rows) / total
+    return {
+        'tape_buy': volume(BUY).astype(np.int16),
+        'tape_sell': volume(SELL).astype(np.int16),
+        'tape_inside': volume(INSIDE).astype(np.int16),
+        'tape_offset': mean_offset.astype(np.float32),
+    }
+
+
+def load_prints(rounds: List[int] = (1, 3)) -> pd.DataFrame:
+    """The classified prints of every day with a tape in the given rounds, with round and day columns."""
+    days = []
+    for round in rounds:
+        for day in available_days(round):
+            prices_file, trades_file = data_files(round, day)
+            if trades_file is None:
+                continue
+            prints = classify(pd.read_csv(prices_file, delimiter=';'), pd.read_csv(trades_file, delimiter=';'))
+            prints.insert(0, 'round', round)
+            prints.insert(1, 'day', day)
+            prints['symbol'] = prints['symbol'].astype(str)
+            days.append(prints)
+    prints = pd.concat(days, ignore_index=True)
+    prints['symbol'] = prints['symbol'].astype('category')
+    return prints
+
+
+def _top_share(values: pd.Series) -> pd.Series:
+    return values.groupby(level=0, observed=True).max() / values.groupby(level=0, observed=True).sum()
+
+
+def summary(prints: pd.DataFrame) -> pd.DataFrame:
+    """One row per product: aggressor split, prints near the mid, and share of the most common size and offset."""
+    grouped = prints.groupby('symbol', observed=True)
+    offset = prints['offset'].abs()
+    # Only inside the spread, so prints at the touch never count
+    near_mid = (offset <= NEAR_MID) & (offset < prints['spread'] / 2)
+    frame = pd.DataFrame({
+        'prints': grouped.size(),
+        'volume': grouped['quantity'].sum(),
+        'buy': grouped['aggressor'].apply(lambda values: (values == BUY).mean()),
+        'sell': grouped['aggressor'].apply(lambda values: (values == SELL).mean()),
+        'inside': grouped['aggressor'].apply(lambda values: (values == INSIDE).mean()),
+        'near_mid': near_mid.groupby(prints['symbol'], observed=True).mean(),
+        'top_size_share': _top_share(prints.groupby(['symbol', 'quantity'], observed=True).size()),
+        'top_offset_share': _top_share(prints.groupby(['symbol', 'offset'], observed=True).size()),
+        'mean_edge': grouped['edge'].mean(),
+    })
+    frame.index.name = 'symbol'
+    return frame
+
+
+def patterns(prints: pd.DataFrame, min_count: int = MIN_COUNT) -> pd.DataFrame:
+    """Recurring (product, aggressor, size) prints; one at a fixed offset with a steady edge points at one bot."""
+    grouped = prints.groupby(['symbol', 'aggressor', 'quantity'], observed=True)
+    frame = grouped.agg(count=('price', 'size'), mean_offset=('offset', 'mean'), mean_edge=('edge', 'mean'),
+                        days=('day', 'nunique'))
+    modes = prints.groupby(['symbol', 'aggressor', 'quantity', 'offset'], observed=True).size()
+    frame['offset_mode'] = modes.groupby(level=[0, 1, 2], observed=True).idxmax().map(lambda index: index[3])
+    frame['offset_mode_share'] = modes.groupby(level=[0, 1, 2], observed=True).max() / frame['count']
+    frame['share'] = frame['count'] / frame.groupby(level=0, observed=True)['count'].transform('sum')
+    frame = frame[frame['count'] >= min_count].reset_index()
+    frame['aggressor'] = frame['aggressor'].map(AGGRESSORS)
+    return frame.sort_values(['symbol', 'count'], ascending=[True, False], ignore_index=True)[
+        ['symbol', 'aggressor', 'quantity', 'count', 'share', 'days', 'mean_offset', 'offset_mode',
+         'offset_mode_share', 'mean_edge']]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Mine the market trade tapes for recurring bot behaviour")
+    parser.add_argument('rounds', nargs='*', type=int, default=[1, 3])
+    parser.add_argument('--min-count', type=int, default=MIN_COUNT, help="prints a pattern needs to be listed")
+    parser.add_argument('--top', type=int, default=5, help="patterns to list per product")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    prints = load_prints(args.rounds)
+    print(f"{len(prints):,} prints over {prints.groupby(['round', 'day']).ngroups} days "
+          f"classified in {time.perf_counter() - start:.2f}s")
+    with pd.option_context('display.width', 200, 'display.max_columns', None, 'display.float_format', '{:.3f}'.format):
+        print(summary(prints).to_string())
+        print()
+        print(patterns(prints, args.min_count).groupby('symbol', observed=True).head(args.top).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+import json
+import os
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+QUALITY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '.cache', 'quality')
+
+# Anomalies that make a snapshot unusable, so repair replaces it with the product's last good one
+BAD_SNAPSHOTS = ('crossed', 'zero_mid')
+
+# Timestamps kept per anomaly in a report, enough to find them in the file
+EXAMPLES = 10
+
+
+class QualityReport:
+
+    def __init__(self, source: str, file_hash: str, rows: int, products: List[str]) -> None:
+        self.source = source
+        self.file_hash = file_hash
+        self.rows = rows
+        self.products = products
+        # Maps anomaly -> number of rows (or missing snapshots) it affects
+        self.counts: Dict[str, int] = {}
+        # Maps anomaly -> the first few timestamps it occurs at
+        self.examples: Dict[str, List[int]] = {}
+        # Maps repair -> number of rows it added, replaced or dropped
+        self.repairs: Dict[str, int] = {}
+
+    def flag(self, anomaly: str, timestamps: np.ndarray) -> None:
+        self.counts[anomaly] = int(len(timestamps))
+        self.examples[anomaly] = [int(timestamp) for timestamp in timestamps[:EXAMPLES]]
+
+    def clean(self) -> bool:
+        # One-sided books are reported, not anomalies: the exchange sends them too
+        return not any(count for anomaly, count in self.counts.items() if anomaly != 'one_sided')
+
+    def to_dict(self) -> dict:
+        return {
+            'source': self.source,
+            'file_hash': self.file_hash,
+            'rows': self.rows,
+            'products': self.products,
+            'counts': self.counts,
+            'examples': self.examples,
+            'repairs': self.repairs,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'QualityReport':
+        report = cls(data['source'], data['file_hash'], data['rows'], data['products'])
+        report.counts = data['counts']
+        report.examples = data['examples']
+        report.repairs = data['repairs']
+        return report
+
+    def __str__(self) -> str:
+        found = ", ".join(f"{anomaly} {count}" for anomaly, count in self.counts.items() if count) or "no anomalies"
+        repaired = ", ".join(f"{repair} {count}" for repair, count in self.repairs.items() if count)
+        return f"{os.path.basename(self.source)}: {self.rows} rows, {found}" + (f" (repaired: {repaired})" if repaired else "")
+
+
+def _masks(raw_data: pd.DataFrame) -> Dict[str, np.ndarray]:
+    bid = raw_data['bid_price_1'].to_numpy(dtype=np.float64, na_value=np.nan)
+    ask = raw_data['ask_price_1'].to_numpy(dtype=np.float64, na_value=np.nan)
+    mid = raw_data['mid_price'].to_numpy(dtype=np.float64, na_value=np.nan)
+    return {
+        'crossed': bid >= ask,
+        'zero_mid': ~(mid > 0),
+        'one_sided': np.isnan(bid) != np.isnan(ask),
+    }
+
+
+def validate(raw_data: pd.DataFrame, source: str = '', file_hash: str = '') -> QualityReport:
+    """Flags crossed, zero-mid, one-sided, duplicate, out of order and missing snapshots."""
+    products = sorted(str(product) for product in raw_data['product'].unique())
+    report = QualityReport(source, file_hash, len(raw_data), products)
+    timestamps = raw_data['timestamp'].to_numpy()
+
+    for anomaly, mask in _masks(raw_data).items():
+        report.flag(anomaly, timestamps[mask])
+
+    report.flag('duplicates', timestamps[raw_data.duplicated(['timestamp', 'product'], keep='last').to_numpy()])
+
+    # Out of order within a product, in file order
+    codes = pd.Categorical(raw_data['product'], categories=products).codes
+    order = np.argsort(codes, kind='stable')
+    by_product = timestamps[order]
+    backwards = (np.diff(by_product) < 0) & (np.diff(codes[order]) == 0)
+    report.flag('non_monotonic', by_product[1:][backwards])
+
+    # Every product should have a snapshot at every timestamp
+    present = np.zeros((len(np.unique(timestamps)), len(products)), dtype=bool)
+    unique_timestamps, rows = np.unique(timestamps, return_inverse=True)
+    present[rows, codes] = True
+    report.flag('missing_snapshots', np.repeat(unique_timestamps, (~present).sum(axis=1)))
+    return report
+
+
+def repair(raw_data: pd.DataFrame, report: QualityReport) -> pd.DataFrame:
+    """Replaces bad and missing snapshots with the product's last good one, after dropping duplicates."""
+    frame = raw_data.drop_duplicates(['timestamp', 'product'], keep='last')
+    report.repairs['dropped_duplicates'] = len(raw_data) - len(frame)
+
+    masks = _masks(frame)
+    bad = np.zeros(len(frame), dtype=bool)
+    for anomaly in BAD_SNAPSHOTS:
+        bad |= masks[anomaly]
+    good = frame[~bad].reset_index(drop=True)
+
+    # Lay the good rows out on the full timestamp x product grid and carry the row number of
+    # each product's last good snapshot forward into the holes
+    timestamps = np.unique(frame['timestamp'].to_numpy())
+    grid = pd.MultiIndex.from_product([timestamps, report.products], names=['timestamp', 'product'])
+    source_rows = pd.Series(np.arange(len(good)), index=pd.MultiIndex.from_arrays(
+        [good['timestamp'].to_numpy(), good['product'].astype(str).to_numpy()], names=['timestamp', 'product']))
+    # Snapshots before a product's first good one have nothing to carry and are left out
+    source_rows = source_rows.reindex(grid).groupby(level='product').ffill().dropna()
+
+    repaired = good.iloc[source_rows.to_numpy(dtype=np.int64)].copy()
+    repaired['timestamp'] = source_rows.index.get_level_values('timestamp').to_numpy().astype(good['timestamp'].dtype)
+    repaired['product'] = pd.Categorical(repaired['product'].astype(str), categories=report.products)
+    repaired = repaired.reset_index(drop=True)
+
+    report.repairs['forward_filled'] = len(repaired) - len(good)
+    report.repairs['dropped_unfillable'] = len(grid) - len(repaired)
+    return repaired
+
+
+def check_file(path: str, raw_data: pd.DataFrame, fix: bool = True, report_dir: str = QUALITY_DIR):
+    """The (possibly repaired) data and report of a book file, reused from report_dir while its hash matches."""
+    from .cache import file_hash
+
+    digest = file_hash(path)
+    report_file = os.path.join(report_dir, os.path.basename(path) + '.json')
+    repaired_file = os.path.join(report_dir, os.path.basename(path) + '.repaired.pkl')
+    if os.path.exists(report_file):
+        with open(report_file) as f:
+            report = QualityReport.from_dict(json.load(f))
+        if report.file_hash == digest:
+            if report.clean():
+                return raw_data, report
+            if fix and os.path.exists(repaired_file):
+                return pd.read_pickle(repaired_file), report
+
+    report = validate(raw_data, path, digest)
+    os.makedirs(report_dir, exist_ok=True)
+    if fix and not report.clean():
+        raw_data = repair(raw_data, report)
+        temporary = repaired_file + '.tmp'
+        raw_data.to_pickle(temporary)
+        os.replace(temporary, repaired_file)
+
+    temporary = report_file + '.tmp'
+    with open(temporary, 'w') as f:
+        json.dump(report.to_dict(), f, indent=2)
+    os.replace(temporary, report_file)
+    return raw_data, report
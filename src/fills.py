@@ -0,0 +1,59 @@
+from datamodel import OrderDepth
+from typing import Any, Dict, List, Tuple
+import json
+import os
+
+# Written by packages/fillmodel.py from the trade tapes; generated, so kept out of git and the bundle
+FILL_TABLE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '.cache', 'fill_tables.json')
+
+
+class FillTable:
+    """Fill probability and size of a passive quote by side, distance from the mid, spread and imbalance."""
+    BUY, SELL = 0, 1
+
+    def __init__(self, data: Dict[str, Any]) -> None:
+        self.data = data
+        # Distances are bucketed in half ticks, from 0.5 up to max_distance
+        self.max_distance: float = data['max_distance']
+        self.distances = int(self.max_distance * 2)
+        # A spread falls in the first bucket whose edge it does not exceed, else the last one
+        self.spread_edges: List[int] = data['spread_edges']
+        self.spreads = len(self.spread_edges) + 1
+        # Imbalance (bid - ask) / (bid + ask) of the best levels, in equal bins over [-1, 1]
+        self.imbalances: int = data['imbalance_bins']
+        self.probability: List[float] = data['probability']
+        self.size: List[float] = data['size']
+
+    # Cells are laid out flat, so a lookup is a few integer operations and two list reads
+    def cell(self, side: int, distance: float, spread: int, imbalance: float) -> int:
+        distance_bucket = min(max(int(distance * 2) - 1, 0), self.distances - 1)
+        spread_bucket = 0
+        while spread_bucket < self.spreads - 1 and spread > self.spread_edges[spread_bucket]:
+            spread_bucket += 1
+        imbalance_bucket = min(int((imbalance + 1) / 2 * self.imbalances), self.imbalances - 1)
+        return ((side * self.distances + distance_bucket) * self.spreads + spread_bucket) * self.imbalances + imbalance_bucket
+
+    def lookup(self, side: int, distance: float, spread: int, imbalance: float) -> Tuple[float, float]:
+        """(probability of a fill this tick, expected volume filled given a fill)."""
+        cell = self.cell(side, distance, spread, imbalance)
+        return self.probability[cell], self.size[cell]
+
+    def quote(self, order_depth: OrderDepth, price: int, quantity: int) -> Tuple[float, float]:
+        """The lookup for an order resting at price against a book, (0, 0) when it has no mid."""
+        if not order_depth.buy_orders or not order_depth.sell_orders:
+            return 0.0, 0.0
+        best_bid = max(order_depth.buy_orders)
+        best_ask = min(order_depth.sell_orders)
+        bid_volume = order_depth.buy_orders[best_bid]
+        ask_volume = -order_depth.sell_orders[best_ask]
+        mid = (best_bid + best_ask) / 2
+        imbalance = (bid_volume - ask_volume) / (bid_volume + ask_volume) if bid_volume + ask_volume else 0.0
+        if quantity > 0:
+            return self.lookup(self.BUY, mid - price, best_ask - best_bid, imbalance)
+        return self.lookup(self.SELL, price - mid, best_ask - best_bid, imbalance)
+
+
+def load_fill_tables(path: str = FILL_TABLE_FILE) -> Dict[str, FillTable]:
+    """Every compiled table, by product."""
+    with open(path) as f:
+        return {product: FillTable(data) for product, data in json.load(f).items()}
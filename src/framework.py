@@ -0,0 +1,353 @@
+import json
+import time
+from datamodel import Listing, Observation, Order, OrderDepth, ProsperityEncoder, Symbol, Trade, TradingState
+from typing import Any, Dict, List, Tuple
+
+class Logger:
+    def __init__(self) -> None:
+        self.logs = ""
+        # Switched off in benchmarks and sweeps, where nobody reads the per-tick payload
+        self.enabled = True
+        # Switched off for the rest of a tick once its time budget runs low
+        self.verbose = True
+
+    def print(self, *objects: Any, sep: str = " ", end: str = "\n") -> None:
+        if not self.enabled or not self.verbose:
+            return
+        self.logs += sep.join(map(str, objects)) + end
+
+    def flush(self, state: TradingState, orders: dict[Symbol, list[Order]], conversions: int, trader_data: str,
+              minimal: bool = False) -> None:
+        # A minimal payload leaves out the order depths, trades and logs, most of its size
+        if not self.enabled:
+            return
+        compressed_state = self.compress_state(state)
+        if minimal:
+            compressed_state[3] = {}
+            compressed_state[4] = []
+            compressed_state[5] = []
+        print(json.dumps([
+            compressed_state,
+            self.compress_orders(orders),
+            conversions,
+            trader_data,
+            "" if minimal else self.logs,
+        ], cls=ProsperityEncoder, separators=(",", ":")))
+
+        self.logs = ""
+
+    def compress_state(self, state: TradingState) -> list[Any]:
+        return [
+            state.timestamp,
+            state.traderData,
+            self.compress_listings(state.listings),
+            self.compress_order_depths(state.order_depths),
+            self.compress_trades(state.own_trades),
+            self.compress_trades(state.market_trades),
+            state.position,
+            self.compress_observations(state.observations),
+        ]
+
+    def compress_listings(self, listings: dict[Symbol, Listing]) -> list[list[Any]]:
+        compressed = []
+        for listing in listings.values():
+            compressed.append([listing["symbol"], listing["product"], listing["denomination"]])
+
+        return compressed
+
+    def compress_order_depths(self, order_depths: dict[Symbol, OrderDepth]) -> dict[Symbol, list[Any]]:
+        compressed = {}
+        for symbol, order_depth in order_depths.items():
+            compressed[symbol] = [order_depth.buy_orders, order_depth.sell_orders]
+
+        return compressed
+
+    def compress_trades(self, trades: dict[Symbol, list[Trade]]) -> list[list[Any]]:
+        compressed = []
+        for arr in trades.values():
+            for trade in arr:
+                compressed.append([
+                    trade.symbol,
+                    trade.price,
+                    trade.quantity,
+                    trade.buyer,
+                    trade.seller,
+                    trade.timestamp,
+                ])
+
+        return compressed
+
+    def compress_observations(self, observations: Observation) -> list[Any]:
+        conversion_observations = {}
+        for product, observation in observations.conversionObservations.items():
+            conversion_observations[product] = [
+                observation.bidPrice,
+                observation.askPrice,
+                observation.transportFees,
+                observation.exportTariff,
+                observation.importTariff,
+                observation.sunlight,
+                observation.humidity,
+            ]
+
+        return [observations.plainValueObservations, conversion_observations]
+
+    def compress_orders(self, orders: dict[Symbol, list[Order]]) -> list[list[Any]]:
+        compressed = []
+        for arr in orders.values():
+            for order in arr:
+                compressed.append([order.symbol, order.price, order.quantity])
+
+        return compressed
+logger = Logger()
+
+
+class Context:
+    """Per-tick market views shared by every strategy, computed once per call to Trader.run."""
+
+    def __init__(self, state: TradingState, limits: Dict[Symbol, int], optional_until: float = None) -> None:
+        self.state = state
+        self.limits = limits
+        # perf_counter time after which strategies should skip optional work; None never does
+        self.optional_until = optional_until
+        # Whether any strategy was told to skip optional work this tick
+        self.degraded = False
+        self.position: Dict[Symbol, int] = state.position
+        self.bids: Dict[Symbol, List[Tuple[int, int]]] = {}
+        self.asks: Dict[Symbol, List[Tuple[int, int]]] = {}
+        self.best_bid: Dict[Symbol, int] = {}
+        self.best_ask: Dict[Symbol, int] = {}
+        self.mid: Dict[Symbol, float] = {}
+        self.conversions = 0
+
+        # Best level first on both sides; ask volumes stay negative, as in OrderDepth
+        for symbol, order_depth in state.order_depths.items():
+            bids = sorted(order_depth.buy_orders.items(), reverse=True)
+            asks = sorted(order_depth.sell_orders.items())
+            self.bids[symbol] = bids
+            self.asks[symbol] = asks
+            if bids:
+                self.best_bid[symbol] = bids[0][0]
+            if asks:
+                self.best_ask[symbol] = asks[0][0]
+            if bids and asks:
+                self.mid[symbol] = (bids[0][0] + asks[0][0]) / 2
+
+    def get_position(self, product) -> int:
+        return self.position.get(product, 0)
+
+    def optional(self) -> bool:
+        """Whether there is time left this tick for work the orders can do without, like refits."""
+        if self.optional_until is None or time.perf_counter() < self.optional_until:
+            return True
+        self.degraded = True
+        return False
+
+    def fingerprint(self, products: Tuple[Symbol, ...]) -> tuple:
+        """Book levels, market trades and positions of the products; equal fingerprints mean equal inputs."""
+        market_trades = self.state.market_trades
+        return tuple(
+            (tuple(self.bids[product]),
+             tuple(self.asks[product]),
+             tuple((trade.price, trade.quantity, trade.buyer, trade.seller, trade.timestamp)
+                   for trade in market_trades.get(product, ())),
+             self.position.get(product, 0))
+            for product in products
+        )
+
+
+class Strategy:
+    """Trades one product or group of products per tick; state survives in traderData through save/load."""
+    name: str = ""
+    products: Tuple[Symbol, ...] = ()
+    PARAMS: Dict[str, Any] = {}
+
+    # A pure strategy's orders depend only on its fingerprint: it keeps no state between
+    # ticks and never converts. The dispatcher re-emits its last orders instead of
+    # calling it again while that fingerprint is unchanged.
+    pure: bool = False
+
+    # Strategies run in descending priority, so the ones that matter most get the tick's
+    # time budget first; ties keep their order in StrategyTrader.STRATEGIES
+    priority: int = 0
+
+    # Largest order fallback() places on either side
+    FALLBACK_SIZE: int = 5
+
+    def __init__(self, seed: int = None, stream: int = 0, noise: bool = True, **params) -> None:
+        unknown = set(params) - set(self.PARAMS)
+        if unknown:
+            raise ValueError(f"Unknown parameters for {self.name}: {sorted(unknown)}")
+        self.seed = seed
+        self.stream = stream
+        self.noise = noise
+        self._rng = None
+        for param, default in self.PARAMS.items():
+            setattr(self, param, params.get(param, default))
+
+    @property
+    def rng(self):
+        # Built on first use, so strategies that never draw never import numpy. The stream is
+        # child number `stream` of SeedSequence(seed), i.e. the same as SeedSequence(seed).spawn()
+        if self._rng is None:
+            import numpy as np
+            self._rng = np.random.default_rng(np.random.SeedSequence(self.seed, spawn_key=(self.stream,)))
+        return self._rng
+
+    def on_tick(self, state: TradingState, ctx: Context) -> List[Order]:
+        raise NotImplementedError
+
+    def fallback(self, state: TradingState, ctx: Context) -> List[Order]:
+        """Small orders at the best bid and ask, for a tick with no time left for on_tick."""
+        orders = []
+        for product in self.products:
+            position = ctx.get_position(product)
+            limit = ctx.limits.get(product, 0)
+            buy = min(self.FALLBACK_SIZE, limit - position)
+            sell = min(self.FALLBACK_SIZE, limit + position)
+            if product in ctx.best_bid and buy > 0:
+                orders.append(Order(product, ctx.best_bid[product], buy))
+            if product in ctx.best_ask and sell > 0:
+                orders.append(Order(product, ctx.best_ask[product], -sell))
+        return orders
+
+    def fingerprint(self, state: TradingState, ctx: Context) -> tuple:
+        """The inputs of a pure strategy; extend it when on_tick reads anything else."""
+        return ctx.fingerprint(self.products)
+
+    def save(self) -> Any:
+        return None
+
+    def load(self, data: Any) -> None:
+        pass
+
+
+# Maps strategy name -> Strategy subclass
+STRATEGIES: Dict[str, type] = {}
+
+
+def register(cls: type) -> type:
+    STRATEGIES[cls.name] = cls
+    return cls
+
+
+class StrategyTrader:
+    """Dispatches every tick to the strategies in STRATEGIES whose products are all in the book."""
+    POSITION_LIMIT = {"AMETHYSTS" : 20,
+                      "STARFRUIT" : 20,
+                      "ORCHIDS" : 100,
+                      'CHOCOLATE': 250,
+                      'STRAWBERRIES': 350,
+                      'ROSES': 60,
+                      'GIFT_BASKET': 60}
+
+    # Names of the registered strategies this trader runs, in call order
+    STRATEGIES: List[str] = []
+
+    # Maps strategy name -> parameter overrides for this round
+    PARAMS: Dict[str, Dict[str, Any]] = {}
+
+    # Conversions requested every tick on top of the ones strategies ask for
+    CONVERSIONS = 0
+
+    # Skip pure strategies whose inputs did not change since the previous tick. Off by default:
+    # on the round 1-3 data books move almost every tick, so fingerprinting costs more than it
+    # saves for the current strategies (see the dispatch/* benchmarks)
+    SKIP_UNCHANGED = False
+
+    # Seconds a tick may take before run degrades, well inside the exchange's 900ms deadline.
+    # Past OPTIONAL_FRACTION of it logging and ctx.optional() work stop, past FALLBACK_FRACTION
+    # strategies only place fallback() quotes, and past all of it the log payload is minimal
+    TIME_BUDGET = 0.3
+    OPTIONAL_FRACTION = 0.5
+    FALLBACK_FRACTION = 0.8
+
+    def __init__(self, seed: int = None, noise: bool = True, params: Dict[str, Dict[str, Any]] = None) -> None:
+        params = params or {}
+        # One independent stream per strategy, all derived from a single run seed
+        self.strategies: List[Strategy] = []
+        for stream, name in enumerate(self.STRATEGIES):
+            strategy_params = {**self.PARAMS.get(name, {}), **params.get(name, {})}
+            self.strategies.append(STRATEGIES[name](seed, stream, noise, **strategy_params))
+        # Call order; random streams stay tied to the position in STRATEGIES
+        self.schedule: List[Strategy] = sorted(self.strategies, key=lambda strategy: -strategy.priority)
+
+        self.time_budget = self.TIME_BUDGET
+        self.degradations: Dict[str, int] = {'optional': 0, 'fallback': 0, 'minimal': 0}
+        self.fallbacks: Dict[str, int] = {strategy.name: 0 for strategy in self.strategies}
+        self.skip_unchanged = self.SKIP_UNCHANGED
+        self.timings: Dict[str, float] = {strategy.name: 0.0 for strategy in self.strategies}
+        self.calls: Dict[str, int] = {strategy.name: 0 for strategy in self.strategies}
+        self.skips: Dict[str, int] = {strategy.name: 0 for strategy in self.strategies}
+        # Maps strategy name -> (fingerprint, orders) of its last evaluated tick
+        self.last_ticks: Dict[str, Tuple[tuple, List[Order]]] = {}
+
+    def load_trader_data(self, trader_data: str) -> None:
+        if not trader_data:
+            return
+        try:
+            saved = json.loads(trader_data)
+        except json.JSONDecodeError:
+            # Written by some other submission (e.g. when replaying its logs), start fresh
+            return
+        if not isinstance(saved, dict):
+            return
+        for strategy in self.strategies:
+            if strategy.name in saved:
+                strategy.load(saved[strategy.name])
+
+    def dump_trader_data(self) -> str:
+        saved = {}
+        for strategy in self.strategies:
+            data = strategy.save()
+            if data is not None:
+                saved[strategy.name] = data
+        return json.dumps(saved, separators=(",", ":"))
+
+    def run(self, state: TradingState):
+        tick_start = time.perf_counter()
+        optional_until = tick_start + self.time_budget * self.OPTIONAL_FRACTION
+        fallback_until = tick_start + self.time_budget * self.FALLBACK_FRACTION
+        self.load_trader_data(state.traderData)
+        ctx = Context(state, self.POSITION_LIMIT, optional_until)
+        result: Dict[Symbol, List[Order]] = {}
+        logger.verbose = True
+        fell_back = False
+
+        for strategy in self.schedule:
+            if any(product not in state.order_depths for product in strategy.products):
+                continue
+            start = time.perf_counter()
+            if start >= optional_until and logger.verbose:
+                logger.verbose = False
+                ctx.degraded = True
+            if start >= fallback_until:
+                orders = strategy.fallback(state, ctx)
+                self.fallbacks[strategy.name] += 1
+                fell_back = True
+            elif strategy.pure and self.skip_unchanged:
+                fingerprint = strategy.fingerprint(state, ctx)
+                last_tick = self.last_ticks.get(strategy.name)
+                if last_tick is not None and last_tick[0] == fingerprint:
+                    orders = last_tick[1]
+                    self.skips[strategy.name] += 1
+                else:
+                    orders = strategy.on_tick(state, ctx)
+                    self.last_ticks[strategy.name] = (fingerprint, orders)
+                    self.calls[strategy.name] += 1
+            else:
+                orders = strategy.on_tick(state, ctx)
+                self.calls[strategy.name] += 1
+            for order in orders:
+                result.setdefault(order.symbol, []).append(order)
+            self.timings[strategy.name] += time.perf_counter() - start
+
+        conversions = self.CONVERSIONS + ctx.conversions
+        trader_data = self.dump_trader_data()
+        minimal = time.perf_counter() - tick_start >= self.time_budget
+        self.degradations['optional'] += ctx.degraded
+        self.degradations['fallback'] += fell_back
+        self.degradations['minimal'] += minimal
+        logger.flush(state, result, conversions, trader_data, minimal)
+        logger.verbose = True
+        return result, conversions, trader_data
@@ -0,0 +1,86 @@
+from typing import Any, List
+
+
+class RecursiveLeastSquares:
+    """Linear model y = theta . x refitted in O(p^2) per observation, weighting one k updates old by forgetting ** k."""
+    # Plain lists rather than numpy: several times faster at p <= 5, and the bundle needs no numpy
+
+    def __init__(self, theta: List[float], forgetting: float = 0.999, delta: float = 1.0) -> None:
+        self.p = len(theta)
+        self.theta = list(theta)
+        self.forgetting = forgetting
+        # Inverse information matrix; delta is the prior variance of every coefficient
+        self.P = [[delta if i == j else 0.0 for j in range(self.p)] for i in range(self.p)]
+        self.updates = 0
+
+    def predict(self, x: List[float]) -> float:
+        return sum(t * v for t, v in zip(self.theta, x))
+
+    def update(self, x: List[float], y: float) -> float:
+        """Fits one observation and returns its prediction error before the update."""
+        p, P, theta = self.p, self.P, self.theta
+        Px = [sum(P[i][j] * x[j] for j in range(p)) for i in range(p)]
+        denominator = self.forgetting + sum(x[i] * Px[i] for i in range(p))
+        gain = [value / denominator for value in Px]
+        error = y - self.predict(x)
+        for i in range(p):
+            theta[i] += gain[i] * error
+        # P is symmetric, so x'P equals (Px)'
+        scale = 1.0 / self.forgetting
+        for i in range(p):
+            row = P[i]
+            gain_i = gain[i]
+            for j in range(p):
+                row[j] = (row[j] - gain_i * Px[j]) * scale
+        self.updates += 1
+        return error
+
+    def save(self) -> Any:
+        # P is symmetric, so its upper triangle is enough
+        return [self.theta, [self.P[i][j] for i in range(self.p) for j in range(i, self.p)], self.updates]
+
+    def load(self, data: Any) -> None:
+        self.theta, upper, self.updates = list(data[0]), data[1], data[2]
+        values = iter(upper)
+        for i in range(self.p):
+            for j in range(i, self.p):
+                self.P[i][j] = self.P[j][i] = next(values)
+
+
+class OnlineAR:
+    """Forecasts the next value of a series from its last `lags` values, extra features and a constant."""
+
+    def __init__(self, lags: int, extra: int = 0, forgetting: float = 0.999, delta: float = 1.0,
+                 theta: List[float] = None) -> None:
+        self.lags = lags
+        self.rls = RecursiveLeastSquares(theta or [0.0] * (lags - 1 + extra + 1), forgetting, delta)
+        # The last `lags` values, oldest first, and the features of the last forecast
+        self.history: List[float] = []
+        self.features: List[float] = None
+
+    # Fitted on changes from the latest value, y[t + 1] - y[t] = sum_i a_i (y[t - i] - y[t]) + b . extra + c,
+    # since prices in the thousands would make P badly conditioned
+    def _features(self, extra: List[float]) -> List[float]:
+        latest = self.history[-1]
+        return [value - latest for value in self.history[:-1]] + list(extra) + [1.0]
+
+    def observe(self, value: float, extra: List[float] = (), refit: bool = True) -> float:
+        """Adds the newest value and returns the next forecast, or the value itself during warm-up."""
+        # Without refit the coefficients stay as they are, which skips the O(p^2) update
+        if refit and self.features is not None:
+            self.rls.update(self.features, value - self.history[-1])
+        self.history.append(value)
+        if len(self.history) > self.lags:
+            self.history.pop(0)
+        if len(self.history) < self.lags:
+            self.features = None
+            return value
+        self.features = self._features(extra)
+        return value + self.rls.predict(self.features)
+
+    def save(self) -> Any:
+        return [self.history, self.features, self.rls.save()]
+
+    def load(self, data: Any) -> None:
+        self.history, self.features, rls = list(data[0]), data[1], data[2]
+        self.rls.load(rls)
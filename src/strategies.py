@@ -0,0 +1,370 @@
+import math
+from datamodel import Order, TradingState
+from framework import Context, Strategy, logger, register
+from rls import OnlineAR, RecursiveLeastSquares
+from typing import Any, List
+
+
+@register
+class AmethystStrategy(Strategy):
+    """
+    Creates and manages buy and sell orders for AMETHYSTS based on their current market status,
+    the trading bot's position, and predefined trading parameters.
+    """
+    name = 'AMETHYSTS'
+    products = ('AMETHYSTS',)
+    pure = True
+    priority = 2
+    PARAMS = {
+        'fair_value': 10000,
+        'spread': 1,
+        'open_spread': 3,
+        'start_trading': 0,
+        'position_limit': 20,
+        'position_spread': 15,
+    }
+
+    def on_tick(self, state: TradingState, ctx: Context) -> List[Order]:
+        product = self.name
+        current_position = ctx.get_position(product)
+        orders: List[Order] = []
+
+        if state.timestamp < self.start_trading:
+            return orders
+
+        best_ask = ctx.best_ask.get(product)
+        best_ask_volume = 0
+        if best_ask is not None and best_ask <= self.fair_value - self.spread:
+            best_ask_volume = state.order_depths[product].sell_orders[best_ask]
+            logger.print("BEST_ASK_VOLUME", best_ask_volume)
+
+        best_bid = ctx.best_bid.get(product)
+        best_bid_volume = 0
+        if best_bid is not None and best_bid >= self.fair_value + self.spread:
+            best_bid_volume = state.order_depths[product].buy_orders[best_bid]
+            logger.print("BEST_BID_VOLUME", best_bid_volume)
+
+        if current_position - best_ask_volume > self.position_limit:
+            best_ask_volume = current_position - self.position_limit
+            open_ask_volume = 0
+        else:
+            open_ask_volume = current_position - self.position_spread - best_ask_volume
+
+        if current_position - best_bid_volume < -self.position_limit:
+            best_bid_volume = current_position + self.position_limit
+            open_bid_volume = 0
+        else:
+            open_bid_volume = current_position + self.position_spread - best_bid_volume
+
+        if -open_ask_volume < 0:
+            open_ask_volume = 0
+        if open_bid_volume < 0:
+            open_bid_volume = 0
+
+        if -best_ask_volume > 0:
+            logger.print("BUY", product, str(-best_ask_volume) + "x", best_ask)
+            orders.append(Order(product, best_ask, -best_ask_volume))
+        if -open_ask_volume > 0:
+            logger.print("BUY", product, str(-open_ask_volume) + "x", self.fair_value - self.open_spread)
+            orders.append(Order(product, self.fair_value - self.open_spread, -open_ask_volume))
+
+        if best_bid_volume > 0:
+            logger.print("SELL", product, str(best_bid_volume) + "x", best_bid)
+            orders.append(Order(product, best_bid, -best_bid_volume))
+        if open_bid_volume > 0:
+            logger.print("SELL", product, str(open_bid_volume) + "x", self.fair_value + self.open_spread)
+            orders.append(Order(product, self.fair_value + self.open_spread, -open_bid_volume))
+
+        return orders
+
+    def fallback(self, state: TradingState, ctx: Context) -> List[Order]:
+        # The fair value is fixed, so the open quotes need no book walk
+        if state.timestamp < self.start_trading:
+            return []
+        product = self.name
+        position = ctx.get_position(product)
+        orders = []
+        buy = min(self.FALLBACK_SIZE, self.position_limit - position)
+        sell = min(self.FALLBACK_SIZE, self.position_limit + position)
+        if buy > 0:
+            orders.append(Order(product, self.fair_value - self.open_spread, buy))
+        if sell > 0:
+            orders.append(Order(product, self.fair_value + self.open_spread, -sell))
+        return orders
+
+    def fingerprint(self, state: TradingState, ctx: Context) -> tuple:
+        return super().fingerprint(state, ctx), state.timestamp >= self.start_trading
+
+
+@register
+class StarfruitStrategy(Strategy):
+    """Takes levels mispriced against an AR forecast of the mid, then quotes inside the spread."""
+    name = 'STARFRUIT'
+    products = ('STARFRUIT',)
+    priority = 1
+    PARAMS = {
+        'coefficients': [0.20756495, 0.19100943, 0.24615352, 0.35041242],
+        'intercept': 24.62232685604613,
+        'edge': 1.15,
+        'quote_offset': 2,
+        'noise_std': 0.01,
+        'default_price': 5000,
+        'online': False,
+        'forgetting': 0.999,
+    }
+
+    def __init__(self, *args, **params) -> None:
+        super().__init__(*args, **params)
+        self.history: List[float] = []
+        self.model: OnlineAR = None
+        if self.online:
+            # The fitted AR in OnlineAR's form, less the level term it leaves out
+            self.model = OnlineAR(len(self.coefficients), forgetting=self.forgetting,
+                                  theta=list(self.coefficients[:-1]) + [0.0])
+
+    def save(self) -> Any:
+        return self.model.save() if self.online else self.history
+
+    def load(self, data: Any) -> None:
+        if self.online:
+            self.model.load(data)
+        else:
+            self.history = list(data)
+
+    def forecast(self) -> float:
+        weighted = 0
+        for coefficient, price in zip(self.coefficients, self.history):
+            weighted += coefficient * price
+        weighted += self.intercept
+
+        if self.noise and self.noise_std:
+            weighted += self.rng.normal(0, self.noise_std)
+        return weighted
+
+    def on_tick(self, state: TradingState, ctx: Context) -> List[Order]:
+        prod = self.name
+        order_depth = state.order_depths[prod]
+        order_list: List[Order] = []
+        limit = ctx.limits[prod]
+        cpos_bid = ctx.get_position(prod)
+        cpos_sell = ctx.get_position(prod)
+
+        logger.print(f'{order_depth.sell_orders}, {order_depth.buy_orders}')
+        # Short on time, skip the refit and only take the best level on each side
+        full = ctx.optional()
+
+        if self.online:
+            fair_value = self.model.observe(ctx.mid.get(prod, self.default_price), refit=full)
+            if self.noise and self.noise_std:
+                fair_value += self.rng.normal(0, self.noise_std)
+        else:
+            self.history.append(ctx.mid.get(prod, self.default_price))
+            if len(self.history) > len(self.coefficients):
+                self.history = self.history[1:]
+            fair_value = self.forecast()
+
+        # Levels are walked in the order the exchange sent them, which is best first
+        asks = list(order_depth.sell_orders.items())
+        bids = list(order_depth.buy_orders.items())
+        if not full:
+            asks, bids = asks[:1], bids[:1]
+        for best_ask, best_ask_amount in asks:
+            if cpos_bid >= limit or best_ask - self.edge >= fair_value:
+                break
+            logger.print("BUY", str(-best_ask_amount) + "x", best_ask)
+            order_list.append(Order(prod, best_ask, min(-best_ask_amount, limit - cpos_bid)))
+            cpos_bid += -best_ask_amount
+
+        for best_bid, best_bid_amount in bids:
+            if cpos_sell <= -limit or best_bid + self.edge <= fair_value:
+                break
+            logger.print("SELL", str(best_bid_amount) + "x", best_bid)
+            order_list.append(Order(prod, best_bid, max(-best_bid_amount, -(limit + cpos_sell))))
+            cpos_sell += -best_bid_amount
+
+        bid_volume = limit - cpos_bid
+        ask_volume = -limit - cpos_sell
+
+        best_bid = fair_value
+        best_ask = fair_value
+        if prod in ctx.best_bid and prod in ctx.best_ask:
+            best_bid = ctx.best_bid[prod]
+            best_ask = ctx.best_ask[prod]
+
+        if bid_volume > 0:
+            order_list.append(Order(prod, min(math.floor(fair_value - self.quote_offset), best_bid + 1), int(bid_volume)))
+        if ask_volume < 0:
+            order_list.append(Order(prod, max(math.ceil(fair_value + self.quote_offset), best_ask - 1), int(ask_volume)))
+
+        return order_list
+
+
+@register
+class OrchidStrategy(Strategy):
+    """Sells ORCHIDS locally and converts the short back whenever conversion undercuts the sales."""
+    name = 'ORCHIDS'
+    products = ('ORCHIDS',)
+    PARAMS = {
+        'default_price': 1200,
+        'ema_param': 0.5,
+        'online': False,
+        'lags': 4,
+        'forgetting': 0.999,
+    }
+
+    def __init__(self, *args, **params) -> None:
+        super().__init__(*args, **params)
+        self.ema_price: float = None
+        self.avg_price: float = 0.0
+        self.total_position: int = 0
+        self.fair_value: float = None
+        self.model: OnlineAR = OnlineAR(self.lags, extra=1, forgetting=self.forgetting) if self.online else None
+
+    def save(self) -> Any:
+        saved = [self.ema_price, self.avg_price, self.total_position]
+        return saved + [self.model.save()] if self.online else saved
+
+    def load(self, data: Any) -> None:
+        self.ema_price, self.avg_price, self.total_position = data[:3]
+        if self.online and len(data) > 3:
+            self.model.load(data[3])
+
+    def humidity_effect(self, humidity: float) -> float:
+        adjustment: float
+        if humidity >= 60 and humidity <= 80:
+            adjustment = 0
+        elif humidity < 60:
+            adjustment = + abs(humidity - 60) * 1.02 / 5
+        else:
+            adjustment = abs(humidity - 80) * 1.02 / 5
+        return adjustment
+
+    def update_ema_price(self, ctx: Context) -> None:
+        """
+        Update the exponential moving average of the ORCHIDS price.
+        """
+        if self.ema_price is None:
+            self.ema_price = self.default_price
+        else:
+            mid_price = ctx.mid.get(self.name, self.ema_price)
+            self.ema_price = self.ema_param * mid_price + (1 - self.ema_param) * self.ema_price
+
+    def arbitrage(self, state: TradingState, ctx: Context) -> List[Order]:
+        prod = self.name
+        orders = []
+        buy_orders = state.order_depths[prod].buy_orders
+        observation = state.observations.conversionObservations[prod]
+        cpos = state.position.get(prod)
+
+        self.update_ema_price(ctx)
+
+        highest_bid_orderbook = ctx.best_bid.get(prod)
+        if highest_bid_orderbook:
+            profit2 = highest_bid_orderbook - observation.askPrice - observation.importTariff - observation.transportFees
+            logger.print("profit2:" + str(profit2))
+
+            orders.append(Order(prod, highest_bid_orderbook, -buy_orders[highest_bid_orderbook]))
+            self.total_position += highest_bid_orderbook * buy_orders[highest_bid_orderbook]
+            if cpos:
+                self.avg_price = self.total_position / cpos
+            logger.print("order arb: 0")
+
+        return orders
+
+    def fallback(self, state: TradingState, ctx: Context) -> List[Order]:
+        # Resting quotes would build a position the conversions are not sized for
+        return []
+
+    def on_tick(self, state: TradingState, ctx: Context) -> List[Order]:
+        prod = self.name
+        if prod not in state.observations.conversionObservations:
+            return []
+
+        observation = state.observations.conversionObservations[prod]
+        cpos = state.position.get(prod)
+        # Logged only, orders do not depend on the online forecast yet
+        if self.online and prod in ctx.mid:
+            south_mid = (observation.bidPrice + observation.askPrice) / 2
+            self.fair_value = self.model.observe(ctx.mid[prod], [south_mid - ctx.mid[prod]], refit=ctx.optional())
+            logger.print(f'Fair value: {self.fair_value}')
+        orders = self.arbitrage(state, ctx)
+        logger.print(str(cpos))
+
+        conv = 0
+        if cpos and cpos < 0 and (observation.askPrice - observation.importTariff - observation.transportFees < self.avg_price):
+            conv = -cpos
+        logger.print(f'Conversions: {conv}')
+        ctx.conversions += conv
+        return orders
+
+
+@register
+class GiftBasketStrategy(Strategy):
+    """Buys a GIFT_BASKET and sells its contents whenever the basket ask is below their best bids."""
+    name = 'GIFT_BASKET'
+    products = ('GIFT_BASKET', 'CHOCOLATE', 'STRAWBERRIES', 'ROSES')
+    pure = True
+    PARAMS = {
+        'weights': {'CHOCOLATE': 4, 'STRAWBERRIES': 6, 'ROSES': 1},
+        'online': False,
+        'forgetting': 0.999,
+    }
+
+    def __init__(self, *args, **params) -> None:
+        super().__init__(*args, **params)
+        self.spread: float = None
+        self.model: RecursiveLeastSquares = None
+        # Mids of the first tick; the fit is on moves away from them, to keep it well scaled
+        self.reference: List[float] = None
+        if self.online:
+            # Keeps state between ticks, so it can no longer be skipped on unchanged inputs
+            self.pure = False
+            self.model = RecursiveLeastSquares(list(self.weights.values()) + [0.0], self.forgetting)
+
+    def save(self) -> Any:
+        return [self.reference, self.model.save()] if self.online else None
+
+    def load(self, data: Any) -> None:
+        if self.online:
+            self.reference = data[0]
+            self.model.load(data[1])
+
+    def update_spread(self, ctx: Context) -> None:
+        products = (self.name,) + tuple(self.weights)
+        if any(product not in ctx.mid for product in products):
+            return
+        mids = [ctx.mid[product] for product in products]
+        if self.reference is None:
+            self.reference = mids
+        moves = [mid - reference for mid, reference in zip(mids, self.reference)]
+        features = moves[1:] + [1.0]
+        self.spread = moves[0] - self.model.predict(features)
+        self.model.update(features, moves[0])
+        logger.print(f'Basket spread: {self.spread}')
+
+    def fallback(self, state: TradingState, ctx: Context) -> List[Order]:
+        # A one-legged basket quote is not a hedge
+        return []
+
+    def fingerprint(self, state: TradingState, ctx: Context) -> tuple:
+        # Only the basket ask, the best bids of its contents and which books are two-sided are read
+        return (ctx.best_ask.get(self.name), tuple(ctx.best_bid.get(product) for product in self.weights),
+                tuple(product in ctx.mid for product in self.products))
+
+    def on_tick(self, state: TradingState, ctx: Context) -> List[Order]:
+        # The online hedge ratios are only logged; orders use the fixed weights
+        if self.online and ctx.optional():
+            self.update_spread(ctx)
+        orders: List[Order] = []
+        # Like the round 3 trader, only trade while every book has both sides
+        if any(product not in ctx.mid for product in self.products):
+            return orders
+        basket_lowest_ask = ctx.best_ask[self.name]
+
+        contents_value = sum(weight * ctx.best_bid[product] for product, weight in self.weights.items())
+        if basket_lowest_ask < contents_value:
+            orders.append(Order(self.name, basket_lowest_ask, 1))
+            for product, weight in self.weights.items():
+                orders.append(Order(product, ctx.best_bid[product], -weight))
+
+        return orders
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# Traders and the datamodel import from src/ by bare name, as on the exchange
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, 'src'), ROOT]
@@ -0,0 +1,40 @@
+import pytest
+
+from datamodel import Order, OrderDepth
+from packages.backtester import BackTester, data_files
+from packages.dataparser import DataParser
+
+BOOK = """day;timestamp;product;bid_price_1;bid_volume_1;bid_price_2;bid_volume_2;bid_price_3;bid_volume_3;ask_price_1;ask_volume_1;ask_price_2;ask_volume_2;ask_price_3;ask_volume_3;mid_price;profit_and_loss
+0;0;AMETHYSTS;9998;1;9995;30;;;10005;30;10006;2;;;10001.5;0.0
+0;100;AMETHYSTS;9996;2;;;;;10004;1;;;;;10000.0;0.0
+"""
+
+
+def test_ask_volumes_are_negative(tmp_path):
+    path = tmp_path / 'prices.csv'
+    path.write_text(BOOK)
+    parser = DataParser()
+    parser.parse_csv(str(path), validate=False)
+    depths = parser.extract_order_depths()
+    assert depths[0]['AMETHYSTS'].buy_orders == {9998: 1, 9995: 30}
+    assert depths[0]['AMETHYSTS'].sell_orders == {10005: -30, 10006: -2}
+    assert depths[100]['AMETHYSTS'].sell_orders == {10004: -1}
+
+
+def test_positive_ask_is_rejected():
+    backtester = BackTester('round1_trader')
+    order_depth = OrderDepth()
+    order_depth.buy_orders = {9998: 1}
+    order_depth.sell_orders = {10002: 5}
+    with pytest.raises(ValueError):
+        backtester.match_orders('AMETHYSTS', [Order('AMETHYSTS', 10002, 1)], order_depth, [], 0, 20, 0)
+
+
+def test_round1_day0_is_deterministic():
+    first = BackTester('round1_trader', seed=0).run(*data_files(1, 0))
+    second = BackTester('round1_trader', seed=0).run(*data_files(1, 0))
+    assert first.pnl == second.pnl
+    assert first.position == second.position
+    assert [(fill.price, fill.quantity, fill.timestamp) for fill in first.fills] == \
+           [(fill.price, fill.quantity, fill.timestamp) for fill in second.fills]
+    assert first.total_pnl() == 26631.0
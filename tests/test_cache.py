@@ -0,0 +1,58 @@
+import os
+
+from datamodel import Trade
+from packages.backtester import BacktestResult, BackTester, data_files
+from packages.cache import ResultCache, backtest_key
+
+
+def _trades(trades):
+    return [(trade.symbol, trade.price, trade.quantity, trade.buyer == 'SUBMISSION', trade.timestamp) for trade in trades]
+
+
+def _result(pnl: float) -> BacktestResult:
+    result = BacktestResult(['AMETHYSTS'])
+    result.timestamps = [0, 100]
+    result.pnl['AMETHYSTS'] = [0.0, pnl]
+    result.position['AMETHYSTS'] = [0, 1]
+    result.mid['AMETHYSTS'] = [10000.0, 10001.0]
+    result.fills = [Trade('AMETHYSTS', 9999, 1, 'SUBMISSION', '', 100)]
+    return result
+
+
+def test_result_round_trips(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    prices_file, trades_file = data_files(1, 0)
+    result = cache.run(BackTester('round1_trader', seed=0), prices_file, trades_file)
+    cached = cache.run(BackTester('round1_trader', seed=0), prices_file, trades_file)
+    assert (cache.misses, cache.hits) == (1, 1)
+    assert cached.timestamps == result.timestamps
+    assert cached.pnl == result.pnl
+    assert cached.position == result.position
+    assert cached.mid == result.mid
+    assert _trades(cached.fills) == _trades(result.fills)
+    assert _trades(cached.conversions) == _trades(result.conversions)
+
+
+def test_key_follows_parameters():
+    prices_file, trades_file = data_files(1, 0)
+    cache_key = lambda **kwargs: backtest_key(BackTester('round1_trader', **kwargs), prices_file, trades_file)
+    assert cache_key(seed=0) == cache_key(seed=0)
+    assert cache_key(seed=0) != cache_key(seed=1)
+    assert cache_key(seed=0) != cache_key(seed=0, params={'STARFRUIT': {'edge': 2}})
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    cache.put('a', _result(1.0))
+    cache.put('b', _result(2.0))
+    os.utime(cache.path('a'), ns=(1_000_000_000, 1_000_000_000))
+    os.utime(cache.path('b'), ns=(2_000_000_000, 2_000_000_000))
+    # Reading a makes b the least recently used
+    assert cache.get('a').pnl['AMETHYSTS'] == [0.0, 1.0]
+
+    # Room for two and a half entries
+    cache.max_bytes = os.path.getsize(cache.path('a')) * 5 // 2
+    cache.put('c', _result(3.0))
+    assert cache.get('b') is None
+    assert cache.get('a') is not None
+    assert cache.get('c').pnl['AMETHYSTS'] == [0.0, 3.0]
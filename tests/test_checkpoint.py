@@ -0,0 +1,55 @@
+import json
+
+import pytest
+
+from packages.backtester import BackTester, _Account, data_files, run_lockstep
+from packages.checkpoint import Checkpointer, JobJournal
+from packages.fillmodel import fill_tables
+
+
+def _backtester() -> BackTester:
+    # Table fills and the online refit give the run random and model state to carry over
+    return BackTester('round1_trader', seed=3, params={'STARFRUIT': {'online': True}}, fill_tables=fill_tables())
+
+
+def _fills(result):
+    return [(fill.symbol, fill.price, fill.quantity, fill.buyer, fill.timestamp) for fill in result.fills]
+
+
+def test_resumed_run_equals_uninterrupted(tmp_path):
+    files = data_files(1, 0)
+    uninterrupted = _backtester().run(*files)
+
+    checkpointer = Checkpointer(str(tmp_path), every=2500)
+    # Interrupted after 6000 ticks, then resumed from the checkpoint after 5000
+    run_lockstep([_backtester()], *files, ticks=6000, checkpointer=checkpointer)
+    assert checkpointer.ticks(checkpointer.key([_backtester()], *files)) == [2500, 5000]
+    resumed = _backtester().run(*files, checkpointer=checkpointer, resume_at=5000)
+
+    assert resumed.pnl == uninterrupted.pnl
+    assert resumed.position == uninterrupted.position
+    assert _fills(resumed) == _fills(uninterrupted)
+
+
+def test_save_refuses_state_it_would_lose(tmp_path):
+    account = _Account(BackTester('round1_trader'), ['AMETHYSTS'])
+    account.resting = {}
+    with pytest.raises(ValueError):
+        Checkpointer(str(tmp_path)).save('key', 1, {}, [account])
+
+
+def test_journal_drops_a_torn_line(tmp_path):
+    path = tmp_path / 'journal.jsonl'
+    journal = JobJournal(str(path))
+    journal.put('a', 1.5)
+    journal.put('b', [2, 3])
+    # A crash halfway through writing the next entry
+    with open(path, 'a') as f:
+        f.write('{"key": "c", "res')
+
+    reopened = JobJournal(str(path))
+    assert 'a' in reopened and 'b' in reopened and 'c' not in reopened
+    assert reopened.get('b') == [2, 3]
+    reopened.put('c', 4.0)
+    assert [json.loads(line)['key'] for line in path.read_text().splitlines()] == ['a', 'b', 'c']
+    assert JobJournal(str(path)).results == {'a': 1.5, 'b': [2, 3], 'c': 4.0}
@@ -0,0 +1,53 @@
+import json
+
+import numpy as np
+
+from rls import OnlineAR, RecursiveLeastSquares
+
+
+def test_matches_least_squares():
+    rng = np.random.default_rng(0)
+    x = np.column_stack([rng.normal(size=(500, 3)), np.ones(500)])
+    y = x @ np.array([0.5, -1.0, 2.0, 3.0]) + rng.normal(0, 0.1, 500)
+
+    # No forgetting and a vague prior leave plain least squares
+    model = RecursiveLeastSquares([0.0] * 4, forgetting=1.0, delta=1e8)
+    for row, value in zip(x.tolist(), y.tolist()):
+        model.update(row, value)
+    expected = np.linalg.lstsq(x, y, rcond=None)[0]
+    assert np.allclose(model.theta, expected, atol=1e-6)
+
+
+def test_forgetting_matches_weighted_least_squares():
+    rng = np.random.default_rng(1)
+    x = np.column_stack([rng.normal(size=(300, 2)), np.ones(300)])
+    y = x @ np.array([1.0, -0.5, 0.2]) + rng.normal(0, 0.1, 300)
+    forgetting = 0.98
+
+    model = RecursiveLeastSquares([0.0] * 3, forgetting=forgetting, delta=1e8)
+    for row, value in zip(x.tolist(), y.tolist()):
+        model.update(row, value)
+    weights = np.sqrt(forgetting ** np.arange(len(y))[::-1])
+    expected = np.linalg.lstsq(x * weights[:, None], y * weights, rcond=None)[0]
+    assert np.allclose(model.theta, expected, atol=1e-6)
+
+
+def test_online_ar_resumes_from_trader_data():
+    rng = np.random.default_rng(2)
+    values = (5000 + np.cumsum(rng.normal(0, 1, 400))).tolist()
+    extras = rng.normal(0, 1, 400).tolist()
+
+    uninterrupted = OnlineAR(4, extra=1)
+    forecasts = [uninterrupted.observe(value, [extra]) for value, extra in zip(values, extras)]
+
+    first = OnlineAR(4, extra=1)
+    resumed = [first.observe(value, [extra]) for value, extra in zip(values[:250], extras[:250])]
+    # Through JSON, as traderData carries it between ticks
+    second = OnlineAR(4, extra=1)
+    second.load(json.loads(json.dumps(first.save())))
+    resumed += [second.observe(value, [extra]) for value, extra in zip(values[250:], extras[250:])]
+
+    # save keeps the upper triangle of P, which the update leaves symmetric up to rounding
+    assert np.allclose(resumed, forecasts, rtol=1e-12)
+    assert np.allclose(second.rls.theta, uninterrupted.rls.theta, rtol=1e-9)
+    assert second.history == uninterrupted.history
@@ -0,0 +1,70 @@
+import pandas as pd
+
+from packages.validation import check_file, repair, validate
+
+COLUMNS = ['day', 'timestamp', 'product', 'bid_price_1', 'bid_volume_1', 'ask_price_1', 'ask_volume_1', 'mid_price']
+
+
+def _book(rows) -> pd.DataFrame:
+    return pd.DataFrame(rows, columns=COLUMNS)
+
+
+def _dirty() -> pd.DataFrame:
+    return _book([
+        (0, 0, 'A', 99, 5, 101, 5, 100.0),
+        (0, 0, 'B', 49, 5, 51, 5, 50.0),
+        # A is missing at 100
+        (0, 100, 'B', 48, 5, 50, 5, 49.0),
+        (0, 200, 'A', 102, 5, 101, 5, 101.5),  # crossed
+        (0, 200, 'B', 47, 5, 49, 5, 48.0),
+        (0, 300, 'A', 98, 5, 100, 5, 0.0),  # zero mid
+        (0, 300, 'B', 47, 5, 49, 5, 48.0),  # duplicate, the last one is kept
+        (0, 300, 'B', 46, 5, 48, 5, 47.0),
+    ])
+
+
+def test_validate_flags_anomalies():
+    report = validate(_dirty())
+    assert report.counts['crossed'] == 1
+    assert report.counts['zero_mid'] == 1
+    assert report.counts['duplicates'] == 1
+    assert report.counts['missing_snapshots'] == 1
+    assert not report.clean()
+
+
+def test_repair_fills_the_gaps_it_claims():
+    raw_data = _dirty()
+    report = validate(raw_data)
+    repaired = repair(raw_data, report)
+
+    a = repaired[repaired['product'] == 'A'].set_index('timestamp')
+    b = repaired[repaired['product'] == 'B'].set_index('timestamp')
+    # Every product at every timestamp, each bad or missing A snapshot replaced by the one at 0
+    assert a.index.tolist() == b.index.tolist() == [0, 100, 200, 300]
+    assert a['mid_price'].tolist() == [100.0, 100.0, 100.0, 100.0]
+    assert a['bid_price_1'].tolist() == [99, 99, 99, 99]
+    assert b['mid_price'].tolist() == [50.0, 49.0, 48.0, 47.0]
+    assert report.repairs == {'dropped_duplicates': 1, 'forward_filled': 3, 'dropped_unfillable': 0}
+    assert validate(repaired).clean()
+
+
+def test_repair_drops_what_it_cannot_fill():
+    raw_data = _book([
+        (0, 0, 'A', 101, 5, 100, 5, 100.5),  # crossed, with no good snapshot before it
+        (0, 100, 'A', 99, 5, 101, 5, 100.0),
+    ])
+    report = validate(raw_data)
+    repaired = repair(raw_data, report)
+    assert repaired['timestamp'].tolist() == [100]
+    assert report.repairs['dropped_unfillable'] == 1
+
+
+def test_check_file_reuses_the_repaired_frame(tmp_path):
+    path = tmp_path / 'prices.csv'
+    raw_data = _dirty()
+    raw_data.to_csv(path, sep=';', index=False)
+    repaired, report = check_file(str(path), raw_data, report_dir=str(tmp_path / 'quality'))
+    assert (tmp_path / 'quality' / 'prices.csv.repaired.pkl').exists()
+    cached, cached_report = check_file(str(path), raw_data, report_dir=str(tmp_path / 'quality'))
+    pd.testing.assert_frame_equal(cached, repaired)
+    assert cached_report.counts == report.counts